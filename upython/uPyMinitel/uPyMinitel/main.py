@@ -3,6 +3,7 @@
 
 from minitel.Minitel import Minitel
 from minitel.ui.Menu import Menu
+from minitel import tools
 
 
 from minitel.Sequence import Sequence # Gestion des séquences de caractères
@@ -17,9 +18,8 @@ from minitel.constantes import (SS2, SEP, ESC, CSI, PRO1, PRO2, PRO3, MIXTE1,
 
 minitel = Minitel()
 
-minitel.deviner_vitesse()
-minitel.identifier()
-minitel.definir_vitesse(minitel.capacite['vitesse'])
+# Vitesse et identité mémorisées, détection complète en cas d’échec
+minitel.demarrer()
 
 def test_recevoir_sequence(bloque = True, attente = None):
     """ Test de la fonction recevoir_sequence
@@ -92,12 +92,16 @@ def test_envoyer(data = None):
 
 def affiche_videotex(fichier):
     """ Fonction permettant d'afficher un fichier videotex (.vdt .vtx)
+
+    Le fichier est lu et envoyé par blocs (voir tools.affiche_videotex).
     
     Param: chemin du fichier à afficher
         e.g. affiche_videotex("/foo/bar.vdt")
     """
-    with open(fichier, 'rb') as f:
-        minitel.envoyer_brut(f.read())
+    tools.affiche_videotex(minitel, fichier)
+
+# Les envois de l’écran de présentation sont regroupés en quelques écritures
+minitel.debut_lot()
 
 minitel.efface()
 
@@ -134,3 +138,5 @@ minitel.envoyer("* Librairie PyMinitel de Zigazou")
 minitel.position(3,23)
 minitel.couleur(caractere = 'bleu')
 minitel.envoyer("* Adapté en micropython par Iodeo")
+
+minitel.fin_lot()
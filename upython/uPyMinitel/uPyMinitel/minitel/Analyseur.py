@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Analyse incrémentale des séquences envoyées par le Minitel
+
+Les octets reçus sont fournis à l’analyseur au fur et à mesure de leur
+arrivée, sans attendre la fin d’une séquence. Chaque séquence complète
+devient un événement horodaté, rangé dans l’une de deux files : les
+réponses du Minitel aux commandes protocole d’un côté, les touches frappées
+par l’utilisateur de l’autre.
+"""
+
+from minitel.temps import ticks_diff
+
+from minitel.Sequence import Sequence # Gestion des séquences de caractères
+from minitel.constantes import (SS2, SEP, ESC, SOH, EOT, LONGUEUR_PRO1,
+    LONGUEUR_PRO2, LONGUEUR_PRO3)
+
+# Délai en millisecondes au-delà duquel un ESC isolé est la touche Esc
+DELAI_ESC = 100
+
+# Longueur de la réponse à ENQROM : SOH, 3 caractères d’identification, EOT
+LONGUEUR_ROM = 5
+
+# Acquittements SEP des changements de mode (les touches de fonction vont de
+# SEP 0x41 à SEP 0x49)
+ACQUITTEMENTS_SEP = (0x5e, 0x70, 0x71)
+
+def _complete(valeurs):
+    """Indique si les valeurs reçues forment une séquence complète"""
+    longueur = len(valeurs)
+    premier = valeurs[0]
+
+    if premier == SS2 or premier == SEP:
+        return longueur == 2
+
+    if premier == SOH:
+        return valeurs[-1] == EOT or longueur == LONGUEUR_ROM
+
+    if premier == ESC:
+        # ESC seul n’est complet qu’après le délai (méthode expire)
+        if longueur < 2:
+            return False
+
+        # Réponses PRO1, PRO2 et PRO3
+        second = valeurs[1]
+        if second == 0x39:
+            return longueur == LONGUEUR_PRO1
+        if second == 0x3a:
+            return longueur == LONGUEUR_PRO2
+        if second == 0x3b:
+            return longueur == LONGUEUR_PRO3
+
+        if second != 0x5b:
+            return True
+
+        # Séquence CSI
+        if longueur < 3:
+            return False
+
+        if valeurs[2] == 0x32 or valeurs[2] == 0x34 or valeurs[2] == 0x3f:
+            return longueur == 4
+
+        return True
+
+    return True
+
+def _protocole(valeurs):
+    """Indique si des valeurs commencent une réponse à une commande"""
+    longueur = len(valeurs)
+    premier = valeurs[0]
+
+    if premier == SOH:
+        return True
+
+    if premier == SEP:
+        return longueur > 1 and valeurs[1] in ACQUITTEMENTS_SEP
+
+    if premier == ESC and longueur > 1:
+        if valeurs[1] == 0x39 or valeurs[1] == 0x3a or valeurs[1] == 0x3b:
+            return True
+
+        # CSI 0x3f : changement de mode TéléInformatique
+        return longueur > 2 and valeurs[1] == 0x5b and valeurs[2] == 0x3f
+
+    return False
+
+class Evenement:
+    """Une séquence complète reçue du Minitel
+
+    :ivar sequence:
+        la séquence reçue (objet Sequence)
+    :ivar instant:
+        valeur de ticks_ms() à l’arrivée du premier octet de la séquence
+    """
+    def __init__(self, sequence, instant):
+        self.sequence = sequence
+        self.instant = instant
+
+class Analyseur:
+    """Un analyseur des séquences envoyées par le Minitel
+
+    L’analyseur ne lit rien lui-même : on lui pousse les octets disponibles
+    (méthode pousse) et il range les séquences terminées dans deux files.
+    Les réponses aux commandes protocole (méthode reponse) sont séparées des
+    touches frappées (méthode evenement), si bien qu’une touche frappée
+    pendant une commande n’est ni perdue ni confondue avec la réponse. Une
+    séquence incomplète est conservée jusqu’à l’arrivée de ses derniers
+    octets.
+
+    La longueur des séquences suit la norme du Minitel :
+
+    - SS2 et SEP sont suivis d’un octet,
+    - SOH est suivi de l’identification du Minitel, jusqu’à EOT,
+    - ESC 0x39, ESC 0x3a et ESC 0x3b (réponses PRO1, PRO2 et PRO3) sont
+      suivis d’un, deux et trois octets,
+    - ESC est suivi d’un octet, sauf s’il est seul (touche Esc),
+    - ESC 0x5b (CSI) est suivi d’un octet, ou de deux si le premier est
+      0x32, 0x34 ou 0x3f,
+    - tout autre octet forme une séquence à lui seul.
+
+    Sont des réponses : l’identification, les réponses PRO1, PRO2 et PRO3,
+    les séquences CSI 0x3f et les acquittements SEP des changements de mode.
+
+    Un ESC isolé n’est reconnu qu’une fois écoulé le délai delai_esc sans
+    autre octet : la méthode expire doit donc être appelée régulièrement.
+    """
+    def __init__(self, delai_esc = DELAI_ESC):
+        """Constructeur d’Analyseur
+
+        :param delai_esc:
+            délai en millisecondes au-delà duquel un ESC seul est considéré
+            comme complet
+        :type delai_esc:
+            un entier
+        """
+        assert isinstance(delai_esc, int) and delai_esc >= 0
+
+        self.delai_esc = delai_esc
+
+        # Séquence en cours de réception et instant de son premier octet
+        self._en_cours = bytearray()
+        self._instant = 0
+
+        # Événements terminés, du plus ancien au plus récent
+        self._evenements = []
+        self._reponses = []
+
+    def __len__(self):
+        """Retourne le nombre de touches terminées en attente"""
+        return len(self._evenements)
+
+    def en_cours(self):
+        """Indique si une séquence est en cours de réception
+
+        :returns:
+            True si des octets attendent la fin de leur séquence
+        """
+        return len(self._en_cours) != 0
+
+    def pousse(self, octets, instant):
+        """Analyse des octets reçus du Minitel
+
+        :param octets:
+            les octets reçus, en nombre quelconque
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+
+        :param instant:
+            valeur de ticks_ms() à la réception des octets
+        :type instant:
+            un entier
+
+        :returns:
+            le nombre de touches terminées en attente
+        """
+        for octet in octets:
+            if not self._en_cours:
+                self._instant = instant
+
+            self._en_cours.append(octet)
+            if _complete(self._en_cours):
+                self._termine()
+
+        return len(self._evenements)
+
+    def expire(self, instant):
+        """Termine un ESC resté seul au-delà du délai
+
+        :param instant:
+            valeur actuelle de ticks_ms()
+        :type instant:
+            un entier
+
+        :returns:
+            le nombre de touches terminées en attente
+        """
+        if (len(self._en_cours) == 1 and self._en_cours[0] == ESC and
+            ticks_diff(instant, self._instant) >= self.delai_esc):
+            self._termine()
+
+        return len(self._evenements)
+
+    def evenement(self):
+        """Retire la touche la plus ancienne de la file
+
+        :returns:
+            un objet Evenement ou None si aucune touche n’est terminée
+        """
+        if not self._evenements:
+            return None
+
+        return self._evenements.pop(0)
+
+    def touche_fonction(self):
+        """Indique si une touche de fonction attend dans la file
+
+        Les touches de fonction (Envoi, Retour, Répétition, Guide,
+        Annulation, Sommaire, Correction, Suite et Connexion/Fin) sont
+        transmises par SEP suivi d’un octet de 0x41 à 0x49. La file n’est
+        pas modifiée.
+
+        :returns:
+            True si au moins une touche de fonction a été reçue
+        """
+        for evenement in self._evenements:
+            valeurs = evenement.sequence.valeurs
+            if (len(valeurs) == 2 and valeurs[0] == SEP and
+                0x41 <= valeurs[1] <= 0x49):
+                return True
+
+        return False
+
+    def reponse(self):
+        """Retire la réponse à une commande la plus ancienne de la file
+
+        :returns:
+            un objet Evenement ou None si aucune réponse n’est terminée
+        """
+        if not self._reponses:
+            return None
+
+        return self._reponses.pop(0)
+
+    def reprend(self, nombre = None):
+        """Retire et retourne les octets des touches reçues
+
+        Les octets des touches en attente puis ceux de la séquence en cours
+        sont retournés dans leur ordre d’arrivée. Cela permet de relire
+        octet par octet ce qui a déjà été reçu. Les réponses aux commandes,
+        terminées ou en cours, ne sont jamais retournées.
+
+        :param nombre:
+            nombre maximal d’octets à retourner, None pour tous
+        :type nombre:
+            un entier ou None
+
+        :returns:
+            un objet bytearray
+        """
+        octets = bytearray()
+        while self._evenements:
+            valeurs = self._evenements[0].sequence.valeurs
+            manque = len(valeurs)
+            if nombre != None:
+                manque = min(manque, nombre - len(octets))
+
+            octets.extend(valeurs[:manque])
+            if manque < len(valeurs):
+                # La fin de la touche reste à lire
+                self._evenements[0].sequence = Sequence(valeurs[manque:])
+                return octets
+
+            self._evenements.pop(0)
+
+        if self._en_cours and not _protocole(self._en_cours):
+            manque = len(self._en_cours)
+            if nombre != None:
+                manque = min(manque, nombre - len(octets))
+
+            octets.extend(self._en_cours[:manque])
+            self._en_cours = self._en_cours[manque:]
+
+        return octets
+
+    def oublie(self):
+        """Abandonne tout ce qui a été reçu, touches comme réponses"""
+        self._en_cours = bytearray()
+        self._evenements = []
+        self._reponses = []
+
+    def _termine(self):
+        """Transforme la séquence en cours en événement"""
+        sequence = Sequence(self._en_cours)
+        evenement = Evenement(sequence, self._instant)
+        if _protocole(self._en_cours):
+            self._reponses.append(evenement)
+        else:
+            self._evenements.append(evenement)
+        self._en_cours = bytearray()
@@ -0,0 +1,526 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""AsyncMinitel pilote un Minitel depuis une boucle uasyncio ou asyncio.
+
+Les méthodes qui attendent le Minitel (réception, commandes protocole,
+vitesse) sont des coroutines : pendant l’attente, les autres tâches de la
+boucle continuent de s’exécuter. Les méthodes d’affichage héritées de
+Minitel restent synchrones et remplissent le tampon d’écriture, qui est
+transmis dès qu’on attend envoyer() ou une réponse du Minitel.
+
+Le même code fonctionne sous MicroPython, avec uasyncio sur un UART (voir
+ouvrir_uart), et sous CPython, avec asyncio sur un port série ou un pty
+(voir ouvrir_terminal).
+"""
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from minitel.Minitel import Minitel, FICHIER_DEMARRAGE, _repartir
+from minitel.liaison import Liaison, LiaisonUART, LiaisonTerminal
+from minitel.temps import ticks_ms, ticks_diff
+
+# Nombre maximal d’octets lus en une fois sur le flux
+TAILLE_LECTURE = 64
+
+class _Vidage:
+    """Attente de la transmission des octets écrits
+
+    Retourné par AsyncMinitel.envoyer, cet objet ne fait rien tant qu’il
+    n’est pas attendu : les méthodes d’affichage héritées de Minitel peuvent
+    donc appeler envoyer sans await.
+    """
+    def __init__(self, ecrivain):
+        self._ecrivain = ecrivain
+
+    def __iter__(self):
+        # MicroPython attend un objet en parcourant son itérateur
+        yield from self._ecrivain.drain()
+
+    def __await__(self):
+        return self._ecrivain.drain().__await__()
+
+class AsyncMinitel(Minitel):
+    """Une classe de pilotage asynchrone du Minitel
+
+    AsyncMinitel communique avec le Minitel au travers d’un couple de flux
+    StreamReader/StreamWriter au lieu d’un UART lu en bloquant. Les
+    méthodes suivantes sont des coroutines qui doivent être attendues :
+    envoyer (facultatif, voir ci-dessous), recevoir, recevoir_sequence,
+    appeler, definir_mode, identifier, deviner_vitesse, recuperation,
+    definir_vitesse, demarrer, configurer_clavier et echo. Les commandes protocole
+    suivent exactement les mêmes dialogues que dans Minitel.
+
+    Toutes les autres méthodes (couleur, position, efface, lot, image…)
+    sont synchrones. Leurs envois sont écrits dans le flux sans attendre leur
+    transmission : attendre envoyer() ou une réponse du Minitel transmet
+    tout ce qui précède.
+
+    Une seule tâche doit lire le Minitel à la fois.
+
+    Exemple d’utilisation sous MicroPython :
+
+    >>> async def principal():
+    ...     minitel = ouvrir_uart()
+    ...     await minitel.deviner_vitesse()
+    ...     await minitel.identifier()
+    ...     minitel.efface()
+    ...     minitel.position(1, 1)
+    ...     await minitel.envoyer('Bonjour')
+    ...     touche = await minitel.recevoir_sequence()
+    ...     minitel.close()
+    >>> asyncio.run(principal())
+    """
+    def __init__(self, lecteur, ecrivain, liaison = None, ecran = False):
+        """Constructeur d’AsyncMinitel
+
+        :param lecteur:
+            le flux des octets reçus du Minitel
+        :type lecteur:
+            un objet StreamReader (asyncio ou uasyncio)
+
+        :param ecrivain:
+            le flux des octets envoyés au Minitel
+        :type ecrivain:
+            un objet StreamWriter (asyncio ou uasyncio)
+
+        :param liaison:
+            la liaison sous-jacente aux flux, utilisée pour changer de
+            vitesse et fermée par close, None si la vitesse ne peut être
+            changée
+        :type liaison:
+            un objet du module minitel.liaison ou None
+
+        :param ecran:
+            True pour tenir à jour un modèle de l’écran du Minitel (attribut
+            ecran) à partir de tout ce qui lui est envoyé, False sinon. Seul
+            le rendu différentiel (image) en a besoin (voir Minitel).
+        :type ecran:
+            un booléen
+        """
+        self._lecteur = lecteur
+        self._ecrivain = ecrivain
+
+        # Une liaison à vitesse fixe, sans données, tient lieu de liaison
+        # si aucune n’est fournie : seuls les flux sont lus et écrits
+        if liaison == None:
+            liaison = Liaison()
+
+        Minitel.__init__(self, ecran = ecran, liaison = liaison)
+
+    def _ecrire(self, octets):
+        """Écrit des octets dans le flux, sans attendre leur transmission"""
+        self._ecrivain.write(octets)
+
+    def close(self):
+        """Ferme la connexion avec le Minitel
+
+        """
+        self.vider_lot()
+        self._ecrivain.close()
+        self._minitel.close()
+
+    def envoyer(self, contenu):
+        """Envoi de séquence de caractères
+
+        La séquence est écrite immédiatement comme avec Minitel.envoyer.
+        L’objet retourné peut être attendu pour patienter jusqu’à la
+        transmission de tout ce qui a été écrit.
+
+        :param contenu:
+            Une séquence de caractères interprétable par la classe Sequence.
+        :type contenu:
+            un objet Sequence, des octets, une chaîne de caractères ou
+            unicode, une liste, un entier
+
+        :returns:
+            un objet attendable
+        """
+        Minitel.envoyer(self, contenu)
+
+        return _Vidage(self._ecrivain)
+
+    async def _vider(self):
+        """Transmet le tampon d’envoi et attend la fin de l’écriture"""
+        self.vider_lot()
+        await self._ecrivain.drain()
+
+    async def _attendre(self, delai = None):
+        """Attend l’arrivée d’octets et les confie à l’analyseur
+
+        :param delai:
+            attente maximale en millisecondes, None pour attendre
+            indéfiniment
+        :type delai:
+            un entier, un flottant ou None
+
+        :returns:
+            True si des octets ont été reçus
+        """
+        await self._vider()
+
+        lecture = self._lecteur.read(TAILLE_LECTURE)
+        try:
+            if delai == None:
+                octets = await lecture
+            else:
+                octets = await asyncio.wait_for(lecture, max(delai, 0) / 1000)
+        except asyncio.TimeoutError:
+            return False
+
+        # Un flux terminé ne renverra plus jamais rien
+        if octets == b'':
+            raise EOFError('liaison avec le Minitel fermée')
+
+        if not octets:
+            return False
+
+        self._analyseur.pousse(octets, ticks_ms())
+        return True
+
+    def _lire(self):
+        """Ne lit rien : les octets sont lus par la coroutine _attendre"""
+
+    def _patienter_emission(self):
+        """Consulte le clavier sans attendre (voir Minitel._patienter_emission)
+
+        Les tranches sont confiées sans délai au flux d’écriture : seule une
+        touche de fonction déjà reçue interrompt l’affichage.
+
+        :returns:
+            True si une touche de fonction est arrivée
+        """
+        return self._clavier and self._analyseur.touche_fonction()
+
+    def evenement(self):
+        """Retourne la plus ancienne séquence complète déjà reçue
+
+        Contrairement à Minitel.evenement, aucune lecture n’est faite : les
+        octets sont lus par les coroutines recevoir, recevoir_sequence et
+        appeler.
+
+        :returns:
+            un objet Evenement (attributs sequence et instant, en ms) ou None
+            si aucune séquence complète n’a été reçue
+        """
+        self._analyseur.expire(ticks_ms())
+
+        evenement = self._analyseur.evenement()
+
+        # Avec l’écho actif, le Minitel a pu afficher la touche ou déplacer
+        # son curseur à l’insu du suivi et de l’écran modélisé
+        if evenement != None and self.echo_actif:
+            self._oublie_echo()
+
+        return evenement
+
+    async def recevoir(self, bloque = False, attente = None, nbytes = 1):
+        """Lit des caractères en provenance du Minitel
+
+        Version asynchrone de Minitel.recevoir. Sans blocage, seuls les
+        octets déjà lus sont retournés.
+
+        :param bloque:
+            True pour attendre un caractère s’il n’y en a pas
+        :type bloque:
+            un booléen
+
+        :param attente:
+            attente maximale en secondes si bloque = True, None pour attendre
+            indéfiniment
+        :type attente:
+            un entier, un flottant ou None
+
+        :param nbytes:
+            nombre d’octets à lire au maximum
+        :type nbytes:
+            un entier
+
+        :returns:
+            une chaîne de caractères, vide si rien n’a été reçu
+        """
+        assert bloque in [True, False]
+        assert isinstance(attente, (int, float)) or attente == None
+        assert isinstance(nbytes, int)
+
+        await self._vider()
+
+        caracteres = self._analyseur.reprend(nbytes)
+
+        # Seules les touches comptent, pas les réponses aux commandes
+        debut = ticks_ms()
+        while bloque and not caracteres:
+            restant = None
+            if attente != None:
+                restant = attente * 1000 - ticks_diff(ticks_ms(), debut)
+                if restant <= 0:
+                    break
+
+            await self._attendre(restant)
+            caracteres = self._analyseur.reprend(nbytes)
+
+        # Avec l’écho actif, le Minitel a pu afficher la touche ou déplacer
+        # son curseur à l’insu du suivi et de l’écran modélisé
+        if caracteres and self.echo_actif:
+            self._oublie_echo()
+
+        return caracteres.decode()
+
+    async def recevoir_sequence(self, bloque = True, attente = None):
+        """Lit une séquence en provenance du Minitel
+
+        Version asynchrone de Minitel.recevoir_sequence. Si aucune séquence
+        n’est reçue, une AssertionError est levée.
+
+        :param bloque:
+            True pour attendre une séquence, False pour ne retourner qu’une
+            séquence déjà reçue ou commencée
+        :type bloque:
+            un booléen
+
+        :param attente:
+            attente maximale en secondes, None pour attendre indéfiniment
+        :type attente:
+            un entier, un flottant ou None
+
+        :returns:
+            un objet Sequence
+        """
+        assert bloque in [True, False]
+        assert isinstance(attente, (int, float)) or attente == None
+
+        await self._vider()
+
+        debut = ticks_ms()
+        evenement = self.evenement()
+        while evenement == None:
+            # Sans attente, seule une séquence déjà commencée est terminée
+            if not bloque and not self._analyseur.en_cours():
+                break
+
+            restant = None
+            if attente:
+                restant = attente * 1000 - ticks_diff(ticks_ms(), debut)
+                if restant <= 0:
+                    break
+
+            # Un ESC isolé doit être terminé après le délai de l’analyseur
+            if self._analyseur.en_cours():
+                delai = self._analyseur.delai_esc
+                restant = delai if restant == None else min(restant, delai)
+
+            await self._attendre(restant)
+            evenement = self.evenement()
+
+        # Aucune séquence reçue
+        assert evenement != None
+
+        return evenement.sequence
+
+    async def appeler(self, contenu, attente, delai = None):
+        """Envoie une séquence au Minitel et attend sa réponse.
+
+        Version asynchrone de Minitel.appeler : la réponse complète est
+        attendue jusqu’à une échéance unique, calculée d’après la vitesse de
+        la liaison, et l’attente s’achève dès que la ligne redevient
+        silencieuse. Les touches frappées pendant l’attente restent
+        disponibles pour recevoir et recevoir_sequence.
+
+        :param contenu:
+            Une séquence de caractères interprétable par la classe
+            Sequence
+        :type contenu:
+            un objet Sequence, une chaîne de caractères, une chaîne unicode
+            ou un entier
+
+        :param attente:
+            Nombre de caractères attendu de la part du Minitel en
+            réponse à notre envoi.
+        :type attente:
+            un entier
+
+        :param delai:
+            attente maximale de la réponse complète en secondes, None pour
+            la déduire de la vitesse de la liaison
+        :type delai:
+            un entier, un flottant ou None
+
+        :returns:
+            un objet Sequence contenant la réponse du Minitel à la commande
+            envoyée.
+        """
+        assert isinstance(attente, int)
+        assert delai == None or (isinstance(delai, (int, float)) and delai > 0)
+
+        envoyes, attentes, entetes = self._envoyer_lot([(contenu, attente)])
+        await self._vider()
+
+        reponses = await self._attendre_reponses(envoyes, attente, delai)
+
+        return _repartir(attentes, entetes, reponses)[0]
+
+    async def appeler_lot(self, requetes, delai = None):
+        """Version asynchrone de Minitel.appeler_lot"""
+        assert isinstance(requetes, list)
+        assert delai == None or (isinstance(delai, (int, float)) and delai > 0)
+
+        envoyes, attentes, entetes = self._envoyer_lot(requetes)
+        await self._vider()
+
+        reponses = await self._attendre_reponses(envoyes, sum(attentes), delai)
+
+        return _repartir(attentes, entetes, reponses)
+
+    async def _attendre_reponses(self, envoyes, attente, delai = None):
+        """Version asynchrone de Minitel._attendre_reponses"""
+        echeance, silence = self._delais(envoyes, attente, delai)
+
+        reponses = []
+        recus = 0
+        debut = ticks_ms()
+        dernier = None
+        while True:
+            reponse = self._analyseur.reponse()
+            while reponse != None:
+                reponses.append(reponse.sequence)
+                recus += reponse.sequence.longueur
+                reponse = self._analyseur.reponse()
+
+            if recus >= attente:
+                break
+
+            maintenant = ticks_ms()
+            restant = echeance - ticks_diff(maintenant, debut)
+            if dernier != None:
+                restant = min(restant, silence - ticks_diff(maintenant, dernier))
+            if restant <= 0:
+                break
+
+            if await self._attendre(restant):
+                dernier = ticks_ms()
+
+        return reponses
+
+    async def _dialoguer(self, dialogue):
+        """Mène un dialogue avec le Minitel (voir Minitel._dialoguer)"""
+        try:
+            requete = next(dialogue)
+            while True:
+                if isinstance(requete, list):
+                    retour = await self.appeler_lot(requete)
+                else:
+                    retour = await self.appeler(*requete)
+                requete = dialogue.send(retour)
+        except StopIteration as fin:
+            return fin.value
+
+    async def definir_mode(self, mode = 'VIDEOTEX'):
+        """Version asynchrone de Minitel.definir_mode"""
+        return await self._dialoguer(self._definir_mode(mode))
+
+    async def identifier(self):
+        """Version asynchrone de Minitel.identifier"""
+        await self._dialoguer(self._identifier())
+
+    async def deviner_vitesse(self):
+        """Version asynchrone de Minitel.deviner_vitesse"""
+        return await self._dialoguer(self._deviner_vitesse())
+
+    async def recuperation(self):
+        """Version asynchrone de Minitel.recuperation"""
+        return await self._dialoguer(self._recuperation())
+
+    async def definir_vitesse(self, vitesse):
+        """Version asynchrone de Minitel.definir_vitesse"""
+        return await self._dialoguer(self._definir_vitesse(vitesse))
+
+    async def demarrer(self, vitesse = None, fichier = FICHIER_DEMARRAGE):
+        """Version asynchrone de Minitel.demarrer"""
+        return await self._dialoguer(self._demarrer(vitesse, fichier))
+
+    async def configurer_clavier(self, etendu = False, curseur = False,
+                                 minuscule = False):
+        """Version asynchrone de Minitel.configurer_clavier"""
+        return await self._dialoguer(
+            self._configurer_clavier(etendu, curseur, minuscule)
+        )
+
+    async def echo(self, actif):
+        """Version asynchrone de Minitel.echo"""
+        return await self._dialoguer(self._echo(actif))
+
+def ouvrir_uart(uart_num = 2, ecran = False):
+    """Crée un AsyncMinitel sur un port UART (MicroPython)
+
+    La liaison est ouverte à 1200 bps, 7 bits, parité paire, comme celle de
+    Minitel. Elle n’a pas de délai de lecture : c’est uasyncio qui attend
+    l’arrivée des octets.
+
+    :param uart_num:
+        Le port uart utilisé. Par défaut, le port 2 de l'ESP32 est utilisé
+    :type uart_num:
+        un entier
+
+    :param ecran:
+        True pour tenir à jour un modèle de l’écran du Minitel, nécessaire
+        au seul rendu différentiel (image)
+    :type ecran:
+        un booléen
+
+    :returns:
+        un objet AsyncMinitel
+    """
+    liaison = LiaisonUART(uart_num, attente = 0)
+
+    flux = asyncio.StreamReader(liaison.uart)
+    return AsyncMinitel(flux, asyncio.StreamWriter(liaison.uart, {}),
+                        liaison, ecran)
+
+async def ouvrir_terminal(chemin, ecran = False):
+    """Crée un AsyncMinitel sur un port série ou un pty (CPython)
+
+    Le terminal est passé en mode brut à 1200 bps, 7 bits, parité paire.
+    Un pty permet de tester AsyncMinitel sous Linux en simulant le Minitel
+    de l’autre côté.
+
+    :param chemin:
+        chemin du terminal (par exemple /dev/ttyUSB0 ou /dev/pts/3)
+    :type chemin:
+        une chaîne de caractères
+
+    :param ecran:
+        True pour tenir à jour un modèle de l’écran du Minitel, nécessaire
+        au seul rendu différentiel (image)
+    :type ecran:
+        un booléen
+
+    :returns:
+        un objet AsyncMinitel
+    """
+    import os
+
+    # Les flux asyncio utilisent des copies du descripteur de la liaison,
+    # qui reste seule à régler la vitesse du terminal
+    liaison = LiaisonTerminal(chemin)
+    boucle = asyncio.get_running_loop()
+
+    lecteur = asyncio.StreamReader()
+    lecture, _ = await boucle.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(lecteur),
+        os.fdopen(os.dup(liaison.descripteur), 'rb', buffering = 0)
+    )
+
+    # Fermer l’écriture (méthode close) ferme aussi la lecture
+    class Ecriture(asyncio.streams.FlowControlMixin):
+        def connection_lost(self, exc):
+            super().connection_lost(exc)
+            lecture.close()
+
+    ecriture, protocole = await boucle.connect_write_pipe(
+        Ecriture, os.fdopen(os.dup(liaison.descripteur), 'wb', buffering = 0)
+    )
+    ecrivain = asyncio.StreamWriter(ecriture, protocole, lecteur, boucle)
+
+    return AsyncMinitel(lecteur, ecrivain, liaison, ecran)
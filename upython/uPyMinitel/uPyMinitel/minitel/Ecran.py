@@ -0,0 +1,990 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Ecran est un module modélisant ce qu’affiche le Minitel.
+
+"""
+
+from minitel.constantes import (BS, TAB, LF, VT, FF, CR, SO, SI, CON, COF,
+    REP, SEP, CAN, SS2, SS3, ESC, RS, US)
+
+# Jeux de caractères d’une cellule
+G0 = 0 # jeu alphanumérique
+G1 = 1 # jeu semi-graphique
+G2 = 2 # jeu des caractères spéciaux (accessible par SS2)
+DRCS = 0x04 # bit ajouté à G0 ou G1 lorsque le jeu est redéfini (G'0, G'1)
+
+# Bits des effets d’une cellule
+CLIGNOTEMENT = 0x01
+SOULIGNEMENT = 0x02
+INVERSION = 0x04
+MASQUAGE = 0x08
+
+# Tailles d’une cellule (dans l’ordre des commandes ESC 0x4c à 0x4f)
+NORMALE = 0
+DOUBLE_HAUTEUR = 1
+DOUBLE_LARGEUR = 2
+DOUBLE_TAILLE = 3
+
+# Caractère d’une cellule recouverte par un caractère double voisin
+COUVERT = 0x00
+
+# Couleurs par défaut : caractère blanc (7) sur fond noir (0)
+COULEUR_DEFAUT = 0x07
+
+# États de l’interpréteur de flux Videotex
+_NORMAL = 0
+_ESC = 1     # attente de l’octet suivant ESC
+_IGNORE = 2  # octets à ignorer (protocole, SEP, SS3…)
+_CSI = 3     # lecture des paramètres d’une séquence CSI
+_US = 4      # attente de la rangée d’un positionnement
+_US_COL = 5  # attente de la colonne d’un positionnement
+_SS2 = 6     # attente du caractère G2
+_ACCENT = 7  # attente de la lettre à accentuer
+_REP = 8     # attente du nombre de répétitions
+_DRCS = 9    # définition de caractères, jusqu’au prochain US
+_JEU = 10    # désignation d’un jeu de caractères (ESC 0x28 à 0x2b)
+_ESC_23 = 11 # attribut de zone ou d’écran (ESC 0x23)
+
+# Nombre de sextets décrivant un caractère redéfini (8 x 10 points)
+SEXTETS_DRCS = 14
+
+# Diacritiques accessibles par SS2 (grave, aigu, circonflexe, tréma, cédille)
+DIACRITIQUES = (0x41, 0x42, 0x43, 0x48, 0x4b)
+
+class Ecran:
+    """Une classe modélisant l’écran du Minitel
+
+    L’écran est décrit par des plans parallèles (un bytearray par propriété)
+    comprenant une cellule par caractère pour les rangées 0 à 24 :
+
+    - caracteres : code du caractère (COUVERT pour une cellule recouverte par
+      un caractère double),
+    - jeux : jeu du caractère (G0, G1 ou G2, plus DRCS pour un caractère
+      d’un jeu redéfini),
+    - diacritiques : accent porté par le caractère (0 si aucun),
+    - couleurs : couleur du caractère (4 bits de poids faible) et couleur de
+      fond (4 bits de poids fort),
+    - tailles : NORMALE, DOUBLE_HAUTEUR, DOUBLE_LARGEUR ou DOUBLE_TAILLE,
+    - effets : combinaison de CLIGNOTEMENT, SOULIGNEMENT, INVERSION et
+      MASQUAGE.
+
+    L’écran s’alimente en interprétant le flux d’octets envoyé au Minitel
+    (méthode traite). Il retient aussi la position du curseur et les
+    attributs en cours, qui ne sont fiables que si attributs_connus est vrai,
+    le mode insertion, le masquage de tout l’écran, les jeux G0 et G1
+    remplacés par leur version redéfinie (jeux_redefinis) et les motifs des
+    caractères redéfinis (drcs, indexé par (jeu, code), 14 sextets chacun).
+
+    Note:
+    En Videotex, la couleur de fond et le soulignement ne prennent effet
+    qu’au prochain délimiteur. Le modèle les applique directement aux
+    caractères suivants.
+    """
+    def __init__(self, colonnes = 40, lignes = 24):
+        """Constructeur d’Ecran
+
+        L’état de l’écran n’est pas connu tant qu’il n’a pas été effacé (FF)
+        et la position du curseur tant qu’elle n’a pas été définie.
+
+        :param colonnes:
+            nombre de colonnes de l’écran
+        :type colonnes:
+            un entier
+
+        :param lignes:
+            nombre de rangées de l’écran, sans compter la rangée 0
+        :type lignes:
+            un entier
+        """
+        assert colonnes in [40, 80]
+        assert isinstance(lignes, int) and lignes > 0
+
+        self.colonnes = colonnes
+        self.lignes = lignes
+
+        taille = colonnes * (lignes + 1)
+        self.caracteres = bytearray(b' ' * taille)
+        self.jeux = bytearray(taille)
+        self.diacritiques = bytearray(taille)
+        self.couleurs = bytearray(bytes([COULEUR_DEFAUT]) * taille)
+        self.tailles = bytearray(taille)
+        self.effets = bytearray(taille)
+
+        # Position du curseur, colonne à partir de 1, rangée à partir de 0
+        self.x = 1
+        self.y = 1
+        self.curseur_visible = False
+
+        # Indique si la position du curseur et le contenu sont fiables
+        self.curseur_connu = False
+        self.contenu_connu = False
+
+        # Position à retrouver en quittant la rangée 0 (None si inconnue)
+        self._retour = None
+
+        # Dernier caractère affiché (pour REP)
+        self._dernier = None
+
+        # Mode insertion (CSI 4 h), masquage de l’écran (ESC 0x23 0x20 0x58),
+        # jeux redéfinis désignés pour G0 et G1 et motifs des caractères
+        # redéfinis
+        self.insertion = False
+        self.masquage_ecran = False
+        self.jeux_redefinis = [False, False]
+        self.drcs = {}
+        self._drcs_jeu = G0
+
+        # État de l’interpréteur
+        self._etat = _NORMAL
+        self._reste = 0
+        self._parametres = bytearray()
+        self._ligne_us = 0
+
+        self.reinitialise_attributs()
+        self.attributs_connus = False
+
+    def reinitialise_attributs(self):
+        """Remet les attributs en cours à leur valeur par défaut
+
+        Le Minitel le fait de lui-même à chaque changement de rangée, à
+        chaque positionnement et à chaque effacement de l’écran.
+        """
+        self.avant_plan = 7
+        self.fond = 0
+        self.taille = NORMALE
+        self.effet = 0
+        self.jeu = G0
+        self.attributs_connus = True
+
+    def attributs_par_defaut(self):
+        """Indique si les attributs en cours sont connus et par défaut
+
+        :returns:
+            True si un RS ou un US ne changerait pas les attributs en cours
+        """
+        return (self.attributs_connus and self.avant_plan == 7 and
+                self.fond == 0 and self.taille == NORMALE and
+                self.effet == 0 and self.jeu == G0)
+
+    def au_repos(self):
+        """Indique si aucune séquence n’est en cours d’interprétation
+
+        :returns:
+            True si le flux peut être coupé à cet endroit sans laisser de
+            séquence inachevée
+        """
+        return self._etat == _NORMAL
+
+    def oublie(self):
+        """Déclare le contenu de l’écran et la position du curseur inconnus
+
+        À utiliser lorsque le Minitel a pu modifier son écran sans que le
+        flux ait été interprété (écho clavier, changement de mode…).
+        """
+        self.curseur_connu = False
+        self.contenu_connu = False
+        self.attributs_connus = False
+
+    def index(self, colonne, ligne):
+        """Retourne l’indice d’une cellule dans les plans
+
+        :param colonne:
+            colonne de la cellule, à partir de 1
+        :type colonne:
+            un entier
+
+        :param ligne:
+            rangée de la cellule, à partir de 0
+        :type ligne:
+            un entier
+
+        :returns:
+            un entier
+        """
+        return ligne * self.colonnes + colonne - 1
+
+    def cellule(self, colonne, ligne):
+        """Retourne le contenu d’une cellule
+
+        :returns:
+            un tuple (caractère, jeu, diacritique, couleurs, taille, effets)
+        """
+        i = self.index(colonne, ligne)
+        return (self.caracteres[i], self.jeux[i], self.diacritiques[i],
+                self.couleurs[i], self.tailles[i], self.effets[i])
+
+    def texte(self, ligne):
+        """Retourne le texte d’une rangée
+
+        Les caractères du jeu G0 sont restitués tels quels, les autres sont
+        remplacés par un point d’interrogation.
+
+        :param ligne:
+            la rangée, à partir de 0
+        :type ligne:
+            un entier
+
+        :returns:
+            une chaîne de caractères
+        """
+        debut = self.index(1, ligne)
+        texte = ''
+        for i in range(debut, debut + self.colonnes):
+            if self.caracteres[i] == COUVERT:
+                continue
+            if self.jeux[i] == G0:
+                texte += chr(self.caracteres[i])
+            else:
+                texte += '?'
+        return texte
+
+    def efface(self, debut = None, fin = None):
+        """Efface des cellules
+
+        Sans paramètre, efface les rangées 1 à 24 comme le fait FF et
+        replace le curseur en haut à gauche.
+
+        :param debut:
+            indice de la première cellule à effacer
+        :type debut:
+            un entier ou None
+
+        :param fin:
+            indice suivant la dernière cellule à effacer
+        :type fin:
+            un entier ou None
+        """
+        if debut == None:
+            self.efface(self.index(1, 1), len(self.caracteres))
+            self.place(1, 1)
+            self.contenu_connu = True
+            return
+
+        for i in range(debut, fin):
+            self.caracteres[i] = 0x20
+            self.jeux[i] = G0
+            self.diacritiques[i] = 0
+            self.couleurs[i] = COULEUR_DEFAUT
+            self.tailles[i] = NORMALE
+            self.effets[i] = 0
+
+    def place(self, colonne, ligne):
+        """Déplace le curseur à une position absolue
+
+        Les attributs en cours reviennent à leur valeur par défaut.
+        """
+        if ligne == 0 and self.y != 0:
+            self._retour = (self.x, self.y) if self.curseur_connu else None
+
+        self.x = max(1, min(colonne, self.colonnes))
+        self.y = max(0, min(ligne, self.lignes))
+        self.curseur_connu = True
+        self.reinitialise_attributs()
+
+    def _change_ligne(self, ligne):
+        """Change la rangée du curseur
+
+        Les rangées se suivent de façon circulaire de 1 à 24 (mode page). La
+        rangée 0 n’est quittée que par un LF, qui ramène le curseur à sa
+        position d’avant l’entrée en rangée 0.
+        """
+        if self.y == 0:
+            if ligne > 0:
+                if self._retour == None:
+                    (self.x, self.y) = (1, 1)
+                    self.curseur_connu = False
+                else:
+                    (self.x, self.y) = self._retour
+                self.reinitialise_attributs()
+            return
+
+        if ligne < 1:
+            ligne = self.lignes
+        elif ligne > self.lignes:
+            ligne = 1
+
+        if ligne != self.y:
+            self.y = ligne
+            self.reinitialise_attributs()
+
+    def _avance(self, pas = 1):
+        """Avance le curseur après l’affichage d’un caractère"""
+        self.x += pas
+        if self.x > self.colonnes:
+            if self.y == 0:
+                self.x = self.colonnes
+            else:
+                self.x = 1
+                self._change_ligne(self.y + 1)
+
+    def _recule(self):
+        """Recule le curseur d’une colonne"""
+        self.x -= 1
+        if self.x < 1:
+            if self.y == 0:
+                self.x = 1
+            else:
+                self.x = self.colonnes
+                self._change_ligne(self.y - 1)
+
+    def ecrit(self, caractere, jeu = None, diacritique = 0):
+        """Écrit un caractère à la position du curseur
+
+        Le caractère prend les attributs en cours, puis le curseur avance.
+        En mode insertion, la fin de la rangée est d’abord décalée vers la
+        droite.
+
+        :param caractere:
+            code du caractère
+        :type caractere:
+            un entier
+
+        :param jeu:
+            jeu du caractère, le jeu en cours (éventuellement redéfini) si
+            None
+        :type jeu:
+            un entier ou None
+
+        :param diacritique:
+            accent porté par le caractère
+        :type diacritique:
+            un entier
+        """
+        if jeu == None:
+            jeu = self.jeu
+            if self.jeux_redefinis[jeu]:
+                jeu |= DRCS
+
+        x = self.x
+        y = self.y
+        i = self.index(x, y)
+
+        largeur = 1
+        if self.taille & DOUBLE_LARGEUR and x < self.colonnes:
+            largeur = 2
+
+        if self.insertion:
+            self._insere(i, self.index(1, y) + self.colonnes, largeur)
+
+        # Un caractère double remplacé libère les cellules qu’il recouvrait
+        ancienne = self.tailles[i] & ~self.taille
+        if ancienne:
+            self._decouvre(i, ancienne)
+
+        self.caracteres[i] = caractere
+        self.jeux[i] = jeu
+        self.diacritiques[i] = diacritique
+        self.couleurs[i] = self.avant_plan | self.fond << 4
+        self.tailles[i] = self.taille
+        self.effets[i] = self.effet
+        self._dernier = (caractere, jeu, diacritique)
+
+        # Les caractères doubles recouvrent leurs voisins de droite et/ou du
+        # dessus
+        if largeur == 2:
+            self._couvre(i + 1, i)
+        if self.taille & DOUBLE_HAUTEUR and y > 1:
+            self._couvre(i - self.colonnes, i)
+            if largeur == 2:
+                self._couvre(i - self.colonnes + 1, i)
+
+        self._avance(largeur)
+
+    def _insere(self, i, fin, nombre):
+        """Décale vers fin les cellules de i à fin, en perdant celles qui
+        dépassent, et efface les nombre cellules libérées à partir de i"""
+        nombre = min(nombre, fin - i)
+        for plan in (self.caracteres, self.jeux, self.diacritiques,
+                     self.couleurs, self.tailles, self.effets):
+            plan[i + nombre:fin] = plan[i:fin - nombre]
+        self.efface(i, i + nombre)
+
+    def _supprime(self, i, fin, nombre):
+        """Supprime les nombre cellules à partir de i en ramenant les
+        suivantes jusqu’à fin, et efface les cellules libérées avant fin"""
+        nombre = min(nombre, fin - i)
+        for plan in (self.caracteres, self.jeux, self.diacritiques,
+                     self.couleurs, self.tailles, self.effets):
+            plan[i:fin - nombre] = plan[i + nombre:fin]
+        self.efface(fin - nombre, fin)
+
+    def _decouvre(self, i, taille):
+        """Libère les cellules recouvertes par le caractère de la cellule i"""
+        x = i % self.colonnes + 1
+        y = i // self.colonnes
+        liberees = []
+        if taille & DOUBLE_LARGEUR and x < self.colonnes:
+            liberees.append(i + 1)
+        if taille & DOUBLE_HAUTEUR and y > 1:
+            liberees.append(i - self.colonnes)
+            if self.tailles[i] & DOUBLE_LARGEUR and x < self.colonnes:
+                liberees.append(i - self.colonnes + 1)
+
+        for j in liberees:
+            if self.caracteres[j] == COUVERT and not self._couverte(j, i):
+                self.caracteres[j] = 0x20
+
+    def _couverte(self, j, sauf):
+        """Indique si la cellule j est recouverte par un autre caractère
+        double que celui de la cellule sauf"""
+        colonnes = self.colonnes
+        x = j % colonnes + 1
+        y = j // colonnes
+
+        # Voisine de gauche en double largeur
+        if (x > 1 and j - 1 != sauf and self.caracteres[j - 1] != COUVERT
+                and self.tailles[j - 1] & DOUBLE_LARGEUR):
+            return True
+
+        if y >= self.lignes:
+            return False
+
+        # Voisine du dessous en double hauteur
+        k = j + colonnes
+        if (k != sauf and self.caracteres[k] != COUVERT
+                and self.tailles[k] & DOUBLE_HAUTEUR):
+            return True
+
+        # Voisine du dessous à gauche en double taille
+        k -= 1
+        return (x > 1 and k != sauf and self.caracteres[k] != COUVERT
+                and self.tailles[k] == DOUBLE_TAILLE)
+
+    def _couvre(self, i, proprietaire):
+        """Marque la cellule i comme recouverte par le caractère double de la
+        cellule proprietaire"""
+        if self.tailles[i]:
+            self._decouvre(i, self.tailles[i])
+
+        self.caracteres[i] = COUVERT
+        self.jeux[i] = G0
+        self.diacritiques[i] = 0
+        self.couleurs[i] = self.couleurs[proprietaire]
+        self.tailles[i] = NORMALE
+        self.effets[i] = 0
+
+    def traite(self, octets):
+        """Interprète un flux d’octets envoyé au Minitel
+
+        Le flux peut être découpé n’importe où : une séquence commencée dans
+        un appel est terminée par le suivant.
+
+        :param octets:
+            les octets envoyés au Minitel
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+        """
+        for octet in octets:
+            etat = self._etat
+
+            if etat == _NORMAL:
+                if octet >= 0x20:
+                    self.ecrit(octet)
+                else:
+                    self._controle(octet)
+            elif etat == _ESC:
+                self._echappement(octet)
+            elif etat == _IGNORE:
+                self._reste -= 1
+                if self._reste <= 0:
+                    self._etat = _NORMAL
+            elif etat == _CSI:
+                if 0x30 <= octet <= 0x3f:
+                    self._parametres.append(octet)
+                else:
+                    self._etat = _NORMAL
+                    self._csi(octet)
+            elif etat == _US:
+                if octet == 0x23:
+                    # US 0x23 débute une définition de caractères
+                    self._parametres = bytearray()
+                    self._etat = _DRCS
+                else:
+                    self._ligne_us = octet
+                    self._etat = _US_COL
+            elif etat == _US_COL:
+                self._etat = _NORMAL
+                self._positionne(self._ligne_us, octet)
+            elif etat == _SS2:
+                if octet in DIACRITIQUES:
+                    self._parametres = bytearray([octet])
+                    self._etat = _ACCENT
+                else:
+                    self._etat = _NORMAL
+                    self.ecrit(octet, G2)
+            elif etat == _ACCENT:
+                self._etat = _NORMAL
+                self.ecrit(octet, G0, self._parametres[0])
+            elif etat == _REP:
+                self._etat = _NORMAL
+                self._repete(octet - 0x40)
+            elif etat == _DRCS:
+                if octet == US:
+                    self._etat = _US
+                    self._definit(self._parametres)
+                else:
+                    self._parametres.append(octet)
+            elif etat == _JEU:
+                # Les octets intermédiaires (0x20 à 0x2f) précèdent l’octet
+                # final qui termine la désignation
+                self._parametres.append(octet)
+                if octet >= 0x30:
+                    self._etat = _NORMAL
+                    self._designe(self._parametres)
+            elif etat == _ESC_23:
+                self._parametres.append(octet)
+                if len(self._parametres) == 2:
+                    self._etat = _NORMAL
+                    if self._parametres == b'\x20\x58':
+                        self.masquage_ecran = True
+                    elif self._parametres == b'\x20\x5f':
+                        self.masquage_ecran = False
+
+    def _controle(self, octet):
+        """Interprète un code de contrôle C0"""
+        if octet == BS:
+            self._recule()
+        elif octet == TAB:
+            self._avance()
+        elif octet == LF:
+            self._change_ligne(self.y + 1)
+        elif octet == VT:
+            if self.y != 0:
+                self._change_ligne(self.y - 1)
+        elif octet == FF:
+            self.efface()
+        elif octet == CR:
+            self.x = 1
+        elif octet == SO:
+            self.jeu = G1
+        elif octet == SI:
+            self.jeu = G0
+        elif octet == CON:
+            self.curseur_visible = True
+        elif octet == COF:
+            self.curseur_visible = False
+        elif octet == REP:
+            self._etat = _REP
+        elif octet == SEP or octet == SS3:
+            self._etat = _IGNORE
+            self._reste = 1
+        elif octet == CAN:
+            i = self.index(self.x, self.y)
+            self.efface(i, self.index(1, self.y) + self.colonnes)
+        elif octet == SS2:
+            self._etat = _SS2
+        elif octet == ESC:
+            self._etat = _ESC
+        elif octet == RS:
+            self.place(1, 1)
+        elif octet == US:
+            self._etat = _US
+
+    def _echappement(self, octet):
+        """Interprète l’octet suivant un ESC"""
+        self._etat = _NORMAL
+
+        if 0x40 <= octet <= 0x47:
+            self.avant_plan = octet - 0x40
+        elif 0x50 <= octet <= 0x57:
+            self.fond = octet - 0x50
+        elif 0x4c <= octet <= 0x4f:
+            taille = octet - 0x4c
+            # Les tailles doubles sont interdites en rangées 0 et 1
+            if self.y > 1 or not taille & DOUBLE_HAUTEUR:
+                self.taille = taille
+        elif octet == 0x48:
+            self.effet |= CLIGNOTEMENT
+        elif octet == 0x49:
+            self.effet &= ~CLIGNOTEMENT
+        elif octet == 0x5a:
+            self.effet |= SOULIGNEMENT
+        elif octet == 0x59:
+            self.effet &= ~SOULIGNEMENT
+        elif octet == 0x5d:
+            self.effet |= INVERSION
+        elif octet == 0x5c:
+            self.effet &= ~INVERSION
+        elif octet == 0x58:
+            self.effet |= MASQUAGE
+        elif octet == 0x5f:
+            self.effet &= ~MASQUAGE
+        elif octet == 0x5b:
+            self._parametres = bytearray()
+            self._etat = _CSI
+        elif octet in (0x39, 0x3a, 0x3b):
+            # Commandes protocole PRO1, PRO2 et PRO3
+            self._etat = _IGNORE
+            self._reste = octet - 0x38
+        elif 0x28 <= octet <= 0x2b:
+            self._parametres = bytearray([octet])
+            self._etat = _JEU
+        elif octet == 0x23:
+            self._parametres = bytearray()
+            self._etat = _ESC_23
+
+    def _designe(self, sequence):
+        """Exécute une désignation de jeu de caractères
+
+        ESC 0x28 0x20 0x42 et ESC 0x29 0x20 0x43 remplacent G0 et G1 par
+        leur version redéfinie, ESC 0x28 0x42 et ESC 0x29 0x63 rétablissent
+        les jeux d’origine.
+        """
+        if sequence[0] in (0x28, 0x29):
+            self.jeux_redefinis[sequence[0] - 0x28] = 0x20 in sequence
+
+    def _definit(self, definition):
+        """Exécute une définition de caractères (entre US 0x23 et US)
+
+        L’en-tête 0x20 0x20 0x20 0x42 (ou 0x43) 0x49 choisit le jeu G0 (ou
+        G1) à redéfinir. Sinon, le premier octet est le code du premier
+        caractère suivi de 0x30, puis chaque caractère est décrit par
+        SEXTETS_DRCS octets 0x40 à 0x7f, ou moins s’il se termine par 0x30.
+        """
+        if definition[:3] == b'\x20\x20\x20':
+            if len(definition) > 3:
+                self._drcs_jeu = G1 if definition[3] == 0x43 else G0
+            return
+
+        if len(definition) < 2 or definition[1] != 0x30:
+            return
+
+        code = definition[0]
+        motif = bytearray()
+        complet = False
+        for octet in definition[2:]:
+            if octet == 0x30:
+                # Fin anticipée d’un motif, sauf juste après un motif complet
+                if not complet:
+                    self.drcs[(self._drcs_jeu, code)] = bytes(
+                        motif + bytes(SEXTETS_DRCS - len(motif)))
+                    code += 1
+                    motif = bytearray()
+                complet = False
+            elif octet >= 0x40:
+                motif.append(octet - 0x40)
+                complet = False
+                if len(motif) == SEXTETS_DRCS:
+                    self.drcs[(self._drcs_jeu, code)] = bytes(motif)
+                    code += 1
+                    motif = bytearray()
+                    complet = True
+
+        if motif:
+            self.drcs[(self._drcs_jeu, code)] = bytes(
+                motif + bytes(SEXTETS_DRCS - len(motif)))
+
+    def _csi(self, final):
+        """Exécute une séquence CSI terminée par l’octet final"""
+        parametres = bytes(self._parametres).decode().split(';')
+        if parametres[0].startswith('?'):
+            # Changement de mode, sans effet sur l’écran
+            return
+
+        if final in (0x68, 0x6c):
+            # h et l : début et fin du mode insertion (paramètre 4)
+            if parametres[0] == '4':
+                self.insertion = final == 0x68
+            return
+
+        valeurs = []
+        for parametre in parametres:
+            valeurs.append(int(parametre) if parametre.isdigit() else 0)
+        n = valeurs[0]
+        ligne_debut = self.index(1, self.y)
+
+        if final in (0x4a, 0x4b, 0x40, 0x50, 0x4c, 0x4d):
+            # Le sort des attributs en cours après un effacement, une
+            # insertion ou une suppression varie selon les modèles de Minitel
+            self.attributs_connus = False
+
+        if final == 0x41:   # A : haut
+            self._change_ligne(max(1, self.y - max(n, 1)))
+        elif final == 0x42: # B : bas
+            self._change_ligne(min(self.lignes, self.y + max(n, 1)))
+        elif final == 0x43: # C : droite
+            self.x = min(self.colonnes, self.x + max(n, 1))
+        elif final == 0x44: # D : gauche
+            self.x = max(1, self.x - max(n, 1))
+        elif final == 0x48: # H : position absolue
+            colonne = valeurs[1] if len(valeurs) > 1 else 1
+            self.place(min(max(colonne, 1), self.colonnes),
+                       min(max(n, 1), self.lignes))
+        elif final == 0x4a: # J : effacement dans l’écran
+            i = self.index(self.x, self.y)
+            if n == 0:
+                self.efface(i, len(self.caracteres))
+            elif n == 1:
+                self.efface(self.index(1, 1), i + 1)
+            elif n == 2:
+                self.efface(self.index(1, 1), len(self.caracteres))
+        elif final == 0x4b: # K : effacement dans la rangée
+            i = self.index(self.x, self.y)
+            if n == 0:
+                self.efface(i, ligne_debut + self.colonnes)
+            elif n == 1:
+                self.efface(ligne_debut, i + 1)
+            elif n == 2:
+                self.efface(ligne_debut, ligne_debut + self.colonnes)
+        elif final == 0x40: # @ : insertion de caractères
+            self._insere(self.index(self.x, self.y),
+                         ligne_debut + self.colonnes, max(n, 1))
+        elif final == 0x50: # P : suppression de caractères
+            self._supprime(self.index(self.x, self.y),
+                           ligne_debut + self.colonnes, max(n, 1))
+        elif final in (0x4c, 0x4d) and self.y > 0:
+            # L et M : insertion et suppression de rangées, le curseur
+            # revient en début de rangée
+            fin = len(self.caracteres)
+            nombre = max(n, 1) * self.colonnes
+            if final == 0x4c:
+                self._insere(ligne_debut, fin, nombre)
+            else:
+                self._supprime(ligne_debut, fin, nombre)
+            self.x = 1
+        elif final not in (0x4c, 0x4d):
+            # Séquence inconnue
+            self.contenu_connu = False
+
+    def _positionne(self, ligne, colonne):
+        """Exécute un positionnement US
+
+        Un positionnement hors de l’écran est ignoré.
+        """
+        if ligne >= 0x40 and colonne >= 0x40:
+            colonne -= 0x40
+            ligne -= 0x40
+        elif ligne >= 0x30 and colonne >= 0x30:
+            # Positionnement en décimal : US, dizaine, unité de la rangée
+            # suivis de la colonne à 1
+            ligne = (ligne - 0x30) * 10 + colonne - 0x30
+            colonne = 1
+        else:
+            return
+
+        if 1 <= colonne <= self.colonnes and ligne <= self.lignes:
+            self.place(colonne, ligne)
+
+    def _repete(self, nombre):
+        """Répète le dernier caractère affiché
+
+        Sans dernier caractère connu, le contenu et la position du curseur
+        deviennent inconnus.
+        """
+        if self._dernier == None:
+            if nombre > 0:
+                self.curseur_connu = False
+                self.contenu_connu = False
+            return
+
+        (caractere, jeu, diacritique) = self._dernier
+        for _ in range(nombre):
+            self.ecrit(caractere, jeu, diacritique)
+
+class Suivi:
+    """Une classe retenant la position du curseur et les attributs en cours
+
+    Sans modéliser l’écran, le suivi retient ce que les méthodes de Minitel
+    savent de leurs propres envois : position du curseur, couleurs, taille,
+    effets et jeu G0 ou G1. Il offre les mêmes attributs et méthodes que la
+    classe Ecran pour ces informations, qui ne sont fiables que si
+    curseur_connu et attributs_connus sont vrais.
+
+    Tout envoi que le suivi ne sait pas interpréter (méthode traite) rend le
+    curseur et les attributs inconnus, sauf s’il ne contient que des
+    caractères affichables.
+    """
+    def __init__(self, colonnes = 40, lignes = 24):
+        self.colonnes = colonnes
+        self.lignes = lignes
+
+        self.x = 1
+        self.y = 1
+        self.curseur_connu = False
+
+        self.reinitialise_attributs()
+        self.attributs_connus = False
+
+    def reinitialise_attributs(self):
+        """Remet les attributs en cours à leur valeur par défaut"""
+        self.avant_plan = 7
+        self.fond = 0
+        self.taille = NORMALE
+        self.effet = 0
+        self.jeu = G0
+        self.attributs_connus = True
+
+    def attributs_par_defaut(self):
+        """Indique si les attributs en cours sont connus et par défaut
+
+        :returns:
+            True si un RS ou un US ne changerait pas les attributs en cours
+        """
+        return (self.attributs_connus and self.avant_plan == 7 and
+                self.fond == 0 and self.taille == NORMALE and
+                self.effet == 0 and self.jeu == G0)
+
+    def oublie(self):
+        """Déclare la position du curseur et les attributs inconnus"""
+        self.curseur_connu = False
+        self.attributs_connus = False
+
+    def place(self, colonne, ligne):
+        """Suit un positionnement absolu (RS, US ou FF)
+
+        Un positionnement hors de l’écran, ignoré par le Minitel, rend le
+        curseur et les attributs inconnus.
+        """
+        if not (1 <= colonne <= self.colonnes and 0 <= ligne <= self.lignes):
+            self.oublie()
+            return
+
+        self.x = colonne
+        self.y = ligne
+        self.curseur_connu = True
+        self.reinitialise_attributs()
+
+    def deplace(self, colonne, ligne):
+        """Suit un déplacement relatif du curseur
+
+        Seuls les déplacements restant dans les rangées 1 à 24 sont suivis.
+        Un changement de rangée remet les attributs à leur valeur par défaut.
+        """
+        if colonne == 0 and ligne == 0:
+            return
+
+        x = self.x + colonne
+        y = self.y + ligne
+        if (not self.curseur_connu or self.y == 0
+            or not (1 <= x <= self.colonnes and 1 <= y <= self.lignes)):
+            self.oublie()
+            return
+
+        self.x = x
+        if y != self.y:
+            self.y = y
+            self.reinitialise_attributs()
+
+    def avance(self, nombre):
+        """Suit l’affichage de caractères avec les attributs en cours
+
+        :param nombre:
+            nombre de caractères affichés
+        :type nombre:
+            un entier
+        """
+        if not self.curseur_connu or not self.attributs_connus:
+            # Un changement de rangée a pu avoir lieu, ou la largeur des
+            # caractères est inconnue
+            self.oublie()
+            return
+
+        x = self.x
+        if self.taille & DOUBLE_LARGEUR:
+            # Un caractère double largeur en dernière colonne n’en occupe
+            # qu’une
+            for _ in range(nombre):
+                x += 2 if x < self.colonnes else 1
+                if x > self.colonnes:
+                    break
+        else:
+            x += nombre
+
+        if x <= self.colonnes:
+            self.x = x
+        elif self.y == 0:
+            # La rangée 0 garde le curseur en dernière colonne
+            self.x = self.colonnes
+        elif self.taille & DOUBLE_LARGEUR:
+            # La suite déborde sur une autre rangée, à une colonne inconnue
+            self.curseur_connu = False
+            self.reinitialise_attributs()
+        else:
+            # Les rangées se suivent de façon circulaire de 1 à 24
+            self.y = (self.y - 1 + (x - 1) // self.colonnes) % self.lignes + 1
+            self.x = (x - 1) % self.colonnes + 1
+            self.reinitialise_attributs()
+
+    def attributs(self, octets):
+        """Suit des séquences ESC de couleur, de taille ou d’effet
+
+        :param octets:
+            suite de séquences de deux octets, ESC suivi de la commande
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+        """
+        for i in range(1, len(octets), 2):
+            octet = octets[i]
+            if 0x40 <= octet <= 0x47:
+                self.avant_plan = octet - 0x40
+            elif 0x50 <= octet <= 0x57:
+                self.fond = octet - 0x50
+            elif 0x4c <= octet <= 0x4f:
+                taille = octet - 0x4c
+                # Les tailles doubles sont interdites en rangées 0 et 1
+                if not taille & DOUBLE_HAUTEUR:
+                    self.taille = taille
+                elif self.curseur_connu and self.y > 1:
+                    self.taille = taille
+                else:
+                    self.attributs_connus = False
+            elif octet == 0x48:
+                self.effet |= CLIGNOTEMENT
+            elif octet == 0x49:
+                self.effet &= ~CLIGNOTEMENT
+            elif octet == 0x5a:
+                self.effet |= SOULIGNEMENT
+            elif octet == 0x59:
+                self.effet &= ~SOULIGNEMENT
+            elif octet == 0x5d:
+                self.effet |= INVERSION
+            elif octet == 0x5c:
+                self.effet &= ~INVERSION
+
+    def traite(self, octets):
+        """Suit un envoi quelconque
+
+        Seule une suite de caractères affichables est suivie. Tout autre
+        envoi rend le curseur et les attributs inconnus.
+
+        :param octets:
+            les octets envoyés au Minitel
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+        """
+        if not octets:
+            return
+
+        if min(octets) >= 0x20 and max(octets) < 0x7f:
+            self.avance(len(octets))
+        else:
+            self.oublie()
+
+def interprete(octets, colonnes = 40, lignes = 24):
+    """Retourne l’écran qu’affiche un Minitel après un flux d’octets
+
+    Le flux est interprété depuis un écran effacé, curseur en haut à gauche
+    et attributs par défaut.
+
+    :param octets:
+        les octets envoyés au Minitel
+    :type octets:
+        un objet bytes, bytearray ou memoryview
+
+    :param colonnes:
+        nombre de colonnes de l’écran
+    :type colonnes:
+        un entier
+
+    :param lignes:
+        nombre de rangées de l’écran, sans compter la rangée 0
+    :type lignes:
+        un entier
+
+    :returns:
+        un objet Ecran
+    """
+    ecran = Ecran(colonnes, lignes)
+    ecran.efface()
+    ecran.traite(octets)
+    return ecran
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Emulateur est un module simulant un Minitel au bout d’une liaison.
+
+L’émulateur répond aux commandes protocole comme un Minitel 1B ou un
+Minitel 2, interprète le flux Videotex dans un modèle d’écran (Ecran) et
+mesure le temps que la liaison aurait mis à transmettre les octets. Il
+permet d’exercer la classe Minitel et les éléments d’interface sans
+Minitel réel.
+
+Exemple d’utilisation :
+
+>>> cote_minitel, cote_ordinateur = boucle()
+>>> emulateur = Emulateur(cote_minitel)
+>>> minitel = Minitel(liaison = cote_ordinateur)
+>>> minitel.identifier()
+>>> minitel.capacite['nom']
+'Minitel 2'
+"""
+
+from minitel.Ecran import Ecran           # Modèle de l’écran du Minitel
+from minitel.Sequence import Sequence     # Gestion des séquences de caractères
+from minitel.temps import sleep_ms
+
+from minitel.constantes import (SOH, EOT, SEP, ESC, ENQROM, STATUS_TERMINAL,
+    STATUS_FONCTIONNEMENT, STATUS_VITESSE, RESET, REP_STATUS_TERMINAL,
+    REP_STATUS_FONCTIONNEMENT, REP_STATUS_VITESSE, REP_STATUS_CLAVIER, PROG,
+    START, STOP, ROULEAU, PROCEDURE, MINUSCULES, TELINFO, MIXTE1, MIXTE2,
+    AIGUILLAGE_ON, AIGUILLAGE_OFF, AIGUILLAGE_FROM, RCPT_CLAVIER, RCPT_MODEM,
+    EMET_CLAVIER, ETEN, C0, B300, B1200, B4800, B9600, TYPE_MINITELS,
+    BITS_PAR_CARACTERE)
+
+# Codes de programmation de chaque vitesse (PRO2 PROG et STATUS_VITESSE)
+CODES_VITESSE = {300: B300, 1200: B1200, 4800: B4800, 9600: B9600}
+
+# Bits de l’octet de statut fonctionnement
+_80COLONNES = 0x01
+_ROULEAU = 0x02
+_PROCEDURE = 0x04
+_MINUSCULES = 0x08
+
+# Bits de l’octet de statut clavier
+_ETENDU = 0x01
+_CURSEUR = 0x04
+
+# Bits de fonctionnement correspondant aux codes PRO2 START/STOP
+_FONCTIONS = {ROULEAU: _ROULEAU, PROCEDURE: _PROCEDURE,
+              MINUSCULES: _MINUSCULES}
+
+class Emulateur:
+    """Un Minitel simulé
+
+    L’émulateur s’installe à une extrémité d’une liaison en mémoire (voir
+    minitel.liaison.boucle) et traite chaque envoi dès son écriture. Il
+    répond aux commandes suivantes :
+
+    - PRO1 ENQROM, STATUS_TERMINAL, STATUS_FONCTIONNEMENT, STATUS_VITESSE
+      et RESET,
+    - PRO2 PROG (changement de vitesse), PRO2 START/STOP pour le rouleau,
+      la procédure et les minuscules, changements de mode Videotex, Mixte
+      et Téléinformatique (seulement pour un Minitel 80 colonnes),
+    - PRO3 START/STOP pour le clavier étendu et les touches du curseur,
+      PRO3 AIGUILLAGE_ON/OFF (l’écho du clavier),
+    - CSI ? { qui ramène du mode Téléinformatique au mode Videotex.
+
+    Comme sur une vraie liaison série, les octets échangés alors que
+    l’ordinateur et l’émulateur ne sont pas à la même vitesse sont perdus.
+
+    Seul le mode Videotex est modélisé à l’écran.
+
+    :ivar ecran:
+        modèle de ce qu’affiche l’émulateur (objet Ecran)
+    :ivar mode:
+        mode courant : VIDEOTEX, MIXTE ou TELEINFORMATIQUE
+    :ivar vitesse:
+        vitesse de l’émulateur en bits par seconde
+    :ivar capacite:
+        caractéristiques du Minitel simulé (voir constantes.TYPE_MINITELS)
+    :ivar echo:
+        True si les touches tapées sont affichées
+    :ivar temps_reception:
+        durée en millisecondes de la transmission des octets reçus
+    :ivar temps_emission:
+        durée en millisecondes de la transmission des octets émis
+    :ivar octets_recus:
+        nombre d’octets reçus de l’ordinateur
+    """
+    def __init__(self, liaison, type_minitel = 'v', constructeur = 'B',
+                 version = '4', vitesse = 1200, temps_reel = False):
+        """Constructeur d’Emulateur
+
+        :param liaison:
+            l’extrémité de la liaison en mémoire côté Minitel
+        :type liaison:
+            un objet LiaisonMemoire
+
+        :param type_minitel:
+            code du type de Minitel retourné par ENQROM ('u' pour un
+            Minitel 1B, 'v' pour un Minitel 2…)
+        :type type_minitel:
+            une chaîne de caractères
+
+        :param constructeur:
+            code du constructeur retourné par ENQROM
+        :type constructeur:
+            une chaîne de caractères
+
+        :param version:
+            version du logiciel retournée par ENQROM
+        :type version:
+            une chaîne de caractères
+
+        :param vitesse:
+            vitesse initiale de l’émulateur en bits par seconde
+        :type vitesse:
+            un entier
+
+        :param temps_reel:
+            True pour que chaque envoi prenne le temps de sa transmission à
+            la vitesse courante, False pour ne faire que le mesurer
+        :type temps_reel:
+            un booléen
+        """
+        assert type_minitel in TYPE_MINITELS
+        assert len(constructeur) == 1 and len(version) == 1
+        assert vitesse in CODES_VITESSE
+        assert temps_reel in [True, False]
+
+        self.liaison = liaison
+        self.identite = bytes([SOH]) + (constructeur + type_minitel +
+                                        version).encode() + bytes([EOT])
+        self.capacite = dict(TYPE_MINITELS[type_minitel])
+        self.vitesse = vitesse
+        self.temps_reel = temps_reel
+
+        self.temps_reception = 0
+        self.temps_emission = 0
+        self.octets_recus = 0
+
+        self.reinitialise()
+
+        liaison.reception = self.recoit
+
+    def reinitialise(self):
+        """Ramène l’émulateur dans son état d’allumage
+
+        La vitesse est conservée.
+        """
+        self.ecran = Ecran()
+        self.mode = 'VIDEOTEX'
+        self.echo = True
+        self.fonctionnement = 0
+        self.clavier = 0
+
+        # Commande en cours de réception, depuis son ESC
+        self._commande = bytearray()
+
+    def duree(self, nombre):
+        """Retourne la durée de transmission d’octets à la vitesse courante
+
+        :param nombre:
+            nombre d’octets
+        :type nombre:
+            un entier
+
+        :returns:
+            la durée en millisecondes
+        """
+        return nombre * BITS_PAR_CARACTERE * 1000 / self.vitesse
+
+    def _synchronise(self):
+        """Indique si l’ordinateur est réglé à la vitesse de l’émulateur"""
+        return self.liaison.autre.vitesse == self.vitesse
+
+    def recoit(self, octets):
+        """Traite des octets envoyés par l’ordinateur
+
+        :param octets:
+            les octets reçus
+        :type octets:
+            un objet bytes
+        """
+        duree = self.duree(len(octets))
+        self.temps_reception += duree
+        if self.temps_reel:
+            sleep_ms(int(duree))
+
+        # Reçus à une autre vitesse, les octets sont illisibles
+        if not self._synchronise():
+            return
+
+        self.octets_recus += len(octets)
+
+        # Sans commande possible, le flux va directement à l’écran
+        if not self._commande and bytes([ESC]) not in octets:
+            if self.mode == 'VIDEOTEX':
+                self.ecran.traite(octets)
+            return
+
+        for i in range(len(octets)):
+            octet = octets[i]
+            if self.mode == 'VIDEOTEX':
+                self.ecran.traite(octets[i:i + 1])
+
+            if self._commande:
+                self._commande.append(octet)
+                self._analyse()
+            elif octet == ESC:
+                self._commande.append(octet)
+
+    def _analyse(self):
+        """Exécute la commande en cours si elle est complète"""
+        commande = self._commande
+        introducteur = commande[1]
+
+        if introducteur == 0x5b:
+            # CSI : les paramètres précèdent un octet final
+            if len(commande) > 2 and 0x40 <= commande[-1] <= 0x7e:
+                self._commande = bytearray()
+                self._csi(bytes(commande[2:]))
+            return
+
+        if not 0x39 <= introducteur <= 0x3b:
+            # Un nouvel ESC commence peut-être une commande
+            self._commande = bytearray([ESC] if introducteur == ESC else [])
+            return
+
+        # PRO1, PRO2 et PRO3 sont suivis de 1, 2 et 3 octets
+        if len(commande) < introducteur - 0x36:
+            return
+
+        self._commande = bytearray()
+
+        # Le mode Téléinformatique ignore les commandes protocole
+        if self.mode == 'TELEINFORMATIQUE':
+            return
+
+        if introducteur == 0x39:
+            self._pro1(commande[2])
+        elif introducteur == 0x3a:
+            self._pro2(commande[2], commande[3])
+        else:
+            self._pro3(commande[2], commande[3], commande[4])
+
+    def _emet(self, octets):
+        """Envoie des octets à l’ordinateur
+
+        :param octets:
+            les octets à envoyer
+        :type octets:
+            un objet bytes ou une liste d’entiers
+        """
+        self.temps_emission += self.duree(len(octets))
+
+        # Émis à une autre vitesse, les octets sont illisibles
+        if self._synchronise():
+            self.liaison.write(bytes(octets))
+
+    def _pro1(self, code):
+        """Exécute une commande PRO1"""
+        if code == ENQROM:
+            self._emet(self.identite)
+        elif code == STATUS_TERMINAL:
+            self._emet([ESC, 0x3a, REP_STATUS_TERMINAL, 0x40])
+        elif code == STATUS_FONCTIONNEMENT:
+            self._emet([ESC, 0x3a, REP_STATUS_FONCTIONNEMENT,
+                        self._statut_fonctionnement()])
+        elif code == STATUS_VITESSE:
+            self._emet([ESC, 0x3a, REP_STATUS_VITESSE,
+                        CODES_VITESSE[self.vitesse]])
+        elif code == RESET:
+            self.reinitialise()
+
+    def _pro2(self, code, parametre):
+        """Exécute une commande PRO2"""
+        if code == PROG:
+            for vitesse in CODES_VITESSE:
+                if (CODES_VITESSE[vitesse] == parametre and
+                    vitesse <= self.capacite['vitesse']):
+                    self.vitesse = vitesse
+
+            # L’acquittement part à la nouvelle vitesse si elle est acceptée
+            self._emet([ESC, 0x3a, REP_STATUS_VITESSE,
+                        CODES_VITESSE[self.vitesse]])
+        elif (code == START or code == STOP) and parametre in _FONCTIONS:
+            if code == START:
+                self.fonctionnement |= _FONCTIONS[parametre]
+            else:
+                self.fonctionnement &= ~_FONCTIONS[parametre]
+
+            self._emet([ESC, 0x3a, REP_STATUS_FONCTIONNEMENT,
+                        self._statut_fonctionnement()])
+        elif not self.capacite['80colonnes']:
+            # Les changements de mode n’existent qu’en 80 colonnes
+            return
+        elif bytes((code, parametre)) == TELINFO:
+            self.mode = 'TELEINFORMATIQUE'
+            self._emet([ESC, 0x5b, 0x3f, 0x7a])
+        elif bytes((code, parametre)) == MIXTE1:
+            self.mode = 'MIXTE'
+            self._emet([SEP, 0x70])
+        elif bytes((code, parametre)) == MIXTE2:
+            self.mode = 'VIDEOTEX'
+            self.ecran = Ecran()
+            self._emet([SEP, 0x71])
+
+    def _pro3(self, code, recepteur, parametre):
+        """Exécute une commande PRO3"""
+        if (code == START or code == STOP) and recepteur == RCPT_CLAVIER:
+            bit = {ETEN: _ETENDU, C0: _CURSEUR}.get(parametre, 0)
+            if code == START:
+                self.clavier |= bit
+            else:
+                self.clavier &= ~bit
+
+            self._emet([ESC, 0x3b, REP_STATUS_CLAVIER, RCPT_CLAVIER,
+                        0x40 | self.clavier])
+        elif code == AIGUILLAGE_ON or code == AIGUILLAGE_OFF:
+            if recepteur == RCPT_MODEM and parametre == EMET_CLAVIER:
+                self.echo = code == AIGUILLAGE_ON
+
+            statut = 0x40
+            if recepteur == RCPT_MODEM and self.echo:
+                statut |= 1 << (EMET_CLAVIER - 0x50)
+
+            self._emet([ESC, 0x3b, AIGUILLAGE_FROM, recepteur, statut])
+
+    def _csi(self, parametres):
+        """Exécute une séquence CSI de changement de mode"""
+        if parametres == b'?{' and self.mode == 'TELEINFORMATIQUE':
+            self.mode = 'VIDEOTEX'
+            self.ecran = Ecran()
+            self._emet([SEP, 0x5e])
+
+    def _statut_fonctionnement(self):
+        """Retourne l’octet de statut fonctionnement"""
+        statut = 0x40 | self.fonctionnement
+        if self.mode != 'VIDEOTEX':
+            statut |= _80COLONNES
+
+        return statut
+
+    def taper(self, touches):
+        """Simule l’appui sur des touches du clavier
+
+        Les codes des touches sont envoyés à l’ordinateur et, si l’écho est
+        actif, affichés par l’émulateur.
+
+        :param touches:
+            les touches, par exemple 'abc', ENVOI ou [HAUT, ENTREE]
+        :type touches:
+            un objet Sequence, une chaîne de caractères, une liste ou un
+            entier
+        """
+        if not isinstance(touches, Sequence):
+            touches = Sequence(touches)
+
+        octets = bytes(touches.valeurs)
+        if self.echo and self.mode == 'VIDEOTEX':
+            self.ecran.traite(octets)
+
+        self._emet(octets)
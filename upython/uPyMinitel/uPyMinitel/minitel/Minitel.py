@@ -4,18 +4,90 @@
 écrit en Python.
 """
 
-from machine import UART       # Liaison physique avec le Minitel
-from time import ticks_ms
+import json                    # Mémorisation de la connexion (demarrer)
+
+from minitel.temps import ticks_ms, ticks_diff, ticks_add
 
 from minitel.Sequence import Sequence # Gestion des séquences de caractères
+from minitel.Analyseur import Analyseur # Analyse des séquences reçues
+from minitel.liaison import LiaisonUART # Liaison par défaut avec le Minitel
+from minitel.Ecran import (Ecran, Suivi, G0, G1, CLIGNOTEMENT, # Modèle de l’écran du Minitel
+    SOULIGNEMENT, INVERSION)
+from minitel.rendu import difference, deplacement, Compresseur  # Rendu différentiel
 
-from minitel.constantes import (SS2, SEP, ESC, CSI, PRO1, PRO2, PRO3, MIXTE1,
+from minitel.constantes import (SEP, ESC, CSI, PRO1, PRO2, PRO3, MIXTE1,
     MIXTE2, TELINFO, ENQROM, SOH, EOT, TYPE_MINITELS, STATUS_FONCTIONNEMENT,
     LONGUEUR_PRO2, STATUS_TERMINAL, REP_STATUS_TERMINAL, REP_STATUS_VITESSE,
     PROG, START, STOP, LONGUEUR_PRO3, RCPT_CLAVIER, ETEN, C0, MINUSCULES, RS,
+    REP_STATUS_CLAVIER, REP_STATUS_FONCTIONNEMENT,
     US, VT, LF, BS, TAB, CON, COF, AIGUILLAGE_ON, AIGUILLAGE_OFF, RCPT_MODEM,
     EMET_CLAVIER, FF, CAN, BEL, CR, SO, SI, B300, B1200, B4800, B9600, REP,
-    COULEURS_MINITEL, CAPACITES_BASIQUES, CONSTRUCTEURS)
+    COULEURS_MINITEL, CAPACITES_BASIQUES, CONSTRUCTEURS, BITS_PAR_CARACTERE)
+
+# Fichier où demarrer mémorise la connexion avec le Minitel
+FICHIER_DEMARRAGE = 'minitel.json'
+
+# Temps maximal en millisecondes que met le Minitel à commencer sa réponse
+# une fois la commande reçue
+DELAI_RETOURNEMENT = 200
+
+# Silence sur la ligne, en durées de caractère, marquant la fin d’une réponse.
+# Il couvre le délai de 10 caractères après lequel l’UART de l’ESP32 signale
+# les octets reçus.
+SILENCE_REPONSE = 12
+
+# Durée en millisecondes de chaque tranche d’un affichage interruptible
+DUREE_TRANCHE = 100
+
+# En-têtes des réponses attendues, qui permettent d’attribuer à chaque
+# commande d’un lot sa réponse
+ENTETE_IDENTIFICATION = bytes((SOH,))
+ENTETE_FONCTIONNEMENT = PRO2 + bytes((REP_STATUS_FONCTIONNEMENT,))
+ENTETE_CLAVIER = PRO3 + bytes((REP_STATUS_CLAVIER, RCPT_CLAVIER))
+
+def _repartir(attentes, entetes, reponses):
+    """Attribue à chaque commande d’un lot sa réponse
+
+    Les réponses, déjà séparées des touches par l’analyseur de séquences,
+    arrivent dans l’ordre d’envoi des commandes. Chacune est attribuée à la
+    première commande suivante dont elle a la longueur et l’en-tête : les
+    commandes sautées ont perdu leur réponse. Une réponse ne correspondant
+    à aucune commande suivante est ignorée.
+
+    :param attentes:
+        nombre de caractères attendus en réponse à chaque commande
+    :type attentes:
+        une liste d’entiers
+
+    :param entetes:
+        début attendu de la réponse à chaque commande, None pour ne
+        vérifier que sa longueur
+    :type entetes:
+        une liste d’objets bytes ou None
+
+    :param reponses:
+        les réponses reçues du Minitel
+    :type reponses:
+        une liste d’objets Sequence
+
+    :returns:
+        la liste des objets Sequence répondant à chaque commande, vides pour
+        les réponses perdues
+    """
+    resultat = [Sequence() for _ in attentes]
+    suivante = 0
+
+    for reponse in reponses:
+        for position in range(suivante, len(attentes)):
+            entete = entetes[position]
+            if (reponse.longueur == attentes[position] and
+                (entete == None or
+                 reponse.valeurs[:len(entete)] == entete)):
+                resultat[position] = reponse
+                suivante = position + 1
+                break
+
+    return resultat
 
 def normaliser_couleur(couleur):
     """Retourne le numéro de couleur du Minitel.
@@ -46,6 +118,124 @@ def normaliser_couleur(couleur):
 
     return None
 
+class Lot:
+    """Contexte regroupant les envois vers le Minitel
+
+    Un objet Lot s’utilise avec l’instruction with. Tant que le bloc est en
+    cours d’exécution, tous les envois vers le Minitel sont accumulés dans un
+    tampon qui est transmis en une seule écriture à la sortie du bloc ou dès
+    qu’il atteint le seuil indiqué::
+
+        with minitel.lot():
+            minitel.position(1, 1)
+            minitel.couleur(caractere = 'bleu')
+            minitel.envoyer('Bonjour')
+    """
+    def __init__(self, minitel, seuil):
+        self.minitel = minitel
+        self.seuil = seuil
+
+    def __enter__(self):
+        self.minitel.debut_lot(self.seuil)
+        return self.minitel
+
+    def __exit__(self, type_exception, exception, trace):
+        self.minitel.fin_lot()
+        return False
+
+class Interruptible:
+    """Contexte d’affichage interruptible par une touche de fonction
+
+    Un objet Interruptible s’utilise avec l’instruction with. Dans le bloc,
+    les envois sont transmis par tranches, au rythme de la liaison. Entre
+    deux tranches, le clavier est consulté : dès qu’une touche de fonction
+    arrive, le reste de la page est abandonné et l’application peut passer
+    sans attendre à la page suivante. La touche reste disponible pour
+    recevoir_sequence::
+
+        with minitel.interruptible() as rendu:
+            affiche_videotex(minitel, 'accueil.vdt')
+
+        if rendu.interrompu:
+            touche = minitel.recevoir_sequence()
+
+    :ivar interrompu:
+        True si l’affichage a été interrompu, connu à la sortie du bloc
+    """
+    def __init__(self, minitel, clavier):
+        self.minitel = minitel
+        self.clavier = clavier
+        self.interrompu = False
+
+    def __enter__(self):
+        self.minitel.debut_interruptible(self.clavier)
+        return self
+
+    def __exit__(self, type_exception, exception, trace):
+        self.interrompu = self.minitel.fin_interruptible()
+        return False
+
+class Image:
+    """Contexte de rendu différentiel d’un écran complet
+
+    Un objet Image s’utilise avec l’instruction with. Dans le bloc,
+    l’application dessine son écran complet, comme sur un écran vierge,
+    avec les méthodes habituelles. Rien n’est envoyé au Minitel pendant ce
+    temps. À la sortie du bloc, seules les différences avec l’écran
+    actuellement affiché sont envoyées::
+
+        with minitel.image():
+            minitel.position(1, 1)
+            minitel.envoyer('Heure : ' + heure)
+    """
+    def __init__(self, minitel):
+        self.minitel = minitel
+
+    def __enter__(self):
+        self.minitel.debut_image()
+        return self.minitel
+
+    def __exit__(self, type_exception, exception, trace):
+        self.minitel.fin_image(type_exception == None)
+        return False
+
+def _lire_memoire(fichier):
+    """Lit la connexion mémorisée par Minitel.demarrer
+
+    :returns:
+        un dictionnaire (vitesse, identite, capacite) ou None si le fichier
+        est absent ou invalide
+    """
+    if fichier == None:
+        return None
+
+    try:
+        with open(fichier) as source:
+            memoire = json.load(source)
+    except (OSError, ValueError):
+        return None
+
+    if (not isinstance(memoire, dict) or
+        memoire.get('vitesse') not in [300, 1200, 4800, 9600] or
+        not isinstance(memoire.get('identite'), str) or
+        not isinstance(memoire.get('capacite'), dict)):
+        return None
+
+    return memoire
+
+def _ecrire_memoire(fichier, etat):
+    """Mémorise la connexion pour Minitel.demarrer"""
+    if fichier == None:
+        return
+
+    try:
+        with open(fichier, 'w') as destination:
+            json.dump(etat, destination)
+    except OSError:
+        # Un système de fichiers en lecture seule ne doit pas empêcher de
+        # travailler : la détection complète sera refaite
+        pass
+
 class Minitel:
     """Une classe de pilotage du Minitel via un port série
 
@@ -68,6 +258,10 @@ class Minitel:
     utilisant un Arduino relié en USB à l’ordinateur et dont certaines
     broches seraient relié au Minitel.
 
+    Une autre liaison peut être fournie au constructeur (voir le module
+    minitel.liaison) : port série ou pty depuis un ordinateur, connexion TCP
+    vers une passerelle, liaison en mémoire pour les tests.
+
     La classe Minitel permet de déterminer la vitesse de fonctionnement du
     Minitel, d’identifier le modèle, de le configurer et d’envoyer et recevoir
     des séquences de caractères.
@@ -97,7 +291,7 @@ class Minitel:
         minitel.close()
 
     """
-    def __init__(self, uart_num = 2):
+    def __init__(self, uart_num = 2, ecran = False, liaison = None):
         """Constructeur de Minitel
 
         La connexion série est établie selon le standard de base du Minitel.
@@ -112,38 +306,488 @@ class Minitel:
             Le port uart utilisé. Par défaut, le port 2 de l'ESP32 est utilisé
         :type uart_num:
             Integer
+
+        :param ecran:
+            True pour tenir à jour un modèle de l’écran du Minitel (attribut
+            ecran) à partir de tout ce qui lui est envoyé, False sinon. Le
+            modèle est nécessaire au rendu différentiel (image). Sans lui,
+            la position du curseur et les attributs en cours restent suivis
+            d’après les envois des méthodes de Minitel.
+        :type ecran:
+            un booléen
+
+        :param liaison:
+            la liaison avec le Minitel, None pour ouvrir le port uart_num
+        :type liaison:
+            un objet du module minitel.liaison ou None
     
         """
         assert isinstance(uart_num, int)
+        assert ecran in [True, False]
         self.uart_num = uart_num
 
         # Initialise l’état du Minitel
         self.mode = 'VIDEOTEX'
         self.vitesse = 1200
 
+        # Le Minitel affiche par défaut les touches tapées au clavier
+        self.echo_actif = True
+
+        # Modèle de ce qu’affiche le Minitel
+        self.ecran = Ecran() if ecran else None
+
+        # Position du curseur et attributs en cours, suivis même sans modèle
+        # de l’écran
+        self._suivi = Suivi()
+
         # Initialise la liste des capacités du Minitel
         self.capacite = CAPACITES_BASIQUES
 
-        # Initialise la connexion avec le Minitel
-        self._minitel = UART(
-            self.uart_num,
-            baudrate = 1200,  # vitesse à 1200 bps, le standard Minitel
-            bits = 7,         # taille de caractère à 7 bits
-            parity = 0,       # parité paire
-            stop = 1,         # 1 bit d’arrêt
-            timeout = 1,      # 1s de timeout
-            timeout_char = 1, # 1s de timeout entre caracteres
-            flow   = 0        # pas de contrôle matériel
-        )
+        # Code constructeur, type et version renvoyé par ENQROM (identifier)
+        self.identite = None
+
+        # Tampon des envois regroupés (None hors d’un lot)
+        self._lot = None
+        self._lot_seuil = 0
+        self._lot_niveau = 0
+
+        # Écran en cours de dessin pour un rendu différentiel (None sinon)
+        self._image = None
+
+        # Affichage interruptible : octets en attente d’émission (None hors
+        # d’un affichage interruptible), modèle de l’écran repérant les fins
+        # de séquence, longueur coupable sans laisser de séquence inachevée
+        # et instant où la ligne sera libre
+        self._tranche = None
+        self._decoupe = None
+        self._coupure = 0
+        self._fin_emission = 0
+        self._interruptible_niveau = 0
+        self._clavier = True
+
+        # Le dernier affichage interruptible a-t-il été interrompu ?
+        self.interrompu = False
+
+        # Les suites de caractères identiques sont-elles envoyées avec REP ?
+        # Le compresseur suit le flux envoyé depuis son activation.
+        self.compression = False
+        self._compresseur = None
+
+        # Découpe en séquences des octets reçus du Minitel
+        self._analyseur = Analyseur()
+
+        # Initialise la connexion avec le Minitel, à 1200 bps par défaut
+        if liaison == None:
+            liaison = LiaisonUART(self.uart_num)
+        self._minitel = liaison
+
+    def _ecrire(self, octets):
+        """Écrit des octets sur la liaison
+
+        :param octets:
+            les octets à écrire
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+        """
+        self._minitel.write(octets)
 
     def close(self):
         """Ferme la connexion avec le Minitel
 
         """
-        self._minitel.deinit()
+        self.vider_lot()
+        self._minitel.close()
+
+    def lot(self, seuil = 512):
+        """Regroupe les envois effectués dans un bloc with
+
+        :param seuil:
+            taille du tampon en octets au-delà de laquelle il est transmis
+            sans attendre la fin du bloc
+        :type seuil:
+            un entier positif
+
+        :returns:
+            un objet Lot à utiliser avec l’instruction with
+        """
+        assert isinstance(seuil, int) and seuil > 0
+
+        return Lot(self, seuil)
+
+    def debut_lot(self, seuil = 512):
+        """Commence à regrouper les envois
+
+        Tous les envois suivants sont accumulés dans un tampon jusqu’à l’appel
+        de la méthode fin_lot. Les lots peuvent être imbriqués, seul le lot le
+        plus extérieur déclenche l’envoi final.
+
+        :param seuil:
+            taille du tampon en octets au-delà de laquelle il est transmis
+            sans attendre la fin du lot
+        :type seuil:
+            un entier positif
+        """
+        assert isinstance(seuil, int) and seuil > 0
+
+        if self._lot_niveau == 0:
+            self._lot = bytearray()
+            self._lot_seuil = seuil
+
+        self._lot_niveau += 1
+
+    def vider_lot(self):
+        """Transmet immédiatement le contenu du tampon d’envoi
+
+        Le regroupement continue après l’appel. Sans lot en cours, la méthode
+        ne fait rien. Pendant un affichage interruptible, les octets en
+        attente sont transmis jusqu’à la dernière fin de séquence.
+        """
+        if self._tranche:
+            self._emettre_tranche()
+
+        if self._lot:
+            self._ecrire(self._lot)
+            self._lot = bytearray()
+
+    def fin_lot(self):
+        """Termine un regroupement des envois
+
+        À la fin du lot le plus extérieur, le tampon est transmis en une seule
+        écriture et les envois suivants redeviennent immédiats.
+        """
+        if self._lot_niveau == 0:
+            return
+
+        self._lot_niveau -= 1
+
+        if self._lot_niveau == 0:
+            self.vider_lot()
+            self._lot = None
+
+    def interruptible(self, clavier = True):
+        """Rend interruptible l’affichage effectué dans un bloc with
+
+        :param clavier:
+            True pour qu’une touche de fonction interrompe l’affichage,
+            False pour seulement le rythmer (voir debut_interruptible)
+        :type clavier:
+            un booléen
+
+        :returns:
+            un objet Interruptible à utiliser avec l’instruction with
+        """
+        assert clavier in [True, False]
+
+        return Interruptible(self, clavier)
+
+    def debut_interruptible(self, clavier = True):
+        """Commence un affichage interruptible
+
+        Jusqu’à l’appel de fin_interruptible, les envois sont transmis par
+        tranches d’environ DUREE_TRANCHE millisecondes, au rythme de la
+        liaison. Les coupures ne se font qu’entre deux séquences, d’après le
+        modèle de l’écran. Sans modèle tenu à jour (ecran = False), un modèle
+        n’est créé que le temps de l’affichage. L’affichage peut être
+        interrompu par une touche de fonction ou par la méthode interrompre.
+        Les affichages interruptibles peuvent être imbriqués.
+
+        :param clavier:
+            True pour qu’une touche de fonction interrompe l’affichage,
+            False pour que seule la méthode interrompre le fasse
+        :type clavier:
+            un booléen
+        """
+        assert clavier in [True, False]
+
+        if self._interruptible_niveau == 0:
+            # Ce qui a été regroupé avant part en premier
+            self.vider_lot()
+            self._decoupe = self.ecran if self.ecran != None else Ecran()
+            self._tranche = bytearray()
+            self._coupure = 0
+            self._fin_emission = ticks_ms()
+            self._clavier = clavier
+            self.interrompu = False
+
+        self._interruptible_niveau += 1
+
+    def interrompre(self):
+        """Abandonne le reste de l’affichage interruptible en cours
+
+        Les envois suivants sont ignorés jusqu’à la fin de l’affichage, qui
+        se termine comme après une touche de fonction.
+        """
+        if self._interruptible_niveau > 0:
+            self.interrompu = True
+
+    def fin_interruptible(self):
+        """Termine un affichage interruptible
+
+        À la fin de l’affichage le plus extérieur, les derniers octets sont
+        transmis. Après une interruption, le Minitel reçoit RS, qui ramène
+        ses attributs à leur valeur par défaut : l’écran partiellement
+        dessiné est oublié par le modèle mais ses attributs sont connus.
+
+        :returns:
+            True si l’affichage a été interrompu
+        """
+        if self._interruptible_niveau == 0:
+            return False
+
+        self._interruptible_niveau -= 1
+        if self._interruptible_niveau > 0:
+            return self.interrompu
+
+        if not self.interrompu:
+            self._coupure = len(self._tranche)
+            self._emettre_tranche()
+
+        self._tranche = None
+        self._decoupe = None
+
+        if self.interrompu:
+            self._compresseur = None
+            if self.ecran != None:
+                self.ecran.oublie()
+            self._transmettre(bytes([RS]))
+            self._suivi.place(1, 1)
+
+        return self.interrompu
+
+    def _envoyer_interruptible(self, octets):
+        """Ajoute des octets à un affichage interruptible
+
+        Les octets sont interprétés par un modèle de l’écran par morceaux
+        d’une tranche, prolongés jusqu’à la fin de la séquence en cours, ce
+        qui repère les endroits où le flux peut être coupé.
+
+        :param octets:
+            les octets à envoyer, déjà compressés
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+        """
+        if self.interrompu:
+            return
+
+        taille = self._taille_tranche()
+        vue = memoryview(octets)
+        debut = 0
+        while debut < len(vue):
+            fin = min(debut + taille, len(vue))
+            self._decoupe.traite(vue[debut:fin])
+            while fin < len(vue) and not self._decoupe.au_repos():
+                self._decoupe.traite(vue[fin:fin + 1])
+                fin += 1
+
+            self._tranche.extend(vue[debut:fin])
+            debut = fin
+
+            if self._decoupe.au_repos():
+                self._coupure = len(self._tranche)
+
+            if self._coupure >= taille:
+                self._emettre_tranche()
+                if self.interrompu:
+                    return
+
+    def _emettre_tranche(self):
+        """Transmet les octets en attente jusqu’à la dernière coupure
+
+        La transmission attend que la ligne soit presque libre et n’a pas
+        lieu si une touche de fonction arrive entre-temps.
+        """
+        if self._coupure == 0:
+            return
+
+        if self._patienter_emission():
+            self.interrompu = True
+            return
+
+        tranche = self._tranche[:self._coupure]
+        self._tranche = self._tranche[self._coupure:]
+        self._coupure = 0
+
+        self._ecrire(tranche)
+
+        # La ligne sera occupée le temps de transmettre la tranche
+        duree = len(tranche) * BITS_PAR_CARACTERE * 1000 // self._minitel.vitesse
+        maintenant = ticks_ms()
+        if ticks_diff(self._fin_emission, maintenant) < 0:
+            self._fin_emission = maintenant
+        self._fin_emission = ticks_add(self._fin_emission, duree)
+
+    def _patienter_emission(self):
+        """Attend que la ligne soit presque libre en guettant le clavier
+
+        Une tranche d’avance est laissée à la liaison pour que la ligne ne
+        reste jamais inoccupée.
+
+        :returns:
+            True si une touche de fonction est arrivée
+        """
+        while True:
+            self._lire()
+            if self._clavier and self._analyseur.touche_fonction():
+                return True
+
+            restant = ticks_diff(self._fin_emission, ticks_ms()) - DUREE_TRANCHE
+            if restant <= 0:
+                return False
+
+            self._attendre(restant)
+
+    def _taille_tranche(self):
+        """Retourne le nombre d’octets transmis en DUREE_TRANCHE ms"""
+        vitesse = self._minitel.vitesse
+        return max(1, DUREE_TRANCHE * vitesse // (BITS_PAR_CARACTERE * 1000))
+
+    def image(self):
+        """Dessine un écran complet et n’envoie que ses différences
+
+        :returns:
+            un objet Image à utiliser avec l’instruction with
+        """
+        return Image(self)
+
+    def debut_image(self):
+        """Commence le dessin d’un écran complet
+
+        Jusqu’à l’appel de fin_image, les envois sont interprétés sur un
+        écran vierge au lieu d’être transmis au Minitel.
+        """
+        assert self.ecran != None
+        assert self._image == None
+
+        self._image = Ecran(self.ecran.colonnes, self.ecran.lignes)
+        self._image.efface()
+
+    def fin_image(self, envoi = True):
+        """Termine le dessin d’un écran complet
+
+        Le Minitel reçoit la suite d’octets la plus courte permettant de
+        passer de l’écran qu’il affiche à l’écran dessiné. Seules les rangées
+        1 à 24 sont concernées.
+
+        :param envoi:
+            False pour abandonner l’écran dessiné sans rien envoyer
+        :type envoi:
+            un booléen
+        """
+        image = self._image
+        self._image = None
+
+        # Les envois faits pendant le dessin n’ont pas atteint le Minitel
+        self._suivi.oublie()
+
+        if image != None and envoi:
+            octets = difference(self.ecran, image)
+            if octets:
+                self.envoyer_brut(octets)
+
+    def _modele(self):
+        """Retourne ce qui suit les envois au Minitel
+
+        :returns:
+            l’image en cours de construction, l’écran modélisé ou, à défaut,
+            le suivi du curseur et des attributs (objet Suivi). None hors du
+            mode Videotex sans image ni écran modélisé.
+        """
+        if self._image != None:
+            return self._image
+
+        if self.ecran != None:
+            return self.ecran
+
+        if self.mode == 'VIDEOTEX':
+            return self._suivi
+
+        return None
+
+    def _attributs(self):
+        """Retourne le modèle d’écran dont les attributs en cours sont fiables
+
+        Les méthodes couleur, effet, taille et semigraphique s’en servent
+        pour ne pas envoyer de séquence qui ne changerait rien.
+
+        :returns:
+            l’objet Ecran ou Suivi recevant les envois (voir _modele) ou None
+            si ses attributs sont inconnus.
+        """
+        modele = self._modele()
+        if modele == None or not modele.attributs_connus:
+            return None
+
+        return modele
 
     def envoyer_brut(self, byte):
-        self._minitel.write(byte)
+        """Envoi d’octets bruts
+
+        Les octets sont transmis au Minitel en une seule écriture sur le port
+        série. Pendant un lot, ils sont ajoutés au tampon d’envoi.
+
+        En mode Videotex, si l’attribut compression est vrai (il est faux
+        par défaut), les suites de caractères identiques sont remplacées par
+        REP.
+
+        :param byte:
+            les octets à envoyer
+        :type byte:
+            un objet bytes ou bytearray
+        """
+        self._suivi.traite(byte)
+        self._transmettre(byte)
+
+    def _commande(self, commandes):
+        """Envoie des commandes dont l’effet est suivi par l’appelant
+
+        Contrairement à envoyer, l’envoi ne rend pas inconnus la position du
+        curseur et les attributs suivis : l’appelant met lui-même le suivi à
+        jour.
+
+        :param commandes:
+            Une séquence de caractères interprétable par la classe Sequence.
+        :type commandes:
+            un objet Sequence, des octets, une liste, un entier
+        """
+        if not isinstance(commandes, Sequence):
+            commandes = Sequence(commandes)
+
+        if commandes.longueur:
+            self._transmettre(commandes.vue())
+
+    def _transmettre(self, byte):
+        """Transmet des octets au Minitel (voir envoyer_brut)
+
+        :param byte:
+            les octets à envoyer
+        :type byte:
+            un objet bytes, bytearray ou memoryview
+        """
+        if self._image != None:
+            self._image.traite(byte)
+            return
+
+        if self.compression and self.mode == 'VIDEOTEX':
+            if self._compresseur == None:
+                self._compresseur = Compresseur()
+            byte = self._compresseur.compresse(byte)
+        else:
+            self._compresseur = None
+
+        if self._tranche != None:
+            self._envoyer_interruptible(byte)
+            return
+
+        if self.ecran != None:
+            self.ecran.traite(byte)
+
+        if self._lot is None:
+            self._ecrire(byte)
+            return
+
+        self._lot.extend(byte)
+        if len(self._lot) >= self._lot_seuil:
+            self.vider_lot()
 
     def envoyer(self, contenu):
         """Envoi de séquence de caractères 
@@ -153,16 +797,31 @@ class Minitel:
         :param contenu:
             Une séquence de caractères interprétable par la classe Sequence.
         :type contenu:
-            un objet Sequence, une chaîne de caractères ou unicode, une liste,
-            un entier
+            un objet Sequence, des octets, une chaîne de caractères ou
+            unicode, une liste, un entier
         """
+        # Des octets, comme les constantes de plusieurs octets, sont déjà
+        # prêts à partir
+        if isinstance(contenu, (bytes, bytearray)):
+            if contenu:
+                self.envoyer_brut(contenu)
+            return
+
+        # Un texte sans caractère de contrôle occupe une cellule par
+        # caractère, même accentué
+        if (isinstance(contenu, str) and contenu and min(contenu) >= ' '
+            and '\x7f' not in contenu):
+            self._commande(contenu)
+            self._suivi.avance(len(contenu))
+            return
+
         # Convertit toute entrée en objet Sequence
         if not isinstance(contenu, Sequence):
             contenu = Sequence(contenu)
 
-        # Envois les caractères un par un
-        for valeur in contenu.valeurs:
-            self.envoyer_brut(chr(valeur).encode())
+        # Envoie tous les caractères en une seule écriture, sans recopie
+        if contenu.longueur:
+            self.envoyer_brut(contenu.vue())
 
     def recevoir(self, bloque = False, attente = None, nbytes = 1):
         """Lit un caractère en provenance du Minitel
@@ -194,20 +853,32 @@ class Minitel:
         if attente:
             attente = attente * 1000
 
-        caractere = ''
+        # Ce qui a été regroupé doit être affiché avant d’attendre l’utilisateur
+        self.vider_lot()
+
+        # Tout passe par l’analyseur de séquences, qui écarte les réponses
+        # aux commandes
+        self._lire()
+        caracteres = self._analyseur.reprend(nbytes)
+
+        debut = ticks_ms()
+        while bloque and not caracteres:
+            restant = None
+            if attente:
+                restant = attente - ticks_diff(ticks_ms(), debut)
+                if restant <= 0:
+                    break
 
-        if bloque:
-            start_ms = ticks_ms()
-            while not self._minitel.any():
-                if attente:
-                    if ticks_ms()-start_ms > attente:
-                        break
-                pass
+            self._attendre(restant)
+            self._lire()
+            caracteres = self._analyseur.reprend(nbytes)
 
-        if self._minitel.any():
-            caractere = self._minitel.read(nbytes).decode()
+        # Avec l’écho actif, le Minitel a pu afficher la touche ou déplacer
+        # son curseur à l’insu du suivi et de l’écran modélisé
+        if caracteres and self.echo_actif:
+            self._oublie_echo()
 
-        return caractere
+        return caracteres.decode()
 
     def recevoir_sequence(self,bloque = True, attente=None):
         """Lit une séquence en provenance du Minitel
@@ -224,6 +895,11 @@ class Minitel:
         C’est cette méthode qui doit être utilisée plutôt que la méthode
         recevoir lorsqu’on dialogue avec le Minitel.
 
+        Le découpage est confié à l’analyseur de séquences (voir la méthode
+        evenement) : une séquence déjà commencée est toujours terminée, même
+        sans attente. Si aucune séquence n’est reçue, une AssertionError est
+        levée.
+
         :param bloque:
             True pour attendre une séquence s’il n’y en a pas dans la
             file d’attente de réception. False pour ne pas attendre et
@@ -242,44 +918,121 @@ class Minitel:
         :returns:
             un objet Sequence
         """
-        # Crée une séquence
-        sequence = Sequence()
-
-        # Ajoute le premier caractère lu à la séquence en mode bloquant
-        sequence.ajoute(self.recevoir(bloque = bloque, attente = attente))
-        assert sequence.longueur != 0
-
-        # Teste le caractère reçu
-        if sequence.valeurs[-1] in [SS2, SEP]:
-            # Une séquence commençant par SS2 ou SEP aura une longueur de 2
-            sequence.ajoute(self.recevoir(bloque = True))
-        elif sequence.valeurs[-1] == ESC:
-            # Les séquences ESC ont des tailles variables allant de 1 à 4
-            # Essaie de lire un caractère avec un temps d’attente de 1/10s
-            # Cela permet de lire la touche la touche Esc qui envoie
-            # uniquement le code ESC sans rien après.
-            caractere = self.recevoir(bloque = True, attente = 0.1)
-            if not caractere:
-                return sequence
-            sequence.ajoute(caractere)
-            # Une séquence CSI commence par ESC, 0x5b
-            if sequence.valeurs == CSI:
-                # Une séquence CSI appelle au moins 1 caractère
-                sequence.ajoute(self.recevoir(bloque = True))
-                if sequence.valeurs[-1] in [0x32, 0x34]:
-                    # La séquence ESC, 0x5b, 0x32/0x34 appelle un dernier
-                    # caractère
-                    sequence.ajoute(self.recevoir(bloque = True))
-
-        return sequence
-
-    def appeler(self, contenu, attente):
+        assert bloque in [True, False]
+        assert isinstance(attente, (int,float)) or attente == None
+
+        debut = ticks_ms()
+        evenement = self.evenement()
+        while evenement == None:
+            # Sans attente, seule une séquence déjà commencée est terminée
+            if not bloque and not self._analyseur.en_cours():
+                break
+
+            restant = None
+            if attente:
+                restant = attente * 1000 - ticks_diff(ticks_ms(), debut)
+                if restant <= 0:
+                    break
+
+            # Un ESC isolé doit être terminé après le délai de l’analyseur
+            if self._analyseur.en_cours():
+                delai = self._analyseur.delai_esc
+                restant = delai if restant == None else min(restant, delai)
+
+            self._attendre(restant)
+            evenement = self.evenement()
+
+        # Aucune séquence reçue
+        assert evenement != None
+
+        return evenement.sequence
+
+    def _attendre(self, delai = None):
+        """Attend l’arrivée d’octets sans occuper le processeur
+
+        L’attente est confiée à la liaison, qui repose sur select.poll : le
+        processeur reste libre pour les autres tâches tant que rien n’est
+        reçu.
+
+        :param delai:
+            attente maximale en millisecondes, None pour attendre
+            indéfiniment
+        :type delai:
+            un entier, un flottant ou None
+
+        :returns:
+            True si des octets sont disponibles
+        """
+        return self._minitel.attendre(delai)
+
+    def _changer_vitesse(self, vitesse):
+        """Règle la vitesse de la liaison avec le Minitel
+
+        Ce qui a été reçu jusque-là est abandonné : lu à une vitesse qui
+        n’était peut-être pas celle du Minitel, cela ne veut rien dire et
+        ne doit pas passer pour des touches frappées.
+
+        :param vitesse:
+            vitesse en bits par seconde
+        :type vitesse:
+            un entier
+        """
+        self._lire()
+        self._analyseur.oublie()
+
+        self._minitel.changer_vitesse(vitesse)
+
+    def _lire(self):
+        """Confie à l’analyseur tous les octets disponibles sur la liaison"""
+        disponibles = self._minitel.any()
+        if disponibles:
+            self._analyseur.pousse(self._minitel.read(disponibles), ticks_ms())
+
+    def evenement(self):
+        """Retourne la prochaine séquence reçue, sans jamais attendre
+
+        Tous les octets disponibles sur la liaison série sont lus en une fois
+        et confiés à l’analyseur de séquences. Une rafale de touches tapées
+        d’avance donne donc plusieurs événements, restitués un par un.
+
+        :returns:
+            un objet Evenement (attributs sequence et instant, en ms) ou None
+            si aucune séquence complète n’a été reçue
+        """
+        # Ce qui a été regroupé doit être affiché avant d’attendre l’utilisateur
+        self.vider_lot()
+
+        self._lire()
+        self._analyseur.expire(ticks_ms())
+
+        evenement = self._analyseur.evenement()
+
+        # Avec l’écho actif, le Minitel a pu afficher la touche ou déplacer
+        # son curseur à l’insu du suivi et de l’écran modélisé
+        if evenement != None and self.echo_actif:
+            self._oublie_echo()
+
+        return evenement
+
+    def _oublie_echo(self):
+        """Oublie ce que l’écho d’une touche a pu changer sur le Minitel"""
+        self._suivi.oublie()
+        if self.ecran != None:
+            self.ecran.oublie()
+
+    def appeler(self, contenu, attente, delai = None):
         """Envoie une séquence au Minitel et attend sa réponse.
 
         Cette méthode permet d’envoyer une commande au Minitel (configuration,
-        interrogation d’état) et d’attendre sa réponse. Cette fonction attend
-        au maximum 1 seconde avant d’abandonner. Dans ce cas, une séquence
-        vide est retournée.
+        interrogation d’état) et d’attendre sa réponse. La réponse complète
+        est attendue jusqu’à une échéance unique, calculée d’après la vitesse
+        de la liaison (voir la méthode _delais). L’attente s’achève dès que
+        attente caractères sont reçus ou que la ligne redevient silencieuse.
+        Si rien n’arrive, une séquence vide est retournée.
+
+        Seule la réponse est prise à l’analyseur de séquences : une touche
+        frappée pendant la commande reste disponible pour recevoir et
+        recevoir_sequence.
 
         :param contenu:
             Une séquence de caractères interprétable par la classe
@@ -294,25 +1047,200 @@ class Minitel:
         :type attente:
             un entier
 
+        :param delai:
+            attente maximale de la réponse complète en secondes, None pour
+            la déduire de la vitesse de la liaison
+        :type delai:
+            un entier, un flottant ou None
+
         :returns:
             un objet Sequence contenant la réponse du Minitel à la commande
             envoyée.
         """
         assert isinstance(attente, int)
+        assert delai == None or (isinstance(delai, (int, float)) and delai > 0)
+
+        envoyes, attentes, entetes = self._envoyer_lot([(contenu, attente)])
+
+        reponses = self._attendre_reponses(envoyes, attente, delai)
+
+        return _repartir(attentes, entetes, reponses)[0]
+
+    def appeler_lot(self, requetes, delai = None):
+        """Envoie plusieurs commandes d’affilée et attend leurs réponses.
+
+        Les commandes sont émises à la suite sans attendre les réponses, qui
+        sont ensuite attendues ensemble jusqu’à une échéance unique puis
+        réparties entre les commandes d’après leur longueur et leur en-tête.
+        Un lot ne coûte
+        ainsi qu’un aller-retour avec le Minitel au lieu d’un par commande.
+        Les commandes d’un lot ne doivent pas changer la vitesse de la
+        liaison.
+
+        :param requetes:
+            les commandes, chacune sous la forme d’un tuple (contenu,
+            attente) comme pour la méthode appeler, ou (contenu, attente,
+            entete) si la réponse doit commencer par les octets entete
+        :type requetes:
+            une liste de tuples
+
+        :param delai:
+            attente maximale de toutes les réponses en secondes, None pour
+            la déduire de la vitesse de la liaison
+        :type delai:
+            un entier, un flottant ou None
+
+        :returns:
+            une liste d’objets Sequence, la réponse à chaque commande dans
+            l’ordre du lot. Une réponse perdue est une séquence vide.
+        """
+        assert isinstance(requetes, list)
+        assert delai == None or (isinstance(delai, (int, float)) and delai > 0)
+
+        envoyes, attentes, entetes = self._envoyer_lot(requetes)
+
+        reponses = self._attendre_reponses(envoyes, sum(attentes), delai)
+
+        return _repartir(attentes, entetes, reponses)
+
+    def _envoyer_lot(self, requetes):
+        """Émet les commandes d’un lot (voir appeler_lot)
+
+        :returns:
+            un tuple (nombre de caractères émis, liste des nombres de
+            caractères attendus en réponse à chaque commande, liste des
+            en-têtes attendus, None s’il n’est pas précisé)
+        """
+        # Les réponses arrivées trop tard à des commandes précédentes ne
+        # doivent pas passer pour celles de ce lot
+        self._lire()
+        while self._analyseur.reponse() != None:
+            pass
+
+        envoyes = 0
+        attentes = []
+        entetes = []
+        for requete in requetes:
+            contenu, attente = requete[0], requete[1]
+            entete = requete[2] if len(requete) > 2 else None
+            assert isinstance(attente, int)
+            assert entete == None or isinstance(entete, bytes)
+
+            # Les commandes protocole ne changent rien à l’écran
+            contenu = Sequence(contenu)
+            self._commande(contenu)
+            envoyes += contenu.longueur
+            attentes.append(attente)
+            entetes.append(entete)
+
+        self.vider_lot()
 
-        # Envoie la séquence
-        self.envoyer(contenu)
+        return envoyes, attentes, entetes
 
-        # Tente de recevoir le nombre de caractères indiqué par le paramètre
-        # attente avec un délai d’1 seconde.
-        retour = Sequence()
-        for _ in range(0, attente):
-            # Attend un caractère
-            entree_bytes = self.recevoir(bloque = True, attente = 1)
-            if entree_bytes:
-                retour.ajoute(entree_bytes)
+    def _attendre_reponses(self, envoyes, attente, delai = None):
+        """Reçoit les réponses du Minitel à des commandes (voir appeler)
 
-        return retour
+        Seules les réponses sont prises à l’analyseur de séquences : les
+        touches frappées pendant l’attente restent dans sa file.
+
+        :returns:
+            la liste des objets Sequence reçus en réponse, totalisant au
+            moins attente caractères si aucune réponse n’a été perdue
+        """
+        echeance, silence = self._delais(envoyes, attente, delai)
+
+        reponses = []
+        recus = 0
+        debut = ticks_ms()
+        dernier = None
+        while True:
+            reponse = self._analyseur.reponse()
+            while reponse != None:
+                reponses.append(reponse.sequence)
+                recus += reponse.sequence.longueur
+                reponse = self._analyseur.reponse()
+
+            if recus >= attente:
+                break
+
+            maintenant = ticks_ms()
+            restant = echeance - ticks_diff(maintenant, debut)
+            if dernier != None:
+                restant = min(restant, silence - ticks_diff(maintenant, dernier))
+            if restant <= 0:
+                break
+
+            if self._attendre(restant):
+                self._lire()
+                dernier = ticks_ms()
+
+        return reponses
+
+    def _delais(self, envoyes, attendus, delai = None):
+        """Calcule les délais d’attente d’une réponse du Minitel
+
+        L’échéance couvre l’émission de la commande, le temps de retournement
+        du Minitel et la réception de la réponse à la vitesse courante de la
+        liaison. Le silence est l’absence de réception au-delà de laquelle
+        une réponse commencée est considérée comme terminée.
+
+        :param envoyes:
+            nombre de caractères de la commande
+        :type envoyes:
+            un entier
+
+        :param attendus:
+            nombre de caractères de la réponse
+        :type attendus:
+            un entier
+
+        :param delai:
+            échéance imposée en secondes, None pour la calculer
+        :type delai:
+            un entier, un flottant ou None
+
+        :returns:
+            un tuple (échéance, silence) en millisecondes
+        """
+        caractere = BITS_PAR_CARACTERE * 1000 / self._minitel.vitesse
+
+        if delai == None:
+            echeance = DELAI_RETOURNEMENT + (envoyes + attendus) * caractere
+        else:
+            echeance = delai * 1000
+
+        return echeance, SILENCE_REPONSE * caractere + 10
+
+    def _dialoguer(self, dialogue):
+        """Mène un dialogue avec le Minitel
+
+        Un dialogue est un générateur qui produit des tuples (commande,
+        nombre de caractères attendus en réponse, et éventuellement délai
+        d’attente de la réponse), reçoit la réponse du Minitel à chacun
+        d’eux et retourne son résultat en se terminant. Il peut aussi
+        produire une liste de tuples (commande, attente), émise d’un bloc
+        par la méthode appeler_lot : il reçoit alors la liste des réponses.
+        Chaque commande est ici transmise par la méthode appeler. La classe
+        AsyncMinitel mène les mêmes dialogues sans bloquer.
+
+        :param dialogue:
+            le dialogue à mener
+        :type dialogue:
+            un générateur
+
+        :returns:
+            le résultat du dialogue
+        """
+        try:
+            requete = next(dialogue)
+            while True:
+                if isinstance(requete, list):
+                    retour = self.appeler_lot(requete)
+                else:
+                    retour = self.appeler(*requete)
+                requete = dialogue.send(retour)
+        except StopIteration as fin:
+            return fin.value
 
     def definir_mode(self, mode = 'VIDEOTEX'):
         """Définit le mode de fonctionnement du Minitel.
@@ -333,6 +1261,10 @@ class Minitel:
         :returns:
             False si le changement de mode n’a pu avoir lieu, True sinon.
         """
+        return self._dialoguer(self._definir_mode(mode))
+
+    def _definir_mode(self, mode):
+        """Dialogue de changement de mode (voir definir_mode)"""
         assert isinstance(mode, str)
 
         # 3 modes sont possibles
@@ -349,37 +1281,43 @@ class Minitel:
         # demandant de passer de VIDEOTEX à VIDEOTEX, par exemple, ne donnent
         # lieu à aucune transaction avec le Minitel
         if self.mode == 'TELEINFORMATIQUE' and mode == 'VIDEOTEX':
-            retour = self.appeler([CSI, 0x3f, 0x7b], 2)
+            retour = yield ([CSI, 0x3f, 0x7b], 2)
             resultat = retour.egale([SEP, 0x5e])
         elif self.mode == 'TELEINFORMATIQUE' and mode == 'MIXTE':
             # Il n’existe pas de commande permettant de passer directement du
             # mode TéléInformatique au mode Mixte. On effectue donc la
             # transition en deux étapes en passant par le mode Videotex
-            retour = self.appeler([CSI, 0x3f, 0x7b], 2)
+            retour = yield ([CSI, 0x3f, 0x7b], 2)
             resultat = retour.egale([SEP, 0x5e])
 
             if not resultat:
                 return False
 
-            retour = self.appeler([PRO2, MIXTE1], 2)
+            retour = yield ([PRO2, MIXTE1], 2)
             resultat = retour.egale([SEP, 0x70])
         elif self.mode == 'VIDEOTEX' and mode == 'MIXTE':
-            retour = self.appeler([PRO2, MIXTE1], 2)
+            retour = yield ([PRO2, MIXTE1], 2)
             resultat = retour.egale([SEP, 0x70])
         elif self.mode == 'VIDEOTEX' and mode == 'TELEINFORMATIQUE':
-            retour = self.appeler([PRO2, TELINFO], 4)
+            retour = yield ([PRO2, TELINFO], 4)
             resultat = retour.egale([CSI, 0x3f, 0x7a])
         elif self.mode == 'MIXTE' and mode == 'VIDEOTEX':
-            retour = self.appeler([PRO2, MIXTE2], 2)
+            retour = yield ([PRO2, MIXTE2], 2)
             resultat = retour.egale([SEP, 0x71])
         elif self.mode == 'MIXTE' and mode == 'TELEINFORMATIQUE':
-            retour = self.appeler([PRO2, TELINFO], 4)
+            retour = yield ([PRO2, TELINFO], 4)
             resultat = retour.egale([CSI, 0x3f, 0x7a])
 
         # Si le changement a eu lieu, on garde le nouveau mode en mémoire
         if resultat:
             self.mode = mode
 
+            # L’écran modélisé ne suit que le mode Videotex
+            if self.ecran != None:
+                self.ecran.oublie()
+            self._suivi.oublie()
+            self._compresseur = None
+
         return resultat
 
     def identifier(self):
@@ -405,10 +1343,20 @@ class Minitel:
           (True ou False)
         - capacite['version'] -- Version du logiciel (une lettre)
         """
-        self.capacite = CAPACITES_BASIQUES
+        self._dialoguer(self._identifier())
 
-        # Émet la commande d’identification
-        retour = self.appeler([PRO1, ENQROM], 5)
+    def _identifier(self):
+        """Dialogue d’identification (voir identifier)"""
+        self.capacite = CAPACITES_BASIQUES
+        self.identite = None
+
+        # Émet d’un bloc la commande d’identification et la demande du status
+        # fonctionnement, qui indique le mode écran
+        retour, statut = yield [
+            ([PRO1, ENQROM], 5, ENTETE_IDENTIFICATION),
+            ([PRO1, STATUS_FONCTIONNEMENT], LONGUEUR_PRO2,
+             ENTETE_FONCTIONNEMENT)
+        ]
 
         # Teste la validité de la réponse
         if (retour.longueur != 5 or
@@ -417,6 +1365,7 @@ class Minitel:
             return
 
         # Extrait les caractères d’identification
+        self.identite = bytes(retour.valeurs[1:4]).decode()
         constructeur_minitel = chr(retour.valeurs[1])
         type_minitel         = chr(retour.valeurs[2])
         version_logiciel     = chr(retour.valeurs[3])
@@ -438,13 +1387,11 @@ class Minitel:
                 self.capacite['constructeur'] = 'Telic ou Matra'
 
         # Détermine le mode écran dans lequel se trouve le Minitel
-        retour = self.appeler([PRO1, STATUS_FONCTIONNEMENT], LONGUEUR_PRO2)
-
-        if retour.longueur != LONGUEUR_PRO2:
+        if statut.longueur != LONGUEUR_PRO2:
             # Le Minitel est en mode Téléinformatique car il ne répond pas
             # à une commande protocole
             self.mode = 'TELEINFORMATIQUE'
-        elif retour.valeurs[3] & 1 == 1:
+        elif statut.valeurs[3] & 1 == 1:
             # Le bit 1 du status fonctionnement indique le mode 80 colonnes
             self.mode = 'MIXTE'
         else:
@@ -470,26 +1417,20 @@ class Minitel:
             La méthode retourne la vitesse en bits par seconde ou -1 si elle
             n’a pas pu être déterminée.
         """
+        return self._dialoguer(self._deviner_vitesse())
+
+    def _deviner_vitesse(self):
+        """Dialogue de détection de la vitesse (voir deviner_vitesse)"""
         # Vitesses possibles jusqu’au Minitel 2
         vitesses = [9600, 4800, 1200, 300]
 
         for vitesse in vitesses:
             # Configure le port série à la vitesse à tester
-            self._minitel.deinit()
-            self._minitel = UART(
-                self.uart_num,
-                baudrate = vitesse, # vitesse à 1200 bps, le standard Minitel
-                bits = 7,           # taille de caractère à 7 bits
-                parity = 0,         # parité paire
-                stop = 1,           # 1 bit d’arrêt
-                timeout = 1,        # 1s de timeout
-                timeout_char = 1,   # 1s de timeout entre caracteres
-                flow   = 0          # pas de contrôle matériel
-            )
+            self._changer_vitesse(vitesse)
 
 
             # Envoie une demande de statut terminal
-            retour = self.appeler([PRO1, STATUS_TERMINAL], LONGUEUR_PRO2)
+            retour = yield ([PRO1, STATUS_TERMINAL], LONGUEUR_PRO2)
 
             # Le Minitel doit renvoyer un acquittement PRO2
             if retour.longueur == LONGUEUR_PRO2:
@@ -519,6 +1460,10 @@ class Minitel:
             La méthode retourne la vitesse en bits par seconde ou -1 si elle
             n’a pas pu être déterminée.
         """
+        return self._dialoguer(self._recuperation())
+
+    def _recuperation(self):
+        """Dialogue de retour au mode Videotex (voir recuperation)"""
         # Vitesses possibles jusqu’au Minitel 2
         vitesses = [9600, 4800, 1200, 300]
         
@@ -527,21 +1472,11 @@ class Minitel:
 
         for vitesse in vitesses:
             # Configure le port série à la vitesse à tester
-            self._minitel.deinit()
-            self._minitel = UART(
-                self.uart_num,
-                baudrate = vitesse, # vitesse à 1200 bps, le standard Minitel
-                bits = 7,           # taille de caractère à 7 bits
-                parity = 0,         # parité paire
-                stop = 1,           # 1 bit d’arrêt
-                timeout = 1,        # 1s de timeout
-                timeout_char = 1,   # 1s de timeout entre caracteres
-                flow   = 0          # pas de contrôle matériel
-            )
+            self._changer_vitesse(vitesse)
 
 
             # Envoie la demande de passage en mode VIDEOTEX
-            retour = self.appeler([CSI, 0x3f, 0x7b], 2)
+            retour = yield ([CSI, 0x3f, 0x7b], 2)
             resultat = retour.egale([SEP, 0x5e])
 
             # La méthode doit renvoyer True
@@ -580,6 +1515,10 @@ class Minitel:
         :returns:
             True si la vitesse a pu être programmée, False sinon.
         """
+        return self._dialoguer(self._definir_vitesse(vitesse))
+
+    def _definir_vitesse(self, vitesse):
+        """Dialogue de changement de vitesse (voir definir_vitesse)"""
         assert isinstance(vitesse, int)
         # Si la vitesse est deja la bonne, on ne fait rien
         if vitesse == self.vitesse:
@@ -592,7 +1531,7 @@ class Minitel:
 #             return False
 
         # Envoie une commande protocole de programmation de vitesse
-        retour = self.appeler([PRO2, PROG, vitesses[vitesse]], LONGUEUR_PRO2)
+        retour = yield ([PRO2, PROG, vitesses[vitesse]], LONGUEUR_PRO2)
 
         # Le Minitel doit renvoyer un acquittement PRO2+REP_STATUS_VITESSE
         if retour.longueur == LONGUEUR_PRO2:
@@ -603,21 +1542,114 @@ class Minitel:
                 return False
 
         # Configure le port série à la nouvelle vitesse
-        self._minitel.deinit()
-        self._minitel = UART(
-            self.uart_num,
-            baudrate = vitesse, # vitesse à 1200 bps, le standard Minitel
-            bits = 7,           # taille de caractère à 7 bits
-            parity = 0,         # parité paire
-            stop = 1,           # 1 bit d’arrêt
-            timeout = 1,        # 1s de timeout
-            timeout_char = 1,   # 1s de timeout entre caracteres
-            flow   = 0          # pas de contrôle matériel
-        )
+        self._changer_vitesse(vitesse)
         self.vitesse = vitesse
 
         return True
 
+    def demarrer(self, vitesse = None, fichier = FICHIER_DEMARRAGE):
+        """Établit au plus vite la connexion avec le Minitel.
+
+        Cette méthode remplace l’enchaînement de deviner_vitesse, identifier
+        et definir_vitesse au démarrage du programme.
+
+        La vitesse, l’identité et les capacités du Minitel sont mémorisées
+        dans un fichier. Au démarrage suivant, une seule commande (ENQROM et
+        statut fonctionnement envoyés ensemble) vérifie, à la vitesse
+        mémorisée puis à 1200 bps (la vitesse à l’allumage du Minitel), que
+        le même Minitel répond. La détection complète (deviner_vitesse,
+        recuperation puis identifier) n’a lieu qu’en cas d’échec.
+
+        Le Minitel est ensuite réglé à la vitesse demandée et le fichier
+        n’est réécrit que si quelque chose a changé.
+
+        :param vitesse:
+            vitesse souhaitée en bits par seconde, None pour la vitesse
+            maximale du Minitel
+        :type vitesse:
+            un entier ou None
+
+        :param fichier:
+            chemin du fichier de mémorisation, None pour ne rien mémoriser
+        :type fichier:
+            une chaîne de caractères ou None
+
+        :returns:
+            la vitesse de la connexion en bits par seconde ou -1 si le
+            Minitel ne répond pas
+        """
+        return self._dialoguer(self._demarrer(vitesse, fichier))
+
+    def _demarrer(self, vitesse, fichier):
+        """Dialogue de démarrage (voir demarrer)"""
+        assert vitesse == None or isinstance(vitesse, int)
+
+        memoire = _lire_memoire(fichier)
+
+        trouve = False
+        if memoire != None:
+            essais = [memoire['vitesse']]
+            if memoire['vitesse'] != 1200:
+                essais.append(1200)
+
+            for essai in essais:
+                trouve = yield from self._valider(memoire, essai)
+                if trouve:
+                    break
+
+        if not trouve:
+            if (yield from self._deviner_vitesse()) == -1:
+                if (yield from self._recuperation()) == -1:
+                    return -1
+
+            yield from self._identifier()
+
+        if vitesse == None:
+            vitesse = self.capacite['vitesse']
+        yield from self._definir_vitesse(vitesse)
+
+        if self.identite != None:
+            etat = {
+                'vitesse': self.vitesse,
+                'identite': self.identite,
+                'capacite': self.capacite
+            }
+            if etat != memoire:
+                _ecrire_memoire(fichier, etat)
+
+        return self.vitesse
+
+    def _valider(self, memoire, vitesse):
+        """Dialogue vérifiant que le Minitel mémorisé répond à une vitesse
+
+        :returns:
+            True si le Minitel a répondu, auquel cas son identité, ses
+            capacités, sa vitesse et son mode sont repris
+        """
+        self._changer_vitesse(vitesse)
+
+        retour, statut = yield [
+            ([PRO1, ENQROM], 5, ENTETE_IDENTIFICATION),
+            ([PRO1, STATUS_FONCTIONNEMENT], LONGUEUR_PRO2,
+             ENTETE_FONCTIONNEMENT)
+        ]
+
+        if (retour.longueur != 5 or
+            statut.longueur != LONGUEUR_PRO2 or
+            retour.valeurs[0] != SOH or
+            retour.valeurs[4] != EOT or
+            bytes(retour.valeurs[1:4]).decode() != memoire['identite']):
+            return False
+
+        self.identite = memoire['identite']
+        self.capacite = memoire['capacite']
+        self.vitesse = vitesse
+
+        # Le bit 1 du status fonctionnement indique le mode 80 colonnes
+        self.mode = 'MIXTE' if statut.valeurs[3] & 1 == 1 else 'VIDEOTEX'
+
+        return True
+
     def configurer_clavier(self, etendu = False, curseur = False,
                            minuscule = False):
         """Configure le fonctionnement du clavier.
@@ -628,8 +1660,8 @@ class Minitel:
         fonction, combinaisons de touches etc.).
 
         La méthode renvoie True si toutes les commandes de configuration ont
-        correctement été traitées par le Minitel. Dès qu’une commande échoue,
-        la méthode arrête immédiatement et retourne False.
+        correctement été traitées par le Minitel. Les commandes sont émises
+        d’un bloc : dès qu’une seule échoue, la méthode retourne False.
 
         :param etendu:
             True pour un clavier en mode étendu, False pour un clavier en mode
@@ -649,6 +1681,12 @@ class Minitel:
         :type minuscule:
             un booléen
         """
+        return self._dialoguer(
+            self._configurer_clavier(etendu, curseur, minuscule)
+        )
+
+    def _configurer_clavier(self, etendu, curseur, minuscule):
+        """Dialogue de configuration du clavier (voir configurer_clavier)"""
         assert etendu in [True, False]
         assert curseur in [True, False]
         assert minuscule in [True, False]
@@ -657,21 +1695,23 @@ class Minitel:
         # start/stop
         bascules = { True: START, False: STOP }
 
-        # Crée les séquences des 3 appels en fonction des arguments
+        # Crée les séquences des 3 appels en fonction des arguments, avec
+        # l’en-tête de leur réponse : le status clavier pour les commandes
+        # PRO3, le status fonctionnement pour la commande PRO2
         appels = [
-            ([PRO3, bascules[etendu   ], RCPT_CLAVIER, ETEN], LONGUEUR_PRO3),
-            ([PRO3, bascules[curseur  ], RCPT_CLAVIER, C0  ], LONGUEUR_PRO3),
-            ([PRO2, bascules[minuscule], MINUSCULES        ], LONGUEUR_PRO2)
+            ([PRO3, bascules[etendu   ], RCPT_CLAVIER, ETEN], LONGUEUR_PRO3,
+             ENTETE_CLAVIER),
+            ([PRO3, bascules[curseur  ], RCPT_CLAVIER, C0  ], LONGUEUR_PRO3,
+             ENTETE_CLAVIER),
+            ([PRO2, bascules[minuscule], MINUSCULES        ], LONGUEUR_PRO2,
+             ENTETE_FONCTIONNEMENT)
         ]
 
-        # Envoie les commandes une par une
-        for appel in appels:
-            commande = appel[0] # Premier élément du tuple = commande
-            longueur = appel[1] # Second élément du tuple = longueur réponse
-
-            retour = self.appeler(commande, longueur)
+        # Envoie les commandes d’un bloc puis vérifie chaque réponse
+        retours = yield appels
 
-            if retour.longueur != longueur:
+        for appel, retour in zip(appels, retours):
+            if retour.longueur != appel[1]:
                 return False
 
         return True
@@ -693,6 +1733,9 @@ class Minitel:
 
         Si une couleur n’est pas valide, elle est simplement ignorée.
 
+        Si le Minitel utilise déjà la couleur demandée, aucune commande n’est
+        émise.
+
         :param caractere:
             couleur à affecter à l’avant-plan.
         :type caractere:
@@ -706,25 +1749,35 @@ class Minitel:
         assert isinstance(caractere, (str, int)) or caractere == None
         assert isinstance(fond, (str, int)) or fond == None
 
+        modele = self._attributs()
+        commandes = []
+
         # Définit la couleur d’avant-plan (la couleur du caractère)
         if caractere != None:
             couleur = normaliser_couleur(caractere)
-            if couleur != None:
-                self.envoyer([ESC, 0x40 + couleur])
+            if couleur != None and (
+                modele == None or couleur != modele.avant_plan
+            ):
+                commandes += [ESC, 0x40 + couleur]
 
         # Définit la couleur d’arrière-plan (la couleur de fond)
         if fond != None:
             couleur = normaliser_couleur(fond)
-            if couleur != None:
-                self.envoyer([ESC, 0x50 + couleur])
+            if couleur != None and (modele == None or couleur != modele.fond):
+                commandes += [ESC, 0x50 + couleur]
+
+        self._attribuer(commandes)
 
     def position(self, colonne, ligne, relatif = False):
         """Définit la position du curseur du Minitel
 
         Note:
-        Cette méthode optimise le déplacement du curseur, il est donc important
-        de se poser la question sur le mode de positionnement (relatif vs
-        absolu) car le nombre de caractères générés peut aller de 1 à 5.
+        Lorsque la position du curseur est connue, un positionnement absolu
+        emprunte le déplacement le plus court (RS, US, CR, BS, TAB, LF, VT ou
+        CSI). Comme RS et US, il remet les attributs à leur valeur par
+        défaut. La position est suivie même sans modèle de l’écran. Avec
+        l’écho actif, la lecture d’une touche la rend inconnue, et une touche
+        reçue mais pas encore lue fait positionner le curseur par US.
 
         Sur le Minitel, la première colonne a la valeur 1. La première ligne
         a également la valeur 1 bien que la ligne 0 existe. Cette dernière
@@ -753,36 +1806,70 @@ class Minitel:
         assert relatif in [True, False]
 
         if not relatif:
-            # Déplacement absolu
-            if colonne == 1 and ligne == 1:
-                self.envoyer([RS])
+            # Déplacement absolu, depuis la position connue du curseur.
+            # Avec l’écho actif, une touche reçue mais pas encore lue a pu
+            # déplacer le curseur du Minitel.
+            modele = self._modele()
+            if (self._image == None and self.echo_actif
+                and (len(self._analyseur) or self._analyseur.en_cours())):
+                modele = None
+
+            if modele != None and modele.curseur_connu:
+                octets = deplacement(modele.x, modele.y, colonne, ligne)
+
+                # Seuls RS, US et les changements de rangée remettent les
+                # attributs à leur valeur par défaut
+                if (modele.y == ligne and (not octets or octets[0] not in (RS, US))
+                    and not modele.attributs_par_defaut()):
+                    octets = deplacement(None, None, colonne, ligne)
             else:
-                self.envoyer([US, 0x40 + ligne, 0x40 + colonne])
+                octets = deplacement(None, None, colonne, ligne)
+
+            if octets:
+                self._transmettre(octets)
+            self._suivi.place(colonne, ligne)
         else:
             # Déplacement relatif par rapport à la position actuelle
+            commandes = []
+
             if ligne != 0:
                 if ligne >= -4 and ligne <= -1:
                     # Déplacement court en haut
-                    self.envoyer([VT]*-ligne)
+                    commandes += [VT]*-ligne
                 elif ligne >= 1 and ligne <= 4:
                     # Déplacement court en bas
-                    self.envoyer([LF]*ligne)
+                    commandes += [LF]*ligne
                 else:
                     # Déplacement long en haut ou en bas
-                    direction = { True: 'B', False: 'A'}
-                    self.envoyer([CSI, str(ligne), direction[ligne < 0]])
+                    direction = { True: 'A', False: 'B'}
+                    commandes += [CSI, str(abs(ligne)), direction[ligne < 0]]
 
             if colonne != 0:
                 if colonne >= -4 and colonne <= -1:
                     # Déplacement court à gauche
-                    self.envoyer([BS]*-colonne)
+                    commandes += [BS]*-colonne
                 elif colonne >= 1 and colonne <= 4:
                     # Déplacement court à droite
-                    self.envoyer([TAB]*colonne)
+                    commandes += [TAB]*colonne
                 else:
                     # Déplacement long à gauche ou à droite
-                    direction = { True: 'C', False: 'D'}
-                    self.envoyer([CSI, str(colonne), direction[colonne < 0]])
+                    direction = { True: 'D', False: 'C'}
+                    commandes += [CSI, str(abs(colonne)), direction[colonne < 0]]
+
+            self._commande(commandes)
+            self._suivi.deplace(colonne, ligne)
+
+    def _attribuer(self, commandes):
+        """Envoie des séquences ESC d’attributs et les suit
+
+        :param commandes:
+            suite de séquences ESC de couleur, de taille ou d’effet
+        :type commandes:
+            une liste
+        """
+        commandes = Sequence(commandes)
+        self._commande(commandes)
+        self._suivi.attributs(commandes.valeurs)
 
     def taille(self, largeur = 1, hauteur = 1):
         """Définit la taille des prochains caractères
@@ -801,6 +1888,9 @@ class Minitel:
         Le positionnement avec des caractères deux fois plus hauts se fait par
         rapport au bas du caractère.
 
+        Si le Minitel utilise déjà la taille demandée, aucune commande n’est
+        émise.
+
         :param largeur:
             coefficiant multiplicateur de largeur (1 ou 2)
         :type largeur:
@@ -814,7 +1904,13 @@ class Minitel:
         assert largeur in [1, 2]
         assert hauteur in [1, 2]
 
-        self.envoyer([ESC, 0x4c + (hauteur - 1) + (largeur - 1) * 2])
+        taille = (hauteur - 1) + (largeur - 1) * 2
+
+        modele = self._attributs()
+        if modele != None and taille == modele.taille:
+            return
+
+        self._attribuer([ESC, 0x4c + taille])
 
     def effet(self, soulignement = None, clignotement = None, inversion = None):
         """Active ou désactive des effets
@@ -822,6 +1918,8 @@ class Minitel:
         Le Minitel dispose de 3 effets sur les caractères : soulignement,
         clignotement et inversion vidéo.
 
+        Un effet déjà dans l’état demandé n’est pas renvoyé au Minitel.
+
         :param soulignement:
             indique s’il faut activer le soulignement (True) ou le désactiver
             (False)
@@ -845,16 +1943,30 @@ class Minitel:
         assert inversion in [True, False, None]
 
         # Gère le soulignement
-        soulignements = {True: [ESC, 0x5a], False: [ESC, 0x59], None: None}
-        self.envoyer(soulignements[soulignement])
+        soulignements = {True: [ESC, 0x5a], False: [ESC, 0x59], None: []}
 
         # Gère le clignotement
-        clignotements = {True: [ESC, 0x48], False: [ESC, 0x49], None: None}
-        self.envoyer(clignotements[clignotement])
+        clignotements = {True: [ESC, 0x48], False: [ESC, 0x49], None: []}
 
         # Gère l’inversion vidéo
-        inversions = {True: [ESC, 0x5d], False: [ESC, 0x5c], None: None}
-        self.envoyer(inversions[inversion])
+        inversions = {True: [ESC, 0x5d], False: [ESC, 0x5c], None: []}
+
+        # Ignore les effets déjà dans l’état demandé
+        modele = self._attributs()
+        if modele != None:
+            if soulignement == bool(modele.effet & SOULIGNEMENT):
+                soulignement = None
+            if clignotement == bool(modele.effet & CLIGNOTEMENT):
+                clignotement = None
+            if inversion == bool(modele.effet & INVERSION):
+                inversion = None
+
+        # Les trois effets partent en une seule écriture
+        self._attribuer([
+            soulignements[soulignement],
+            clignotements[clignotement],
+            inversions[inversion]
+        ])
 
     def curseur(self, visible):
         """Active ou désactive l’affichage du curseur
@@ -876,7 +1988,7 @@ class Minitel:
         assert visible in [True, False]
 
         etats = {True: CON, False: COF}
-        self.envoyer([etats[visible]])
+        self._commande([etats[visible]])
 
     def echo(self, actif):
         """Active ou désactive l’écho clavier
@@ -901,15 +2013,23 @@ class Minitel:
         :returns:
             True si la commande a été acceptée par le Minitel, False sinon.
         """
+        return self._dialoguer(self._echo(actif))
+
+    def _echo(self, actif):
+        """Dialogue de réglage de l’écho (voir echo)"""
         assert actif in [True, False]
 
         actifs = {
             True: [PRO3, AIGUILLAGE_ON, RCPT_MODEM, EMET_CLAVIER],
             False: [PRO3, AIGUILLAGE_OFF, RCPT_MODEM, EMET_CLAVIER]
         }
-        retour = self.appeler(actifs[actif], LONGUEUR_PRO3)
-        
-        return retour.longueur == LONGUEUR_PRO3
+        retour = yield (actifs[actif], LONGUEUR_PRO3)
+
+        if retour.longueur != LONGUEUR_PRO3:
+            return False
+
+        self.echo_actif = actif
+        return True
 
     def efface(self, portee = 'tout'):
         """Efface tout ou partie de l’écran
@@ -945,7 +2065,20 @@ class Minitel:
 
         assert portee in portees
 
-        self.envoyer(portees[portee])
+        self._commande(portees[portee])
+
+        # FF replace le curseur en haut à gauche, le LF qui quitte la rangée
+        # 0 le ramène où il était, et le sort des attributs après CSI J ou
+        # CSI K varie selon les modèles de Minitel
+        suivi = self._suivi
+        if portee in ('tout', 'vraimenttout'):
+            suivi.place(1, 1)
+        elif portee == 'statut':
+            if suivi.y == 0:
+                suivi.oublie()
+            suivi.reinitialise_attributs()
+        elif portee != 'finligne':
+            suivi.attributs_connus = False
 
     def repeter(self, caractere, longueur):
         """Répéter un caractère
@@ -965,21 +2098,27 @@ class Minitel:
         assert isinstance(caractere, (str, int, list))
         assert isinstance(caractere, int) or len(caractere) == 1
 
-        self.envoyer([caractere, REP, 0x40 + longueur - 1])
+        commandes = Sequence([caractere, REP, 0x40 + longueur - 1])
+        if commandes.longueur == 3 and commandes.valeurs[0] >= 0x20:
+            self._commande(commandes)
+            self._suivi.avance(longueur)
+        else:
+            self.envoyer_brut(commandes.vue())
 
     def bip(self):
         """Émet un bip
 
         Demande au Minitel d’émettre un bip
         """
-        self.envoyer([BEL])
+        self._commande([BEL])
 
     def debut_ligne(self):
         """Retour en début de ligne
 
         Positionne le curseur au début de la ligne courante.
         """
-        self.envoyer([CR])
+        self._commande([CR])
+        self._suivi.x = 1
 
     def supprime(self, nb_colonne = None, nb_ligne = None):
         """Supprime des caractères après le curseur
@@ -1005,11 +2144,23 @@ class Minitel:
         assert (isinstance(nb_ligne, int) and nb_ligne >= 0) or \
                 nb_ligne == None
 
+        commandes = []
+
         if nb_colonne != None:
-            self.envoyer([CSI, str(nb_colonne), 'P'])
+            commandes += [CSI, str(nb_colonne), 'P']
 
         if nb_ligne != None:
-            self.envoyer([CSI, str(nb_ligne), 'M'])
+            commandes += [CSI, str(nb_ligne), 'M']
+
+        self._commande(commandes)
+
+        # Le sort des attributs en cours après une suppression varie selon
+        # les modèles de Minitel, la suppression de rangées ramène le
+        # curseur en début de rangée
+        if commandes:
+            self._suivi.attributs_connus = False
+        if nb_ligne != None and self._suivi.y > 0:
+            self._suivi.x = 1
 
     def insere(self, nb_colonne = None, nb_ligne = None):
         """Insère des caractères après le curseur
@@ -1031,11 +2182,25 @@ class Minitel:
         assert (isinstance(nb_ligne, int) and nb_ligne >= 0) or \
                 nb_ligne == None
 
+        commandes = []
+
         if nb_colonne != None:
-            self.envoyer([CSI, '4h', ' ' * nb_colonne, CSI, '4l'])
+            commandes += [CSI, '4h', ' ' * nb_colonne, CSI, '4l']
+
+        if nb_ligne != None:
+            commandes += [CSI, str(nb_ligne), 'L']
+
+        self._commande(commandes)
 
+        # Les espaces insérés avancent le curseur. Le sort des attributs en
+        # cours après une insertion de rangées varie selon les modèles de
+        # Minitel, le curseur revient en début de rangée
+        if nb_colonne != None:
+            self._suivi.avance(nb_colonne)
         if nb_ligne != None:
-            self.envoyer([CSI, str(nb_ligne), 'L'])
+            self._suivi.attributs_connus = False
+            if self._suivi.y > 0:
+                self._suivi.x = 1
 
     def semigraphique(self, actif = True):
         """Passe en mode semi-graphique ou en mode alphabétique
@@ -1048,8 +2213,15 @@ class Minitel:
         """
         assert actif in [True, False]
 
+        # Le jeu demandé est peut-être déjà le jeu en cours
+        jeu = G1 if actif else G0
+        modele = self._attributs()
+        if modele != None and modele.jeu == jeu:
+            return
+
         actifs = { True: SO, False: SI}
-        self.envoyer(actifs[actif])
+        self._commande(actifs[actif])
+        self._suivi.jeu = jeu
 
     def redefinir(self, depuis, dessins, jeu = 'G0'):
         """Redéfinit des caractères du Minitel
@@ -1100,14 +2272,17 @@ class Minitel:
         assert isinstance(depuis, str) and len(depuis) == 1
         assert isinstance(dessins, str)
 
+        # Toute la redéfinition est construite puis envoyée en une fois
+        commandes = []
+
         # Deux jeux sont disponible G’0 et G’1
         if jeu == 'G0':
-            self.envoyer([US, 0x23, 0x20, 0x20, 0x20, 0x42, 0x49])
+            commandes += [US, 0x23, 0x20, 0x20, 0x20, 0x42, 0x49]
         else:
-            self.envoyer([US, 0x23, 0x20, 0x20, 0x20, 0x43, 0x49])
+            commandes += [US, 0x23, 0x20, 0x20, 0x20, 0x43, 0x49]
 
         # On indique à partir de quel caractère on veut rédéfinir les dessins
-        self.envoyer([US, 0x23, depuis, 0x30])
+        commandes += [US, 0x23, depuis, 0x30]
 
         octet = ''
         compte_pixel = 0
@@ -1124,24 +2299,26 @@ class Minitel:
             # On regroupe les pixels du caractères par paquets de 6
             # car on ne peut envoyer que 6 bits à la fois
             if len(octet) == 6:
-                self.envoyer(0x40 + int(octet, 2))
+                commandes.append(0x40 + int(octet, 2))
                 octet = ''
 
             # Quand 80 pixels (8 colonnes × 10 lignes) ont été envoyés
             # on ajoute 4 bits à zéro car l’envoi se fait par paquet de 6 bits
             # (8×10 = 80 pixels, 14×6 = 84 bits, 84-80 = 4)
             if compte_pixel == 80:
-                self.envoyer(0x40 + int(octet + '0000', 2))
-                self.envoyer(0x30)
+                commandes.append(0x40 + int(octet + '0000', 2))
+                commandes.append(0x30)
                 octet = ''
                 compte_pixel = 0
 
         # Positionner le curseur permet de sortir du mode de définition
-        self.envoyer([US, 0x41, 0x41])
+        commandes += [US, 0x41, 0x41]
 
         # Sélectionne le jeu de caractère fraîchement modifié (G’0 ou G’1)
         if jeu == 'GO':
-            self.envoyer([ESC, 0x28, 0x20, 0x42])
+            commandes += [ESC, 0x28, 0x20, 0x42]
         else:
-            self.envoyer([ESC, 0x29, 0x20, 0x43])
+            commandes += [ESC, 0x29, 0x20, 0x43]
+
+        self.envoyer(commandes)
 
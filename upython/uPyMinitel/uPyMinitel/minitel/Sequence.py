@@ -29,6 +29,90 @@ UNICODEVERSAUTRE = {
     'à': '0E400F', 'è': '0E7F0F', 'é': '0E7B0F', 'ù': '0E7C0F'
 }
 
+def _compile_table(table):
+    """Convertit une table de conversion hexadécimale en table d’octets
+
+    :param table:
+        table associant un caractère unicode à une chaîne hexadécimale
+    :type table:
+        un dictionnaire
+
+    :returns:
+        un dictionnaire associant chaque caractère unicode à ses octets
+        Minitel (bytes)
+    """
+    return {caractere: unhexlify(code) for caractere, code in table.items()}
+
+# Tables de conversion précompilées pour chaque standard, calculées une seule
+# fois à l’import du module
+TABLES_CONVERSION = {
+    'VIDEOTEX': _compile_table(UNICODEVERSVIDEOTEX),
+    'MIXTE': _compile_table(UNICODEVERSAUTRE),
+    'TELEINFORMATIQUE': _compile_table(UNICODEVERSAUTRE)
+}
+
+# Remplacement d’un caractère sans équivalent Minitel
+INCONNU = b'?'
+
+def encode_dans(tampon, texte, standard = 'VIDEOTEX'):
+    """Convertit une chaîne unicode et ajoute le résultat à un tampon
+
+    Les caractères ASCII sont recopiés tels quels, les autres passent par la
+    table de conversion précompilée du standard demandé.
+
+    :param tampon:
+        tableau d’octets à compléter
+    :type tampon:
+        un bytearray
+
+    :param texte:
+        chaîne à convertir
+    :type texte:
+        une chaîne de caractères
+
+    :param standard:
+        VIDEOTEX, MIXTE ou TELEINFORMATIQUE
+    :type standard:
+        une chaîne de caractères
+
+    :returns:
+        le tampon complété
+    """
+    octets = texte.encode()
+
+    # Une chaîne purement ASCII a autant d’octets UTF-8 que de caractères,
+    # elle est alors recopiée d’un bloc
+    if len(octets) == len(texte):
+        tampon.extend(octets)
+        return tampon
+
+    table = TABLES_CONVERSION[standard]
+    for caractere in texte:
+        if ord(caractere) < 0x80:
+            tampon.append(ord(caractere))
+        else:
+            tampon.extend(table.get(caractere, INCONNU))
+
+    return tampon
+
+def encode(texte, standard = 'VIDEOTEX'):
+    """Convertit une chaîne unicode en octets à destination du Minitel
+
+    :param texte:
+        chaîne à convertir
+    :type texte:
+        une chaîne de caractères
+
+    :param standard:
+        VIDEOTEX, MIXTE ou TELEINFORMATIQUE
+    :type standard:
+        une chaîne de caractères
+
+    :returns:
+        un objet bytes
+    """
+    return bytes(encode_dans(bytearray(), texte, standard))
+
 class Sequence:
     """Une classe représentant une séquence de valeurs
 
@@ -42,8 +126,8 @@ class Sequence:
             valeur à ajouter à la construction de l’objet. Si la valeur est à
             None, aucune valeur n’est ajoutée
         :type valeur:
-            une chaîne de caractères, un entier, une liste, une séquence ou
-            None
+            une chaîne de caractères, un entier, une liste, des octets, une
+            séquence ou None
 
         :param standard:
             standard à utiliser pour la conversion unicode vers Minitel. Les
@@ -53,10 +137,11 @@ class Sequence:
             une chaîne de caractères
         """
         assert valeur == None or \
-                isinstance(valeur, (list, int, str, Sequence))
+                isinstance(valeur, (list, int, str, bytes, bytearray,
+                                    Sequence))
         assert standard in ['VIDEOTEX', 'MIXTE', 'TELEINFORMATIQUE']
 
-        self.valeurs = []
+        self.valeurs = bytearray()
         self.longueur = 0
         self.standard = standard
 
@@ -70,17 +155,21 @@ class Sequence:
         d’être ajoutée à la séquence. Cela garantit que la séquence ne contient
         que des entiers représentant des caractères de la norme ASCII.
 
+        La canonisation se fait directement à la fin du tableau d’octets de la
+        séquence, sans liste intermédiaire.
+
         :param valeur:
             valeur à ajouter
         :type valeur:
-            une chaîne de caractères, un entier, une liste ou une Séquence
+            une chaîne de caractères, un entier, une liste, des octets ou une
+            Séquence
         """
-        assert isinstance(valeur, (list, int, str, Sequence))
+        assert isinstance(valeur, (list, int, str, bytes, bytearray, Sequence))
 
-        self.valeurs += self.canonise(valeur)
+        self.canonise(valeur, self.valeurs)
         self.longueur = len(self.valeurs)
 
-    def canonise(self, valeur):
+    def canonise(self, valeur, canonise = None):
         """Canonise une séquence de caractères
 
         Si une liste est soumise, quelle que soit sa profondeur, elle sera
@@ -89,46 +178,75 @@ class Sequence:
         séquences de caractères plus aisée. Cela facilite également la
         comparaison de deux séquences.
 
+        La remise à plat se fait en une seule passe, sans récursion : les
+        listes imbriquées sont parcourues à l’aide d’une pile d’itérateurs.
+
         :param valeur:
             valeur à canoniser
         :type valeur:
-            une chaîne de caractères, un entier, une liste ou une Séquence
+            une chaîne de caractères, un entier, une liste, des octets ou une
+            Séquence
+
+        :param canonise:
+            tableau d’octets à compléter. Si None, un nouveau tableau est créé
+        :type canonise:
+            un bytearray ou None
 
         :returns:
-            Une liste de profondeur 1 d’entiers représentant des valeurs à la
+            Un tableau d’octets (bytearray) représentant des valeurs à la
             norme ASCII.
 
         Exemple::
             canonise(['dd', 32, ['dd', 32]]) retournera
-            [100, 100, 32, 100, 100, 32]
+            bytearray(b'dd dd ')
         """
-        assert isinstance(valeur, (list, int, str, Sequence))
+        assert isinstance(valeur, (list, int, str, bytes, bytearray, Sequence))
+
+        if canonise == None:
+            canonise = bytearray()
 
-        # Si la valeur est juste un entier, on le retient dans une liste
+        # Si la valeur est juste un entier, on l’ajoute au tableau
         if isinstance(valeur, int):
-            return [valeur]
+            canonise.append(valeur)
+            return canonise
 
         # Si la valeur est une Séquence, ses valeurs ont déjà été canonisées
         if isinstance(valeur, Sequence):
-            return valeur.valeurs
-
-        # À ce point, le paramètre contient soit une chaîne de caractères, soit
-        # une liste. L’une ou l’autre est parcourable par une boucle for ... in
-        # Transforme récursivement chaque élément de la liste en entier
-        canonise = []
-        for element in valeur:
-            if isinstance(element, str):
-                # Cette boucle traite 2 cas : celui ou liste est une chaîne
-                # unicode et celui ou element est une chaîne de caractères
-                for caractere in element:
-                    for ascii in self.unicode_vers_minitel(caractere):
-                        canonise.append(ascii)
-            elif isinstance(element, int):
-                # Un entier a juste besoin d’être ajouté à la liste finale
-                canonise.append(element)
-            elif isinstance(element, list):
-                # Si l’élément est une liste, on la canonise récursivement
-                canonise = canonise + self.canonise(element)
+            canonise.extend(valeur.valeurs)
+            return canonise
+
+        # Des octets, comme les constantes de plusieurs octets, sont
+        # recopiés d’un bloc
+        if isinstance(valeur, (bytes, bytearray)):
+            canonise.extend(valeur)
+            return canonise
+
+        # Une chaîne de caractères est convertie en une passe
+        if isinstance(valeur, str):
+            return encode_dans(canonise, valeur, self.standard)
+
+        # À ce point, le paramètre est une liste. Plutôt que de la canoniser
+        # récursivement, on empile un itérateur par niveau d’imbrication
+        pile = [iter(valeur)]
+        while pile:
+            for element in pile[-1]:
+                if isinstance(element, str):
+                    encode_dans(canonise, element, self.standard)
+                elif isinstance(element, int):
+                    # Un entier a juste besoin d’être ajouté au tableau
+                    canonise.append(element)
+                elif isinstance(element, list):
+                    # Une sous-liste est parcourue avant la suite de la liste
+                    # courante
+                    pile.append(iter(element))
+                    break
+                elif isinstance(element, (bytes, bytearray)):
+                    canonise.extend(element)
+                elif isinstance(element, Sequence):
+                    canonise.extend(element.valeurs)
+            else:
+                # La liste au sommet de la pile a été entièrement parcourue
+                pile.pop()
 
         return canonise
 
@@ -146,31 +264,33 @@ class Sequence:
         """
         assert isinstance(caractere, str) and len(caractere) == 1
 
-        if self.standard == 'VIDEOTEX':
-            if caractere in UNICODEVERSVIDEOTEX:
-                return unhexlify(UNICODEVERSVIDEOTEX[caractere])
-        else:
-            if caractere in UNICODEVERSAUTRE:
-                return unhexlify(UNICODEVERSAUTRE[caractere])
+        if ord(caractere) < 0x80:
+            return caractere.encode()
 
 #         return normalize('NFKD', caractere).encode('ascii', 'replace')
-        return caractere.encode('ascii', 'replace')
+        return TABLES_CONVERSION[self.standard].get(caractere, INCONNU)
 
     def egale(self, sequence):
         """Teste l’égalité de 2 séquences
 
         :param sequence:
-            séquence à comparer. Si la séquence n’est pas un objet Sequence,
-            elle est d’abord convertie en objet Sequence afin de canoniser ses
-            valeurs.
+            séquence à comparer. Si la séquence n’est ni un objet Sequence
+            ni des octets, elle est d’abord convertie en objet Sequence afin
+            de canoniser ses valeurs.
         :type sequence:
-            un objet Sequence, une liste, un entier, une chaîne de caractères
-            ou une chaîne unicode
+            un objet Sequence, des octets, une liste, un entier, une chaîne
+            de caractères ou une chaîne unicode
 
         :returns:
             True si les 2 séquences sont égales, False sinon
         """
-        assert isinstance(sequence, (Sequence, list, int, str))
+        assert isinstance(sequence, (Sequence, bytes, bytearray, list, int,
+                                     str))
+
+        # Les octets, comme les codes de touches, sont comparés directement,
+        # sans créer de séquence intermédiaire
+        if isinstance(sequence, (bytes, bytearray)):
+            return self.valeurs == sequence
 
         # Si la séquence à comparer n’est pas de la classe Sequence, alors
         # on la convertit
@@ -179,3 +299,14 @@ class Sequence:
 
         return self.valeurs == sequence.valeurs
 
+    def vue(self):
+        """Vue sur les octets de la séquence
+
+        Retourne une vue (memoryview) sur le tableau d’octets de la séquence,
+        directement utilisable par un port série sans recopie.
+
+        :returns:
+            un objet memoryview
+        """
+        return memoryview(self.valeurs)
+
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compactage des écrans videotex stockés en mémoire flash
+
+Un écran compacté commence par ENTETE, suivi d’une suite de jetons :
+
+- 0x00 à 0x7f : les n + 1 octets suivants sont recopiés tels quels,
+- 0x80 à 0xff : suivi d’un octet d, recopie des ((n >> 2) & 0x1f) + 3
+  derniers octets produits situés (((n & 3) << 8) | d) + 1 octets en
+  arrière, en pouvant chevaucher la copie elle-même.
+
+Les suites de caractères identiques et les préfixes de séquences ESC ou US
+qui se répètent d’une rangée à l’autre deviennent ainsi des copies de deux
+octets. La décompression n’a besoin que des FENETRE derniers octets
+produits et se fait bloc par bloc, au fil de la lecture du fichier.
+
+Utilisation sur le PC : python -m minitel.compactage source destination
+"""
+
+import sys
+
+# En-tête des écrans compactés
+ENTETE = b'VDZ1'
+
+# Distance maximale d’une copie
+FENETRE = 1024
+
+# Longueurs minimale et maximale d’une copie
+COPIE_MIN = 3
+COPIE_MAX = 34
+
+# Nombre maximum d’octets recopiés tels quels par un jeton
+LITTERAUX_MAX = 128
+
+# Nombre de positions candidates examinées pour chaque copie
+CANDIDATS_MAX = 16
+
+def _litteraux(sortie, litteraux):
+    """Ajoute à sortie les jetons recopiant les octets litteraux"""
+    for debut in range(0, len(litteraux), LITTERAUX_MAX):
+        morceau = litteraux[debut:debut + LITTERAUX_MAX]
+        sortie.append(len(morceau) - 1)
+        sortie.extend(morceau)
+
+def compacte(donnees):
+    """Compacte un écran videotex
+
+    :param donnees:
+        le contenu de l’écran
+    :type donnees:
+        des octets
+
+    :returns:
+        l’écran compacté, ENTETE compris, sous forme de bytearray
+    """
+    sortie = bytearray(ENTETE)
+    litteraux = bytearray()
+    positions = {}
+    taille = len(donnees)
+    i = 0
+
+    while i < taille:
+        longueur, distance = 0, 0
+        if i + COPIE_MIN <= taille:
+            # La copie la plus longue parmi les positions récentes
+            for j in reversed(positions.get(bytes(donnees[i:i + 3]), ())):
+                if i - j > FENETRE:
+                    break
+                commun = COPIE_MIN
+                while (commun < COPIE_MAX and i + commun < taille
+                       and donnees[j + commun] == donnees[i + commun]):
+                    commun += 1
+                if commun > longueur:
+                    longueur, distance = commun, i - j
+                    if commun == COPIE_MAX:
+                        break
+
+        if longueur >= COPIE_MIN:
+            _litteraux(sortie, litteraux)
+            litteraux = bytearray()
+            sortie.append(0x80 | (longueur - COPIE_MIN) << 2
+                          | (distance - 1) >> 8)
+            sortie.append((distance - 1) & 0xff)
+            pas = longueur
+        else:
+            litteraux.append(donnees[i])
+            pas = 1
+
+        for k in range(i, min(i + pas, taille - 2)):
+            candidats = positions.setdefault(bytes(donnees[k:k + 3]), [])
+            candidats.append(k)
+            if len(candidats) > CANDIDATS_MAX:
+                del candidats[0]
+        i += pas
+
+    _litteraux(sortie, litteraux)
+    return sortie
+
+def est_compacte(donnees):
+    """Indique si des octets commencent par l’en-tête d’un écran compacté
+
+    :param donnees:
+        le début de l’écran
+    :type donnees:
+        des octets
+
+    :returns:
+        True si l’écran est compacté
+    """
+    return bytes(donnees[:len(ENTETE)]) == ENTETE
+
+class Decompacteur:
+    """Décompression bloc par bloc d’un écran compacté
+
+    Les blocs successifs de l’écran compacté, ENTETE compris, sont passés
+    à decompacte, qui retourne à chaque fois les octets de l’écran qu’ils
+    permettent de reconstituer. Un jeton peut être coupé entre deux blocs.
+    """
+    def __init__(self):
+        """Constructeur de Decompacteur"""
+        self.historique = bytearray()
+        self.entete = len(ENTETE)
+        self.litteraux = 0
+        self.jeton = None
+
+    def decompacte(self, bloc):
+        """Décompacte le bloc suivant de l’écran
+
+        :param bloc:
+            les octets suivants de l’écran compacté
+        :type bloc:
+            des octets, un bytearray ou une memoryview
+
+        :returns:
+            les octets reconstitués, sous forme de bytearray
+        """
+        travail = self.historique
+        debut = len(travail)
+        taille = len(bloc)
+        i = 0
+
+        while i < taille:
+            if self.entete:
+                pas = min(self.entete, taille - i)
+                self.entete -= pas
+                i += pas
+            elif self.litteraux:
+                pas = min(self.litteraux, taille - i)
+                travail.extend(bloc[i:i + pas])
+                self.litteraux -= pas
+                i += pas
+            elif self.jeton == None:
+                if bloc[i] < 0x80:
+                    self.litteraux = bloc[i] + 1
+                else:
+                    self.jeton = bloc[i]
+                i += 1
+            else:
+                distance = ((self.jeton & 3) << 8 | bloc[i]) + 1
+                longueur = ((self.jeton >> 2) & 0x1f) + COPIE_MIN
+                self.jeton = None
+                i += 1
+
+                if distance > len(travail):
+                    raise ValueError('écran compacté invalide')
+
+                # Seuls les octets copiés sont extraits. Une copie plus
+                # longue que sa distance recouvre ce qu’elle produit : elle
+                # se fait octet par octet
+                depart = len(travail) - distance
+                if distance >= longueur:
+                    travail.extend(travail[depart:depart + longueur])
+                else:
+                    for j in range(depart, depart + longueur):
+                        travail.append(travail[j])
+
+        sortie = travail[debut:]
+        self.historique = travail[-FENETRE:]
+        return sortie
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'rb') as source:
+        resultat = compacte(source.read())
+    with open(sys.argv[2], 'wb') as destination:
+        destination.write(resultat)
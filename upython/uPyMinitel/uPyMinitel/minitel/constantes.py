@@ -1,164 +1,178 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""Définitions de constantes de l’univers Minitel"""
+"""Définitions de constantes de l’univers Minitel
+
+Les codes sont déclarés avec const() pour que MicroPython les substitue à la
+compilation. Les commandes et codes de touches de plusieurs octets sont des
+objets bytes prêts à être envoyés ou comparés sans conversion.
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(valeur):
+        """Équivalent de micropython.const hors MicroPython"""
+        return valeur
 
 # Codes de contrôles de la norme ASCII
-NUL = 0x00 # null
-SOH = 0x01 # start of heading
-STX = 0x02 # start of text
-ETX = 0x03 # end of text
-EOT = 0x04 # end of transmission
-ENQ = 0x05 # enquiry
-ACK = 0x06 # acknowledge
-BEL = 0x07 # bell
-BS  = 0x08 # backspace
-TAB = 0x09 # horizontal tab
-LF  = 0x0a # line feed, new line
-VT  = 0x0b # vertical tab
-FF  = 0x0c # form feed, new page
-CR  = 0x0d # carriage return
-SO  = 0x0e # shift out
-SI  = 0x0f # shift in
-DLE = 0x10 # data link escape
-DC1 = 0x11 # device control 1
-CON = 0x11 # Cursor on
-DC2 = 0x12 # device control 2
-REP = 0x12 # Rep
-DC3 = 0x13 # device control 3
-SEP = 0x13 # Sep
-DC4 = 0x14 # device control 4
-COF = 0x14 # Cursor off
-NAK = 0x15 # negative acknowledge
-SYN = 0x16 # synchronous idle
-ETB = 0x17 # end of transmission block
-CAN = 0x18 # cancel
-EM  = 0x19 # end of medium
-SS2 = 0x19 # SS2
-SUB = 0x1a # substitute
-ESC = 0x1b # escape
-FS  = 0x1c # file separator
-GS  = 0x1d # group separator
-SS3 = 0x1d # SS3
-RS  = 0x1e # record separator
-US  = 0x1f # unit separator
+NUL = const(0x00) # null
+SOH = const(0x01) # start of heading
+STX = const(0x02) # start of text
+ETX = const(0x03) # end of text
+EOT = const(0x04) # end of transmission
+ENQ = const(0x05) # enquiry
+ACK = const(0x06) # acknowledge
+BEL = const(0x07) # bell
+BS  = const(0x08) # backspace
+TAB = const(0x09) # horizontal tab
+LF  = const(0x0a) # line feed, new line
+VT  = const(0x0b) # vertical tab
+FF  = const(0x0c) # form feed, new page
+CR  = const(0x0d) # carriage return
+SO  = const(0x0e) # shift out
+SI  = const(0x0f) # shift in
+DLE = const(0x10) # data link escape
+DC1 = const(0x11) # device control 1
+CON = const(0x11) # Cursor on
+DC2 = const(0x12) # device control 2
+REP = const(0x12) # Rep
+DC3 = const(0x13) # device control 3
+SEP = const(0x13) # Sep
+DC4 = const(0x14) # device control 4
+COF = const(0x14) # Cursor off
+NAK = const(0x15) # negative acknowledge
+SYN = const(0x16) # synchronous idle
+ETB = const(0x17) # end of transmission block
+CAN = const(0x18) # cancel
+EM  = const(0x19) # end of medium
+SS2 = const(0x19) # SS2
+SUB = const(0x1a) # substitute
+ESC = const(0x1b) # escape
+FS  = const(0x1c) # file separator
+GS  = const(0x1d) # group separator
+SS3 = const(0x1d) # SS3
+RS  = const(0x1e) # record separator
+US  = const(0x1f) # unit separator
 
-PRO1 = [ESC, 0x39] # protocole 1
-PRO2 = [ESC, 0x3a] # protocole 2
-PRO3 = [ESC, 0x3b] # protocole 3
-CSI  = [ESC, 0x5b] # CSI
+PRO1 = bytes((ESC, 0x39)) # protocole 1
+PRO2 = bytes((ESC, 0x3a)) # protocole 2
+PRO3 = bytes((ESC, 0x3b)) # protocole 3
+CSI  = bytes((ESC, 0x5b)) # CSI
 
 # Commandes PRO1
-DECONNEXION = 0x67
+DECONNEXION = const(0x67)
+# Sans const() : le nom est redéfini plus bas par la touche Connexion
 CONNEXION = 0x68
-RET1 = 0x6c
-RET2 = 0x6d
-OPPO = 0x6f
-STATUS_TERMINAL = 0x70
-STATUS_CLAVIER = 0x72
-STATUS_FONCTIONNEMENT = 0x72
-STATUS_VITESSE = 0x74
-STATUS_PROTOCOLE = 0x76
-ENQROM = 0x7b
-RESET = 0x7f
+RET1 = const(0x6c)
+RET2 = const(0x6d)
+OPPO = const(0x6f)
+STATUS_TERMINAL = const(0x70)
+STATUS_CLAVIER = const(0x72)
+STATUS_FONCTIONNEMENT = const(0x72)
+STATUS_VITESSE = const(0x74)
+STATUS_PROTOCOLE = const(0x76)
+ENQROM = const(0x7b)
+RESET = const(0x7f)
 
 # Commandes PRO2
-COPIE = 0x7c
-AIGUILLAGE_TO = 0x62
-NON_DIFFUSION = 0x64
-NON_RETOUR_ACQUITTEMENT = 0x64
-DIFFUSION = 0x65
-RETOUR_ACQUITTEMENT = 0x65
-TRANSPARENCE = 0x66
-START = 0x69
-STOP = 0x6a
-PROG = 0x6b
-REP_STATUS_TERMINAL = 0x71
-REP_STATUS_CLAVIER = 0x73
-REP_STATUS_FONCTIONNEMENT = 0x73
-REP_STATUS_VITESSE = 0x75
-REP_STATUS_PROTOCOLE = 0x77
-TELINFO = [0x31, 0x7d]
-MIXTE1 = [0X32, 0X7d]
-MIXTE2 = [0X32, 0X7e]
+COPIE = const(0x7c)
+AIGUILLAGE_TO = const(0x62)
+NON_DIFFUSION = const(0x64)
+NON_RETOUR_ACQUITTEMENT = const(0x64)
+DIFFUSION = const(0x65)
+RETOUR_ACQUITTEMENT = const(0x65)
+TRANSPARENCE = const(0x66)
+START = const(0x69)
+STOP = const(0x6a)
+PROG = const(0x6b)
+REP_STATUS_TERMINAL = const(0x71)
+REP_STATUS_CLAVIER = const(0x73)
+REP_STATUS_FONCTIONNEMENT = const(0x73)
+REP_STATUS_VITESSE = const(0x75)
+REP_STATUS_PROTOCOLE = const(0x77)
+TELINFO = bytes((0x31, 0x7d))
+MIXTE1 = bytes((0x32, 0x7d))
+MIXTE2 = bytes((0x32, 0x7e))
 
 # Commandes PRO3
-AIGUILLAGE_OFF = 0x60
-AIGUILLAGE_ON = 0x61
-AIGUILLAGE_FROM = 0x63
+AIGUILLAGE_OFF = const(0x60)
+AIGUILLAGE_ON = const(0x61)
+AIGUILLAGE_FROM = const(0x63)
 
 # Longueurs commandes PRO
-LONGUEUR_PRO1 = 3
-LONGUEUR_PRO2 = 4
-LONGUEUR_PRO3 = 5
+LONGUEUR_PRO1 = const(3)
+LONGUEUR_PRO2 = const(4)
+LONGUEUR_PRO3 = const(5)
 
 # Autres codes
-COPIE_FRANCAIS = 0x6a
-COPIE_AMERICAIN = 0x6b
-ETEN = 0x41
-C0 = 0x43
+COPIE_FRANCAIS = const(0x6a)
+COPIE_AMERICAIN = const(0x6b)
+ETEN = const(0x41)
+C0 = const(0x43)
 
 # Codes PRO2+START/STOP
-ROULEAU = 0x43
-PROCEDURE = 0x44
-MINUSCULES = 0x45
+ROULEAU = const(0x43)
+PROCEDURE = const(0x44)
+MINUSCULES = const(0x45)
 
 # Codes PRO2+PROG
-B9600 = 0x7f
-B4800 = 0x76
-B1200 = 0x64
-B300 = 0x52
+B9600 = const(0x7f)
+B4800 = const(0x76)
+B1200 = const(0x64)
+B300 = const(0x52)
+
+# Bits transmis par caractère : start, 7 bits, parité paire, stop
+BITS_PAR_CARACTERE = const(10)
 
-# Codes PRO3+START/STOP
-ETEN = 0x41
-C0 = 0x43
+# Codes PRO3+START/STOP : ETEN et C0, définis plus haut
 
 # Codes de réception
-RCPT_ECRAN = 0x58
-RCPT_CLAVIER = 0x59
-RCPT_MODEM = 0x5a
-RCPT_PRISE = 0x5b
+RCPT_ECRAN = const(0x58)
+RCPT_CLAVIER = const(0x59)
+RCPT_MODEM = const(0x5a)
+RCPT_PRISE = const(0x5b)
 
 # Codes d’émission
-EMET_ECRAN = 0x50
-EMET_CLAVIER = 0x51
-EMET_MODEM = 0x52
-EMET_PRISE = 0x53
+EMET_ECRAN = const(0x50)
+EMET_CLAVIER = const(0x51)
+EMET_MODEM = const(0x52)
+EMET_PRISE = const(0x53)
 
 # Accents
-ACCENT_CEDILLE = [SS2, 0x4b]
-ACCENT_GRAVE = [SS2, 0x41]
-ACCENT_AIGU = [SS2, 0x42]
-ACCENT_CIRCONFLEXE = [SS2, 0x43]
-ACCENT_TREMA = [SS2, 0x48]
+ACCENT_CEDILLE = bytes((SS2, 0x4b))
+ACCENT_GRAVE = bytes((SS2, 0x41))
+ACCENT_AIGU = bytes((SS2, 0x42))
+ACCENT_CIRCONFLEXE = bytes((SS2, 0x43))
+ACCENT_TREMA = bytes((SS2, 0x48))
 
 # Touches de direction
-HAUT = [CSI, 0x41]
-BAS = [CSI, 0x42]
-GAUCHE = [CSI, 0x44]
-DROITE = [CSI, 0x43]
+HAUT = CSI + bytes((0x41,))
+BAS = CSI + bytes((0x42,))
+GAUCHE = CSI + bytes((0x44,))
+DROITE = CSI + bytes((0x43,))
 
-MAJ_HAUT = [CSI, 0x4D]
-MAJ_BAS = [CSI, 0x4C]
-MAJ_GAUCHE = [CSI, 0x50]
-MAJ_DROITE = [CSI, 0x34, 0x68]
+MAJ_HAUT = CSI + bytes((0x4D,))
+MAJ_BAS = CSI + bytes((0x4C,))
+MAJ_GAUCHE = CSI + bytes((0x50,))
+MAJ_DROITE = CSI + bytes((0x34, 0x68))
 
-CTRL_GAUCHE = 0x7f
+CTRL_GAUCHE = const(0x7f)
 
 # Touche Entrée/Retour chariot
-ENTREE      = 0x0d
-MAJ_ENTREE  = [CSI, 0x48]
-CTRL_ENTREE = [CSI, 0x32, 0x4a]
+ENTREE      = const(0x0d)
+MAJ_ENTREE  = CSI + bytes((0x48,))
+CTRL_ENTREE = CSI + bytes((0x32, 0x4a))
 
 # Touches de fonction
-ENVOI      = [DC3, 0x41]
-RETOUR     = [DC3, 0x42]
-REPETITION = [DC3, 0x43]
-GUIDE      = [DC3, 0x44]
-ANNULATION = [DC3, 0x45]
-SOMMAIRE   = [DC3, 0x46]
-CORRECTION = [DC3, 0x47]
-SUITE      = [DC3, 0x48]
-CONNEXION  = [DC3, 0x49]
+ENVOI      = bytes((DC3, 0x41))
+RETOUR     = bytes((DC3, 0x42))
+REPETITION = bytes((DC3, 0x43))
+GUIDE      = bytes((DC3, 0x44))
+ANNULATION = bytes((DC3, 0x45))
+SOMMAIRE   = bytes((DC3, 0x46))
+CORRECTION = bytes((DC3, 0x47))
+SUITE      = bytes((DC3, 0x48))
+CONNEXION  = bytes((DC3, 0x49))
 
 # Types de minitels
 TYPE_MINITELS = {
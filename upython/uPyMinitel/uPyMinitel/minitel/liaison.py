@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Liaisons entre l’ordinateur et le Minitel
+
+La classe Minitel ne dialogue avec le Minitel qu’au travers d’un objet
+liaison. Toute liaison offre les mêmes méthodes, calquées sur celles d’un
+UART de MicroPython :
+
+- any() -- nombre d’octets reçus prêts à être lus,
+- read(n) -- lecture d’au plus n octets, None si rien n’a été reçu,
+- write(octets) -- envoi de tous les octets,
+- attendre(delai) -- attente de la réception d’octets,
+- changer_vitesse(vitesse) -- reconfiguration de la vitesse en bps,
+- close() -- fermeture de la liaison.
+
+Quatre liaisons sont proposées :
+
+- LiaisonUART -- un port UART de l’ESP32 (MicroPython),
+- LiaisonTerminal -- un port série ou un pty de Linux (CPython),
+- LiaisonSocket -- une connexion TCP, vers une passerelle telnet par exemple,
+- LiaisonMemoire -- une liaison en mémoire créée par la fonction boucle,
+  pour les tests et les mesures de performances.
+"""
+
+import select                  # Attente des octets reçus sans boucle active
+from errno import EAGAIN
+
+try:
+    from machine import UART   # Liaison physique avec le Minitel
+except ImportError:
+    UART = None                # Hors MicroPython
+
+from minitel.temps import sleep_ms
+
+# Nombre maximal d’octets lus en une fois par les liaisons non bloquantes
+TAILLE_LECTURE = 256
+
+class Liaison:
+    """Une liaison sans données, à vitesse fixe
+
+    Rien n’y est jamais reçu et tout ce qui y est écrit est perdu. Les autres
+    liaisons en dérivent. Sa méthode attendre repose sur select.poll avec
+    l’objet retourné par la méthode _sondable.
+
+    :ivar vitesse:
+        vitesse de la liaison en bits par seconde
+    """
+    def __init__(self, vitesse = 1200):
+        """Constructeur de Liaison
+
+        :param vitesse:
+            vitesse initiale en bits par seconde
+        :type vitesse:
+            un entier
+        """
+        assert isinstance(vitesse, int)
+
+        self.vitesse = vitesse
+        self._sondage = None
+
+    def any(self):
+        """Retourne le nombre d’octets reçus prêts à être lus"""
+        return 0
+
+    def read(self, n = None):
+        """Lit des octets reçus
+
+        :param n:
+            nombre d’octets à lire au maximum, None pour tout lire
+        :type n:
+            un entier ou None
+
+        :returns:
+            un objet bytes, ou None si rien n’a été reçu
+        """
+        return None
+
+    def write(self, octets):
+        """Envoie des octets
+
+        :param octets:
+            les octets à envoyer
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+
+        :returns:
+            le nombre d’octets envoyés
+        """
+        return len(octets)
+
+    def attendre(self, delai = None):
+        """Attend l’arrivée d’octets sans occuper le processeur
+
+        :param delai:
+            attente maximale en millisecondes, None pour attendre
+            indéfiniment
+        :type delai:
+            un entier, un flottant ou None
+
+        :returns:
+            True si des octets sont disponibles
+        """
+        if self.any():
+            return True
+
+        sondable = self._sondable()
+        if sondable == None:
+            return False
+
+        if self._sondage == None:
+            self._sondage = select.poll()
+            self._sondage.register(sondable, select.POLLIN)
+
+        self._sondage.poll(-1 if delai == None else max(int(delai), 0))
+
+        return self.any() != 0
+
+    def _sondable(self):
+        """Retourne l’objet surveillé par select.poll, None s’il n’y en a pas"""
+        return None
+
+    def changer_vitesse(self, vitesse):
+        """Reconfigure la vitesse de la liaison
+
+        :param vitesse:
+            vitesse en bits par seconde
+        :type vitesse:
+            un entier
+        """
+        assert isinstance(vitesse, int)
+
+        self.vitesse = vitesse
+
+    def close(self):
+        """Ferme la liaison"""
+        pass
+
+class LiaisonUART(Liaison):
+    """Une liaison par un port UART de MicroPython
+
+    La liaison est établie selon le standard de base du Minitel : 7 bits,
+    parité paire, 1 bit d’arrêt, sans contrôle de flux.
+
+    :ivar uart:
+        l’objet machine.UART utilisé
+    """
+    def __init__(self, uart_num = 2, vitesse = 1200, attente = 1):
+        """Constructeur de LiaisonUART
+
+        :param uart_num:
+            Le port uart utilisé. Par défaut, le port 2 de l'ESP32 est utilisé
+        :type uart_num:
+            un entier
+
+        :param vitesse:
+            vitesse initiale en bits par seconde
+        :type vitesse:
+            un entier
+
+        :param attente:
+            délai de lecture de l’UART en millisecondes (0 pour une lecture
+            non bloquante, nécessaire avec uasyncio)
+        :type attente:
+            un entier
+        """
+        assert isinstance(uart_num, int)
+        assert isinstance(attente, int) and attente >= 0
+        Liaison.__init__(self, vitesse)
+
+        self.uart_num = uart_num
+        self.attente = attente
+        self.uart = UART(self.uart_num, **self._reglages())
+
+    def _reglages(self):
+        """Retourne les paramètres de configuration de l’UART"""
+        return {
+            'baudrate': self.vitesse,   # vitesse de la liaison
+            'bits': 7,                  # taille de caractère à 7 bits
+            'parity': 0,                # parité paire
+            'stop': 1,                  # 1 bit d’arrêt
+            'timeout': self.attente,    # délai de lecture
+            'timeout_char': self.attente, # délai entre caractères
+            'flow': 0                   # pas de contrôle matériel
+        }
+
+    def any(self):
+        return self.uart.any()
+
+    def read(self, n = None):
+        if n == None:
+            return self.uart.read()
+
+        return self.uart.read(n)
+
+    def write(self, octets):
+        return self.uart.write(octets)
+
+    def _sondable(self):
+        return self.uart
+
+    def changer_vitesse(self, vitesse):
+        # L’UART est reconfiguré sur place : les objets qui le surveillent
+        # (select.poll, flux uasyncio) restent valables
+        Liaison.changer_vitesse(self, vitesse)
+        self.uart.init(**self._reglages())
+
+    def close(self):
+        self.uart.deinit()
+
+class _LiaisonTamponnee(Liaison):
+    """Une liaison non bloquante dont les octets reçus sont mis en tampon
+
+    Les classes dérivées redéfinissent les méthodes _recevoir, _envoyer et
+    _sondable. Par défaut, comme pour Liaison, rien n’est jamais reçu et
+    tout ce qui est envoyé est perdu.
+    """
+    def __init__(self, vitesse = 1200):
+        Liaison.__init__(self, vitesse)
+
+        self._tampon = bytearray()
+
+    def _recevoir(self):
+        """Lit sans attendre les octets disponibles
+
+        :returns:
+            un objet bytes, None si rien n’est disponible ou b'' si la
+            liaison a été fermée par l’autre extrémité
+        """
+        return None
+
+    def _envoyer(self, octets):
+        """Envoie sans attendre une partie des octets
+
+        :returns:
+            le nombre d’octets envoyés
+        """
+        return len(octets)
+
+    def any(self):
+        try:
+            octets = self._recevoir()
+        except OSError as erreur:
+            if erreur.args[0] != EAGAIN:
+                raise
+            octets = None
+
+        if octets == b'':
+            raise EOFError('liaison avec le Minitel fermée')
+
+        if octets:
+            self._tampon.extend(octets)
+
+        return len(self._tampon)
+
+    def read(self, n = None):
+        self.any()
+        if not self._tampon:
+            return None
+
+        if n == None:
+            n = len(self._tampon)
+
+        octets = bytes(self._tampon[:n])
+        self._tampon = self._tampon[n:]
+
+        return octets
+
+    def write(self, octets):
+        vue = memoryview(octets)
+        while len(vue):
+            try:
+                envoyes = self._envoyer(vue)
+            except OSError as erreur:
+                if erreur.args[0] != EAGAIN:
+                    raise
+                envoyes = 0
+
+            # Le tampon d’émission du système est plein
+            if not envoyes:
+                sondage = select.poll()
+                sondage.register(self._sondable(), select.POLLOUT)
+                sondage.poll(-1)
+                continue
+
+            vue = vue[envoyes:]
+
+        return len(octets)
+
+class LiaisonTerminal(_LiaisonTamponnee):
+    """Une liaison par un port série ou un pty (CPython sous Linux)
+
+    Le terminal est ouvert en mode brut, 7 bits, parité paire, 1 bit
+    d’arrêt. Un pty permet de simuler le Minitel par un autre programme.
+    """
+    def __init__(self, chemin, vitesse = 1200):
+        """Constructeur de LiaisonTerminal
+
+        :param chemin:
+            chemin du terminal (par exemple /dev/ttyUSB0 ou /dev/pts/3)
+        :type chemin:
+            une chaîne de caractères
+
+        :param vitesse:
+            vitesse initiale en bits par seconde
+        :type vitesse:
+            un entier
+        """
+        import os
+        import termios
+        import tty
+
+        assert isinstance(chemin, str)
+        _LiaisonTamponnee.__init__(self, vitesse)
+
+        self._os = os
+        self._termios = termios
+
+        self.descripteur = os.open(chemin,
+                                   os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self.descripteur)
+        self.changer_vitesse(vitesse)
+
+    def _recevoir(self):
+        return self._os.read(self.descripteur, TAILLE_LECTURE)
+
+    def _envoyer(self, octets):
+        return self._os.write(self.descripteur, octets)
+
+    def _sondable(self):
+        return self.descripteur
+
+    def changer_vitesse(self, vitesse):
+        termios = self._termios
+        Liaison.changer_vitesse(self, vitesse)
+
+        attributs = termios.tcgetattr(self.descripteur)
+        attributs[2] &= ~(termios.CSIZE | termios.PARODD | termios.CSTOPB)
+        attributs[2] |= termios.CS7 | termios.PARENB | termios.CREAD
+        attributs[2] |= termios.CLOCAL
+        attributs[4] = attributs[5] = getattr(termios, 'B%d' % vitesse)
+        termios.tcsetattr(self.descripteur, termios.TCSADRAIN, attributs)
+
+    def close(self):
+        self._os.close(self.descripteur)
+
+class LiaisonSocket(_LiaisonTamponnee):
+    """Une liaison par une connexion TCP
+
+    Les octets passent tels quels : une passerelle telnet doit transmettre
+    les données sans négociation. La vitesse ne concerne que la liaison
+    entre la passerelle et le Minitel, elle est seulement mémorisée.
+    """
+    def __init__(self, adresse):
+        """Constructeur de LiaisonSocket
+
+        :param adresse:
+            l’adresse à laquelle se connecter ou une connexion déjà établie
+        :type adresse:
+            un tuple (hôte, port) ou un objet socket
+        """
+        import socket
+
+        _LiaisonTamponnee.__init__(self)
+
+        if isinstance(adresse, tuple):
+            prise = socket.socket()
+            prise.connect(socket.getaddrinfo(adresse[0], adresse[1])[0][-1])
+        else:
+            prise = adresse
+
+        prise.setblocking(False)
+        self.prise = prise
+
+    def _recevoir(self):
+        return self.prise.recv(TAILLE_LECTURE)
+
+    def _envoyer(self, octets):
+        return self.prise.send(octets)
+
+    def _sondable(self):
+        return self.prise
+
+    def close(self):
+        self.prise.close()
+
+class LiaisonMemoire(Liaison):
+    """Une extrémité d’une liaison en mémoire (voir la fonction boucle)
+
+    Ce qui est écrit sur une extrémité est reçu par l’autre. Si l’attribut
+    reception de l’extrémité destinataire est une fonction, elle est
+    appelée avec les octets au lieu de les mettre en tampon : un Minitel
+    simulé peut ainsi répondre immédiatement.
+
+    Rien ne peut arriver pendant une attente : attendre laisse simplement
+    s’écouler le délai et échoue s’il n’y en a pas.
+
+    :ivar reception:
+        None ou fonction appelée avec les octets reçus
+    """
+    def __init__(self):
+        Liaison.__init__(self)
+
+        self.autre = None
+        self.reception = None
+        self._tampon = bytearray()
+
+    def any(self):
+        return len(self._tampon)
+
+    def read(self, n = None):
+        if not self._tampon:
+            return None
+
+        if n == None:
+            n = len(self._tampon)
+
+        octets = bytes(self._tampon[:n])
+        self._tampon = self._tampon[n:]
+
+        return octets
+
+    def write(self, octets):
+        if self.autre != None:
+            self.autre._recoit(octets)
+
+        return len(octets)
+
+    def _recoit(self, octets):
+        """Reçoit les octets écrits sur l’autre extrémité"""
+        if self.reception != None:
+            self.reception(bytes(octets))
+        else:
+            self._tampon.extend(octets)
+
+    def attendre(self, delai = None):
+        if self._tampon:
+            return True
+
+        if delai == None:
+            raise EOFError('rien ne peut arriver sur la liaison en mémoire')
+
+        sleep_ms(max(int(delai), 0))
+
+        return len(self._tampon) != 0
+
+def boucle():
+    """Crée une liaison en mémoire
+
+    Exemple d’utilisation :
+
+    >>> cote_minitel, cote_ordinateur = boucle()
+    >>> minitel = Minitel(liaison = cote_ordinateur)
+
+    :returns:
+        un tuple de deux objets LiaisonMemoire reliés l’un à l’autre
+    """
+    premiere = LiaisonMemoire()
+    seconde = LiaisonMemoire()
+    premiere.autre = seconde
+    seconde.autre = premiere
+
+    return premiere, seconde
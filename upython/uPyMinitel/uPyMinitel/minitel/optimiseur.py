@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Optimisation hors ligne des pages videotex
+
+Le flux d’une page est découpé en éléments (caractères, déplacements,
+attributs, autres séquences), suivi dans un modèle de l’écran, puis
+réécrit élément par élément :
+
+- une suite de déplacements devient le déplacement le plus court entre
+  les deux positions, tant qu’elle remet les attributs à zéro de la même
+  façon et ne passe pas par la rangée 0 (dont un LF ramène le curseur à
+  la position d’où il y est entré),
+- les attributs ne sont émis qu’au caractère suivant, et seulement ceux
+  qui changent réellement,
+- les octets NUL de remplissage disparaissent,
+- les suites de caractères identiques sont compressées par REP.
+
+Les caractères sont réécrits dans leur ordre d’origine : le fond et le
+soulignement, que le Minitel n’applique qu’au délimiteur suivant, gardent
+ainsi le même effet. La page optimisée est vérifiée en l’interprétant,
+ainsi que l’originale, depuis un écran vierge et depuis un écran déjà
+rempli : si les deux écrans obtenus diffèrent, la page est gardée telle
+quelle.
+
+Utilisation sur le PC :
+    python -m minitel.optimiseur [-j processus] source destination
+
+source et destination sont deux fichiers ou deux répertoires. Les fichiers
+d’un répertoire sont traités en parallèle sur tous les cœurs.
+"""
+
+from minitel.constantes import (NUL, BS, TAB, LF, VT, CR, SO, SI, REP, SEP,
+    SS2, SS3, ESC, RS, US)
+from minitel.Ecran import Ecran, DIACRITIQUES
+from minitel.rendu import Compresseur, deplacement
+
+# Natures des éléments d’un flux
+CARACTERE = 0   # caractère affiché (y compris SS2 et REP)
+MOUVEMENT = 1   # déplacement du curseur
+ATTRIBUT = 2    # changement d’attribut
+REMPLISSAGE = 3 # octet NUL
+AUTRE = 4       # toute autre séquence, recopiée telle quelle
+
+# Attributs par défaut : avant-plan, fond, taille, effet, jeu
+ATTRIBUTS_DEFAUT = (7, 0, 0, 0, 0)
+
+def _sequence(octets, i):
+    """Retourne la nature et la fin de l’élément commençant en i"""
+    longueur = len(octets)
+    octet = octets[i]
+
+    if octet >= 0x20:
+        return CARACTERE, i + 1
+    if octet in (BS, TAB, LF, VT, CR, RS):
+        return MOUVEMENT, i + 1
+    if octet in (SO, SI):
+        return ATTRIBUT, i + 1
+    if octet == NUL:
+        return REMPLISSAGE, i + 1
+    if octet == REP:
+        return CARACTERE, min(i + 2, longueur)
+    if octet in (SEP, SS3):
+        return AUTRE, min(i + 2, longueur)
+    if octet == SS2:
+        if i + 1 < longueur and octets[i + 1] in DIACRITIQUES:
+            return CARACTERE, min(i + 3, longueur)
+        return CARACTERE, min(i + 2, longueur)
+    if octet == US:
+        if i + 1 < longueur and octets[i + 1] == 0x23:
+            # Définition de caractères, jusqu’au positionnement US qui la
+            # termine
+            fin = i + 2
+            while fin < longueur and octets[fin] != US:
+                fin += 1
+            return AUTRE, min(fin + 3, longueur)
+        return MOUVEMENT, min(i + 3, longueur)
+    if octet != ESC or i + 1 >= longueur:
+        return AUTRE, i + 1
+
+    suivant = octets[i + 1]
+    if (0x40 <= suivant <= 0x4f or 0x50 <= suivant <= 0x57 or
+            suivant in (0x58, 0x59, 0x5a, 0x5c, 0x5d, 0x5f)):
+        return ATTRIBUT, i + 2
+    if suivant == 0x5b:
+        fin = i + 2
+        while fin < longueur and 0x30 <= octets[fin] <= 0x3f:
+            fin += 1
+        if fin >= longueur:
+            return AUTRE, longueur
+        if octets[i + 2:i + 3] != b'?' and octets[fin] in b'ABCDH':
+            return MOUVEMENT, fin + 1
+        return AUTRE, fin + 1
+    if suivant in (0x39, 0x3a, 0x3b):
+        return AUTRE, min(i + 2 + suivant - 0x38, longueur)
+    if 0x28 <= suivant <= 0x2b:
+        fin = i + 2
+        while fin < longueur and octets[fin] < 0x30:
+            fin += 1
+        return AUTRE, min(fin + 1, longueur)
+    if suivant == 0x23:
+        return AUTRE, min(i + 4, longueur)
+    return AUTRE, i + 2
+
+def elements(octets):
+    """Découpe un flux videotex en éléments
+
+    :param octets:
+        le flux à découper
+    :type octets:
+        des octets
+
+    :returns:
+        une liste de tuples (nature, octets)
+    """
+    resultat = []
+    i = 0
+    while i < len(octets):
+        nature, fin = _sequence(octets, i)
+        resultat.append((nature, bytes(octets[i:fin])))
+        i = fin
+    return resultat
+
+def _attributs_en_cours(ecran):
+    """Retourne les attributs en cours d’un écran, None s’ils sont inconnus
+
+    Depuis une position inconnue, un déplacement a pu changer de rangée ou
+    non : les attributs ne sont connus qu’avec la position du curseur.
+    """
+    if not (ecran.attributs_connus and ecran.curseur_connu):
+        return None
+    return (ecran.avant_plan, ecran.fond, ecran.taille, ecran.effet,
+            ecran.jeu)
+
+def _changements(emis, voulus):
+    """Retourne les octets faisant passer des attributs emis aux voulus"""
+    sortie = bytearray()
+    (avant_plan, fond, taille, effet, jeu) = voulus
+
+    if avant_plan != emis[0]:
+        sortie.extend(bytes([ESC, 0x40 + avant_plan]))
+    if fond != emis[1]:
+        sortie.extend(bytes([ESC, 0x50 + fond]))
+    if taille != emis[2]:
+        sortie.extend(bytes([ESC, 0x4c + taille]))
+    for (bit, actif, inactif) in ((0x01, 0x48, 0x49), (0x02, 0x5a, 0x59),
+                                  (0x04, 0x5d, 0x5c), (0x08, 0x58, 0x5f)):
+        if effet & bit != emis[3] & bit:
+            sortie.extend(bytes([ESC, actif if effet & bit else inactif]))
+    if jeu != emis[4]:
+        sortie.append(SO if jeu else SI)
+
+    return sortie
+
+def _remet_attributs(essai, x, y, octets):
+    """Indique si des déplacements depuis (x, y) remettent les attributs à
+    zéro et retourne la position atteinte"""
+    essai.x = x
+    essai.y = y
+    essai.curseur_connu = True
+    essai.avant_plan = 0
+    essai.traite(octets)
+    return essai.avant_plan == 7, essai.x, essai.y
+
+def optimise(octets, colonnes = 40, lignes = 24):
+    """Réécrit une page videotex avec le moins d’octets possible
+
+    :param octets:
+        la page d’origine
+    :type octets:
+        des octets
+
+    :param colonnes:
+        nombre de colonnes de l’écran
+    :type colonnes:
+        un entier
+
+    :param lignes:
+        nombre de rangées de l’écran, sans compter la rangée 0
+    :type lignes:
+        un entier
+
+    :returns:
+        la page optimisée sous forme de bytes, ou la page d’origine si elle
+        n’a pas pu être raccourcie sans changer l’écran obtenu
+    """
+    ecran = Ecran(colonnes, lignes)
+    essai = Ecran(colonnes, lignes)
+    sortie = bytearray()
+
+    # Attributs émis dans la page optimisée (None s’ils sont inconnus) et
+    # changements d’attributs d’origine pas encore émis
+    emis = None
+    attente = bytearray()
+
+    # Suite de déplacements en cours, position du curseur à son début et
+    # passage par la rangée 0
+    mouvement = bytearray()
+    depart = None
+    rangee_zero = False
+
+    def emet_mouvement():
+        nonlocal emis, attente
+        arrivee = (ecran.x, ecran.y) if ecran.curseur_connu else None
+        if depart != None and arrivee != None and not rangee_zero:
+            original = _remet_attributs(essai, depart[0], depart[1],
+                                        mouvement)
+
+        if (depart == None or arrivee == None or rangee_zero
+                or original[1:] != arrivee):
+            # Déplacements recopiés dans leur ordre d’origine
+            sortie.extend(attente)
+            sortie.extend(mouvement)
+            attente = bytearray()
+            emis = _attributs_en_cours(ecran)
+            mouvement.clear()
+            return
+
+        meilleur = bytes(mouvement)
+        for candidat in (deplacement(depart[0], depart[1], *arrivee),
+                         deplacement(None, None, *arrivee)):
+            if (len(candidat) < len(meilleur) and _remet_attributs(
+                    essai, depart[0], depart[1], candidat) == original):
+                meilleur = candidat
+
+        sortie.extend(meilleur)
+        if original[0]:
+            # Les attributs en attente sont effacés par le déplacement
+            emis = ATTRIBUTS_DEFAUT
+            attente = bytearray()
+        mouvement.clear()
+
+    def emet_attributs():
+        nonlocal emis, attente
+        voulus = _attributs_en_cours(ecran)
+        if emis == None or voulus == None:
+            sortie.extend(attente)
+        else:
+            sortie.extend(_changements(emis, voulus))
+        emis = voulus
+        attente = bytearray()
+
+    for (nature, element) in elements(octets):
+        if nature == MOUVEMENT:
+            if not mouvement:
+                depart = (ecran.x, ecran.y) if ecran.curseur_connu else None
+                rangee_zero = ecran.y == 0
+            mouvement.extend(element)
+            ecran.traite(element)
+            rangee_zero = rangee_zero or ecran.y == 0
+            continue
+
+        if mouvement:
+            emet_mouvement()
+
+        if nature == ATTRIBUT:
+            attente.extend(element)
+            ecran.traite(element)
+        elif nature != REMPLISSAGE:
+            emet_attributs()
+            sortie.extend(element)
+            ecran.traite(element)
+            emis = _attributs_en_cours(ecran)
+
+    if mouvement:
+        emet_mouvement()
+    emet_attributs()
+
+    resultat = bytes(Compresseur(colonnes, lignes).compresse(sortie))
+    if len(resultat) < len(octets) and equivalentes(octets, resultat,
+                                                    colonnes, lignes):
+        return resultat
+    return bytes(octets)
+
+def _etat(ecran):
+    """Retourne tout ce que le modèle sait de l’écran"""
+    return (bytes(ecran.caracteres), bytes(ecran.jeux),
+            bytes(ecran.diacritiques), bytes(ecran.couleurs),
+            bytes(ecran.tailles), bytes(ecran.effets), ecran.x, ecran.y,
+            ecran.curseur_connu, ecran.curseur_visible, ecran.contenu_connu,
+            _attributs_en_cours(ecran), ecran.insertion, ecran.masquage_ecran,
+            tuple(ecran.jeux_redefinis), sorted(ecran.drcs.items()))
+
+def _ecrans_initiaux(colonnes, lignes):
+    """Retourne des écrans de départ différents pour la vérification"""
+    vierge = Ecran(colonnes, lignes)
+
+    rempli = Ecran(colonnes, lignes)
+    rempli.efface()
+    for ligne in range(1, lignes + 1):
+        rempli.place(1, ligne)
+        rempli.avant_plan = ligne % 8
+        rempli.fond = (ligne + 3) % 8
+        rempli.traite(bytes(range(0x41, 0x41 + colonnes)))
+    rempli.place(colonnes // 2, lignes // 2)
+    rempli.avant_plan = 3
+    rempli.fond = 4
+    rempli.effet = 0x04
+    rempli.curseur_visible = True
+
+    return (vierge, rempli)
+
+def equivalentes(page, autre, colonnes = 40, lignes = 24):
+    """Indique si deux pages donnent le même écran
+
+    Les deux pages sont interprétées depuis un écran vierge et depuis un
+    écran déjà rempli, curseur et attributs compris.
+
+    :param page:
+        la première page
+    :type page:
+        des octets
+
+    :param autre:
+        la seconde page
+    :type autre:
+        des octets
+
+    :returns:
+        True si les écrans obtenus sont identiques dans les deux cas
+    """
+    for depart in range(2):
+        a = _ecrans_initiaux(colonnes, lignes)[depart]
+        b = _ecrans_initiaux(colonnes, lignes)[depart]
+        a.traite(page)
+        b.traite(autre)
+        if _etat(a) != _etat(b):
+            return False
+    return True
+
+def optimise_fichier(source, destination):
+    """Optimise un fichier videotex
+
+    :returns:
+        un tuple (source, taille d’origine, taille optimisée)
+    """
+    with open(source, 'rb') as fichier:
+        octets = fichier.read()
+    resultat = optimise(octets)
+    with open(destination, 'wb') as fichier:
+        fichier.write(resultat)
+    return (source, len(octets), len(resultat))
+
+def _optimise_couple(couple):
+    """Optimise un couple (source, destination) pour multiprocessing"""
+    return optimise_fichier(*couple)
+
+def main(arguments = None):
+    """Point d’entrée de la ligne de commande"""
+    import argparse
+    import multiprocessing
+    import os
+
+    analyseur = argparse.ArgumentParser(
+        description = 'Optimise des pages videotex')
+    analyseur.add_argument('source', help = 'fichier ou répertoire')
+    analyseur.add_argument('destination', help = 'fichier ou répertoire')
+    analyseur.add_argument('-j', '--processus', type = int, default = None,
+                           help = 'nombre de processus (un par cœur)')
+    options = analyseur.parse_args(arguments)
+
+    if os.path.isdir(options.source):
+        os.makedirs(options.destination, exist_ok = True)
+        couples = [
+            (os.path.join(options.source, nom),
+             os.path.join(options.destination, nom))
+            for nom in sorted(os.listdir(options.source))
+            if os.path.isfile(os.path.join(options.source, nom))
+        ]
+    else:
+        couples = [(options.source, options.destination)]
+
+    avant = apres = 0
+    with multiprocessing.Pool(options.processus) as pool:
+        for (source, origine, reduite) in pool.imap(_optimise_couple,
+                                                      couples):
+            avant += origine
+            apres += reduite
+            print('%s : %d -> %d octets' % (source, origine, reduite))
+
+    if len(couples) > 1:
+        print('total : %d -> %d octets' % (avant, apres))
+
+if __name__ == '__main__':
+    main()
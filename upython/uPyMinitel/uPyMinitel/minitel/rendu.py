@@ -0,0 +1,645 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Fonctions de rendu différentiel d’un écran Minitel
+
+Ces fonctions calculent la suite d’octets la plus courte possible pour
+passer d’un écran à un autre, en ne réécrivant que les cellules modifiées.
+"""
+
+from minitel.constantes import (BS, TAB, LF, VT, FF, CR, SO, SI, CON, COF,
+    REP, SEP, SS2, SS3, ESC, RS, US)
+from minitel.Ecran import (Ecran, G0, G1, G2, DRCS, CLIGNOTEMENT,
+    SOULIGNEMENT, INVERSION, MASQUAGE, DOUBLE_LARGEUR, DOUBLE_HAUTEUR, NORMALE,
+    COUVERT, DIACRITIQUES)
+
+# Nombre maximum de répétitions d’un REP
+REPETITION_MAX = 63
+
+def _csi(nombre, final):
+    """Retourne une séquence CSI de déplacement"""
+    return bytes([ESC, 0x5b]) + str(nombre).encode() + bytes([final])
+
+def _horizontal(x0, x1):
+    """Retourne le déplacement le plus court sur une même rangée"""
+    if x1 > x0:
+        pas = bytes([TAB]) * (x1 - x0)
+        long = _csi(x1 - x0, 0x43)
+    elif x1 < x0:
+        pas = bytes([BS]) * (x0 - x1)
+        long = _csi(x0 - x1, 0x44)
+    else:
+        return b''
+
+    return pas if len(pas) <= len(long) else long
+
+def _vertical(y0, y1):
+    """Retourne le déplacement le plus court sur une même colonne"""
+    if y1 > y0:
+        pas = bytes([LF]) * (y1 - y0)
+        long = _csi(y1 - y0, 0x42)
+    elif y1 < y0:
+        pas = bytes([VT]) * (y0 - y1)
+        long = _csi(y0 - y1, 0x41)
+    else:
+        return b''
+
+    return pas if len(pas) <= len(long) else long
+
+def deplacement(x0, y0, x1, y1):
+    """Retourne la suite d’octets la plus courte pour déplacer le curseur
+
+    Les déplacements envisagés sont RS, US, CR, les déplacements relatifs
+    courts (BS, TAB, LF, VT), les déplacements relatifs CSI et RS suivi d’un
+    déplacement relatif.
+
+    Réécrire des caractères déjà affichés coûte un octet par colonne, autant
+    qu’une tabulation : ce n’est donc jamais plus court.
+
+    Note:
+    RS et US ramènent les attributs à leur valeur par défaut, tout comme un
+    changement de rangée.
+
+    :param x0:
+        colonne actuelle du curseur ou None si elle est inconnue
+    :type x0:
+        un entier ou None
+
+    :param y0:
+        rangée actuelle du curseur ou None si elle est inconnue
+    :type y0:
+        un entier ou None
+
+    :param x1:
+        colonne à atteindre
+    :type x1:
+        un entier
+
+    :param y1:
+        rangée à atteindre
+    :type y1:
+        un entier
+
+    :returns:
+        un objet bytes
+    """
+    if x0 == x1 and y0 == y1:
+        return b''
+
+    meilleur = bytes([US, 0x40 + y1, 0x40 + x1])
+    if y1 == 0:
+        return meilleur
+
+    # RS ramène le curseur en haut à gauche quelle que soit sa position
+    candidat = bytes([RS]) + _vertical(1, y1) + _horizontal(1, x1)
+    if len(candidat) < len(meilleur):
+        meilleur = candidat
+
+    # Les autres déplacements relatifs ne sont possibles qu’entre rangées 1
+    # à 24 et depuis une position connue
+    if x0 == None or y0 == None or y0 == 0:
+        return meilleur
+
+    vertical = _vertical(y0, y1)
+    for candidat in (
+        vertical + _horizontal(x0, x1),
+        vertical + bytes([CR]) + _horizontal(1, x1)
+    ):
+        if len(candidat) < len(meilleur):
+            meilleur = candidat
+
+    return meilleur
+
+def _identiques(a, i, b, j):
+    """Compare la cellule i de l’écran a et la cellule j de l’écran b
+
+    Deux cellules recouvertes sont identiques quels que soient leurs
+    attributs, qui sont ceux de leur caractère double.
+    """
+    if a.caracteres[i] == COUVERT:
+        return b.caracteres[j] == COUVERT
+
+    return (a.caracteres[i] == b.caracteres[j] and
+            a.jeux[i] == b.jeux[j] and
+            a.diacritiques[i] == b.diacritiques[j] and
+            a.couleurs[i] == b.couleurs[j] and
+            a.tailles[i] == b.tailles[j] and
+            a.effets[i] == b.effets[j])
+
+def _recouvrements(cible, i, reprises):
+    """Ajoute aux reprises les cellules du dessus d’un caractère double
+    hauteur qui ne sont pas recouvertes dans l’écran cible"""
+    colonnes = cible.colonnes
+    if i < 2 * colonnes:
+        return
+
+    dessus = [i - colonnes]
+    if cible.tailles[i] & DOUBLE_LARGEUR and (i + 1) % colonnes:
+        dessus.append(i - colonnes + 1)
+
+    for j in dessus:
+        if cible.caracteres[j] != COUVERT and j not in reprises:
+            reprises.append(j)
+
+class _Terminal:
+    """État du Minitel simulé pendant le calcul d’une différence"""
+    def __init__(self, source, colonnes, lignes):
+        self.colonnes = colonnes
+        self.lignes = lignes
+        self.sortie = bytearray()
+        self.jeux_redefinis = list(source.jeux_redefinis)
+
+        if source.curseur_connu:
+            self.x = source.x
+            self.y = source.y
+            self.avant_plan = source.avant_plan
+            self.fond = source.fond
+            self.taille = source.taille
+            self.effet = source.effet
+            self.jeu = source.jeu
+        else:
+            self.x = None
+            self.y = None
+            self.reinitialise()
+
+    def reinitialise(self):
+        """Attributs par défaut, après positionnement ou changement de rangée"""
+        self.avant_plan = 7
+        self.fond = 0
+        self.taille = NORMALE
+        self.effet = 0
+        self.jeu = G0
+
+    def place(self, x, y):
+        """Déplace le curseur par le chemin le plus court"""
+        octets = deplacement(self.x, self.y, x, y)
+        if not octets:
+            return
+
+        self.sortie.extend(octets)
+        if octets[0] in (RS, US) or y != self.y:
+            self.reinitialise()
+        self.x = x
+        self.y = y
+
+    def attributs(self, cible, i):
+        """Émet les attributs nécessaires à l’affichage de la cellule i"""
+        sortie = self.sortie
+
+        avant_plan = cible.couleurs[i] & 0x0f
+        if avant_plan != self.avant_plan:
+            sortie.extend(bytes([ESC, 0x40 + avant_plan]))
+            self.avant_plan = avant_plan
+
+        fond = cible.couleurs[i] >> 4
+        if fond != self.fond:
+            sortie.extend(bytes([ESC, 0x50 + fond]))
+            self.fond = fond
+
+        taille = cible.tailles[i]
+        if taille != self.taille:
+            sortie.extend(bytes([ESC, 0x4c + taille]))
+            self.taille = taille
+
+        effet = cible.effets[i]
+        for (bit, actif, inactif) in (
+            (CLIGNOTEMENT, 0x48, 0x49),
+            (SOULIGNEMENT, 0x5a, 0x59),
+            (INVERSION, 0x5d, 0x5c),
+            (MASQUAGE, 0x58, 0x5f)
+        ):
+            if effet & bit != self.effet & bit:
+                sortie.extend(bytes([ESC, actif if effet & bit else inactif]))
+        self.effet = effet
+
+        # Les caractères G2 et accentués s’obtiennent depuis le jeu G0
+        jeu = G1 if cible.jeux[i] & ~DRCS == G1 else G0
+        redefini = cible.jeux[i] & DRCS != 0
+        if redefini != self.jeux_redefinis[jeu]:
+            sortie.extend(bytes([ESC, 0x28 + jeu]))
+            if redefini:
+                sortie.extend(bytes([0x20, 0x42 + jeu]))
+            else:
+                sortie.append(0x63 if jeu == G1 else 0x42)
+            self.jeux_redefinis[jeu] = redefini
+
+        if jeu != self.jeu:
+            sortie.append(SO if jeu == G1 else SI)
+            self.jeu = jeu
+
+    def ecrit(self, cible, i):
+        """Émet le caractère de la cellule i et avance le curseur"""
+        caractere = cible.caracteres[i]
+        if cible.jeux[i] == G2:
+            self.sortie.extend(bytes([SS2, caractere]))
+        elif cible.diacritiques[i]:
+            self.sortie.extend(bytes([SS2, cible.diacritiques[i], caractere]))
+        else:
+            self.sortie.append(caractere)
+
+        largeur = 1
+        if self.taille & DOUBLE_LARGEUR and self.x < self.colonnes:
+            largeur = 2
+        self.avance(largeur)
+
+    def repete(self, nombre):
+        """Émet un REP et avance le curseur"""
+        self.sortie.extend(bytes([REP, 0x40 + nombre]))
+        self.avance(nombre)
+
+    def avance(self, pas):
+        """Avance le curseur comme le fait le Minitel"""
+        self.x += pas
+        if self.x > self.colonnes:
+            self.x = 1
+            self.y = self.y + 1 if self.y < self.lignes else 1
+            self.reinitialise()
+
+def difference(source, cible):
+    """Calcule les octets transformant l’écran source en écran cible
+
+    Seules les rangées 1 à 24 sont prises en compte. Les cellules identiques
+    sont sautées par le déplacement de curseur le plus court, les attributs
+    déjà en vigueur ne sont pas répétés et les suites de caractères
+    identiques sont envoyées avec REP.
+
+    Si le contenu de l’écran source est inconnu, l’écran est d’abord effacé.
+    Les motifs des caractères redéfinis sont supposés déjà chargés.
+
+    :param source:
+        écran actuellement affiché par le Minitel
+    :type source:
+        un objet Ecran
+
+    :param cible:
+        écran à afficher
+    :type cible:
+        un objet Ecran
+
+    :returns:
+        un bytearray
+    """
+    assert isinstance(source, Ecran) and isinstance(cible, Ecran)
+    assert source.colonnes == cible.colonnes
+
+    colonnes = cible.colonnes
+    lignes = cible.lignes
+    terminal = _Terminal(source, colonnes, lignes)
+    masquage = source.masquage_ecran
+
+    # Les caractères sont écrits hors du mode insertion
+    if source.insertion:
+        terminal.sortie.extend(bytes([ESC, 0x5b, 0x34, 0x6c]))
+
+    if not source.contenu_connu:
+        terminal.sortie.append(FF)
+        terminal.x = 1
+        terminal.y = 1
+        terminal.reinitialise()
+        source = Ecran(colonnes, lignes)
+        source.efface()
+
+    # Une cellule recouverte est écrite par le caractère double qui la
+    # recouvre, à sa gauche ou en dessous. Si elle a changé, ce caractère doit
+    # être réécrit même s’il est identique
+    forcees = bytearray(len(cible.caracteres))
+    for y in range(1, lignes + 1):
+        for x in range(1, colonnes + 1):
+            i = cible.index(x, y)
+            if (cible.caracteres[i] != COUVERT or
+                    _identiques(source, i, cible, i)):
+                continue
+            if x > 1 and cible.tailles[i - 1] & DOUBLE_LARGEUR:
+                forcees[i - 1] = 1
+            if y < lignes:
+                if cible.tailles[i + colonnes] & DOUBLE_HAUTEUR:
+                    forcees[i + colonnes] = 1
+                if x > 1 and cible.tailles[i + colonnes - 1] & DOUBLE_HAUTEUR:
+                    forcees[i + colonnes - 1] = 1
+
+    reprises = []
+
+    for y in range(1, lignes + 1):
+        # Réécrit les cellules de la rangée précédente recouvertes à tort
+        while reprises:
+            j = reprises.pop(0)
+            terminal.place(j % colonnes + 1, j // colonnes)
+            terminal.attributs(cible, j)
+            terminal.ecrit(cible, j)
+            if cible.tailles[j] & DOUBLE_HAUTEUR:
+                _recouvrements(cible, j, reprises)
+
+        debut = cible.index(1, y)
+        x = 1
+        while x <= colonnes:
+            i = debut + x - 1
+
+            if cible.caracteres[i] == COUVERT or (
+                    not forcees[i] and _identiques(source, i, cible, i)):
+                x += 1
+                continue
+
+            terminal.place(x, y)
+            terminal.attributs(cible, i)
+            terminal.ecrit(cible, i)
+            x = terminal.x if terminal.y == y else colonnes + 1
+
+            # Un caractère double largeur recouvre sa voisine de droite, qui
+            # doit être récrite si l’écran cible ne la montre pas couverte
+            if (cible.tailles[i] & DOUBLE_LARGEUR and x == (i % colonnes) + 3
+                    and cible.caracteres[i + 1] != COUVERT):
+                forcees[i + 1] = 1
+                x -= 1
+
+            # Un caractère double hauteur recouvre la rangée du dessus, qui
+            # devra être récrite là où l’écran cible ne la montre pas couverte
+            if cible.tailles[i] & DOUBLE_HAUTEUR:
+                _recouvrements(cible, i, reprises)
+
+            # Une suite de caractères identiques part avec un REP, y compris
+            # au travers de cellules déjà identiques
+            if (cible.tailles[i] != NORMALE or cible.jeux[i] == G2 or
+                    cible.diacritiques[i] or x > colonnes):
+                continue
+
+            fin = x
+            dernier_modifie = 0
+            while (fin <= colonnes and fin - x < REPETITION_MAX and
+                    _identiques(cible, i, cible, debut + fin - 1)):
+                if not _identiques(source, debut + fin - 1,
+                                   cible, debut + fin - 1):
+                    dernier_modifie = fin
+                fin += 1
+
+            nombre = dernier_modifie - x + 1
+            if nombre >= 3:
+                terminal.repete(nombre)
+                x = terminal.x if terminal.y == y else colonnes + 1
+
+    while reprises:
+        j = reprises.pop(0)
+        terminal.place(j % colonnes + 1, j // colonnes)
+        terminal.attributs(cible, j)
+        terminal.ecrit(cible, j)
+
+    # Le curseur retrouve la position et l’état de l’écran cible
+    if cible.curseur_connu:
+        terminal.place(cible.x, cible.y)
+
+    if cible.curseur_visible != source.curseur_visible:
+        terminal.sortie.append(CON if cible.curseur_visible else COF)
+
+    if cible.masquage_ecran != masquage:
+        terminal.sortie.extend(bytes([ESC, 0x23, 0x20,
+                                      0x58 if cible.masquage_ecran else 0x5f]))
+
+    if cible.insertion:
+        terminal.sortie.extend(bytes([ESC, 0x5b, 0x34, 0x68]))
+
+    return terminal.sortie
+
+# États du compresseur
+_AFFICHAGE = 0  # les octets 0x20 à 0x7f sont des caractères affichés
+_ESC = 1        # attente de l’octet suivant ESC
+_IGNORE = 2     # octets de paramètre à recopier tels quels
+_CSI = 3        # paramètres d’une séquence CSI
+_DRCS = 4       # définition de caractères, jusqu’au prochain US
+_US = 5         # attente de la rangée d’un positionnement
+_US_COL = 6     # attente de la colonne d’un positionnement
+_SS2 = 7        # attente du caractère G2 ou de l’accent
+_ACCENT = 8     # attente de la lettre à accentuer
+_REP = 9        # attente du nombre de répétitions
+_JEU = 10       # désignation d’un jeu de caractères
+
+# Longueur minimale d’une suite de caractères identiques remplacée par REP
+SUITE_MIN = 4
+
+class Compresseur:
+    """Compression des suites de caractères identiques par REP
+
+    Le compresseur suit le flux d’octets envoyé au Minitel pour ne
+    remplacer que des caractères réellement affichés : les paramètres des
+    séquences ESC, CSI, US, SS2, des commandes protocole et des définitions
+    de caractères sont recopiés tels quels. Une séquence commencée dans un
+    appel est reconnue dans l’appel suivant.
+
+    Une suite d’au moins SUITE_MIN caractères identiques devient le
+    caractère suivi de REP et du nombre de répétitions (63 au plus par REP).
+
+    Le changement de rangée ramène le Minitel au jeu G0 alors que REP
+    répète le dernier caractère dans son jeu. Une suite de caractères
+    semi-graphiques n’est donc compressée que jusqu’à la fin de la rangée,
+    et seulement si la colonne du curseur est connue.
+
+    Note:
+    REP n’existe qu’en mode Videotex.
+    """
+    def __init__(self, colonnes = 40, lignes = 24):
+        self.colonnes = colonnes
+        self.lignes = lignes
+        self._etat = _AFFICHAGE
+        self._reste = 0
+
+        # Colonne du curseur (None si inconnue), largeur des caractères et
+        # jeu semi-graphique en cours
+        self._x = None
+        self._largeur = 1
+        self._g1 = False
+
+        # Indique si un caractère a déjà été affiché
+        self._affiche = False
+
+    def _change_ligne(self):
+        """Le Minitel remet ses attributs à zéro à chaque changement de rangée"""
+        self._largeur = 1
+        self._g1 = False
+
+    def _avance(self, nombre, largeur):
+        """Avance le curseur de nombre pas de la largeur indiquée"""
+        if self._x == None:
+            return
+
+        x = self._x
+        if largeur == 1:
+            x += nombre
+            if x > self.colonnes:
+                x = (x - 1) % self.colonnes + 1
+                self._change_ligne()
+            self._x = x
+            return
+
+        # Un caractère double largeur en dernière colonne n’en occupe qu’une
+        for _ in range(nombre):
+            x += self._largeur if x < self.colonnes else 1
+            if x > self.colonnes:
+                x = 1
+                self._change_ligne()
+        self._x = x
+
+    def _place(self, x):
+        """Déplace le curseur sur une nouvelle rangée"""
+        self._x = x
+        self._change_ligne()
+
+    def compresse(self, octets):
+        """Retourne le flux d’octets avec ses répétitions compressées
+
+        :param octets:
+            les octets destinés au Minitel
+        :type octets:
+            un objet bytes, bytearray ou memoryview
+
+        :returns:
+            un objet bytearray
+        """
+        sortie = bytearray()
+        longueur = len(octets)
+        i = 0
+        while i < longueur:
+            octet = octets[i]
+            i += 1
+            etat = self._etat
+
+            if etat == _AFFICHAGE:
+                if octet >= 0x20:
+                    # Mesure la suite de caractères identiques
+                    fin = i
+                    while fin < longueur and octets[fin] == octet:
+                        fin += 1
+
+                    # En semi-graphique, la suite s’arrête en fin de rangée
+                    if self._g1:
+                        if self._x == None:
+                            fin = i
+                        else:
+                            place = (self.colonnes - self._x) // self._largeur
+                            fin = min(fin, i + place)
+
+                    reste = fin - i
+                    if reste + 1 < SUITE_MIN:
+                        sortie.extend(octets[i - 1:fin])
+                    else:
+                        sortie.append(octet)
+                        while reste >= 3:
+                            nombre = min(reste, REPETITION_MAX)
+                            sortie.append(REP)
+                            sortie.append(0x40 + nombre)
+                            reste -= nombre
+                        sortie.extend(bytes([octet]) * reste)
+
+                    self._affiche = True
+                    self._avance(fin - i + 1, self._largeur)
+                    i = fin
+                    continue
+
+                if octet == ESC:
+                    self._etat = _ESC
+                elif octet == US:
+                    self._etat = _US
+                elif octet == SS2:
+                    self._etat = _SS2
+                elif octet == REP:
+                    self._etat = _REP
+                elif octet in (SEP, SS3):
+                    self._etat = _IGNORE
+                    self._reste = 1
+                elif octet in (RS, FF):
+                    self._place(1)
+                elif octet == CR and self._x != None:
+                    # La rangée 0 laisse la colonne inconnue jusqu’au
+                    # prochain positionnement
+                    self._x = 1
+                elif octet in (LF, VT):
+                    self._change_ligne()
+                elif octet == TAB:
+                    self._avance(1, 1)
+                elif octet == BS:
+                    if self._x == 1:
+                        self._place(self.colonnes)
+                    elif self._x != None:
+                        self._x -= 1
+                elif octet == SO:
+                    self._g1 = True
+                elif octet == SI:
+                    self._g1 = False
+            elif etat == _ESC:
+                self._etat = _AFFICHAGE
+                if octet == 0x4c or octet == 0x4e:
+                    self._largeur = 1 if octet == 0x4c else 2
+                elif octet == 0x4d or octet == 0x4f:
+                    # Refusées en rangée 1, les tailles double hauteur
+                    # rendent la largeur des caractères incertaine
+                    self._x = None
+                elif octet == 0x5b:
+                    self._etat = _CSI
+                elif octet in (0x39, 0x3a, 0x3b):
+                    # Commandes protocole PRO1, PRO2 et PRO3
+                    self._etat = _IGNORE
+                    self._reste = octet - 0x38
+                elif 0x28 <= octet <= 0x2b:
+                    self._etat = _JEU
+                elif octet == 0x23:
+                    self._etat = _IGNORE
+                    self._reste = 2
+            elif etat == _IGNORE:
+                self._reste -= 1
+                if self._reste <= 0:
+                    self._etat = _AFFICHAGE
+            elif etat == _CSI:
+                if not 0x30 <= octet <= 0x3f:
+                    # Les déplacements CSI ne sont pas suivis
+                    self._etat = _AFFICHAGE
+                    self._x = None
+            elif etat == _US:
+                if octet == 0x23:
+                    # US 0x23 débute une définition de caractères
+                    self._etat = _DRCS
+                else:
+                    self._reste = octet
+                    self._etat = _US_COL
+            elif etat == _US_COL:
+                self._etat = _AFFICHAGE
+                ligne = self._reste
+                if ligne >= 0x40 and octet >= 0x40:
+                    (colonne, ligne) = (octet - 0x40, ligne - 0x40)
+                elif ligne >= 0x30 and octet >= 0x30:
+                    # Positionnement en décimal
+                    (colonne, ligne) = (1, (ligne - 0x30) * 10 + octet - 0x30)
+                else:
+                    colonne = 0
+
+                # Un positionnement hors de l’écran est ignoré
+                if 1 <= colonne <= self.colonnes and ligne <= self.lignes:
+                    self._place(colonne)
+
+                    # En quittant la rangée 0, le curseur retrouve une
+                    # position qui n’est pas suivie
+                    if ligne == 0:
+                        self._x = None
+            elif etat == _DRCS:
+                if octet == US:
+                    self._etat = _US
+            elif etat == _SS2:
+                if octet in DIACRITIQUES:
+                    self._etat = _ACCENT
+                else:
+                    self._etat = _AFFICHAGE
+                    self._affiche = True
+                    self._avance(1, self._largeur)
+            elif etat == _ACCENT:
+                self._etat = _AFFICHAGE
+                self._affiche = True
+                self._avance(1, self._largeur)
+            elif etat == _REP:
+                self._etat = _AFFICHAGE
+                if not self._affiche:
+                    # Sans caractère à répéter, l’effet de REP est inconnu
+                    self._x = None
+                elif octet >= 0x40:
+                    self._avance(octet - 0x40, self._largeur)
+            elif etat == _JEU:
+                if octet >= 0x30:
+                    self._etat = _AFFICHAGE
+
+            sortie.append(octet)
+
+        return sortie
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Mesure du temps en millisecondes
+
+Les fonctions ticks_ms, ticks_diff, ticks_add et sleep_ms de MicroPython sont
+reprises telles quelles. Sous CPython, où elles n’existent pas, elles sont
+remplacées par des équivalents fondés sur time.monotonic afin que le module
+minitel puisse fonctionner sur un ordinateur.
+"""
+
+try:
+    from time import ticks_ms, ticks_diff, ticks_add, sleep_ms
+except ImportError:
+    from time import monotonic, sleep
+
+    def ticks_ms():
+        """Retourne un compteur de millisecondes croissant"""
+        return int(monotonic() * 1000)
+
+    def ticks_diff(fin, debut):
+        """Retourne l’écart en millisecondes entre deux valeurs de ticks_ms"""
+        return fin - debut
+
+    def ticks_add(instant, delai):
+        """Décale une valeur de ticks_ms d’un délai en millisecondes"""
+        return instant + delai
+
+    def sleep_ms(delai):
+        """Suspend l’exécution pendant un délai en millisecondes"""
+        sleep(delai / 1000)
@@ -3,10 +3,23 @@
 """Fonctions outils supplémentaires
 """
 
+import os
+
 from minitel.constantes import COULEURS_MINITEL
+from minitel.compactage import Decompacteur, est_compacte
+
+# Taille des blocs lus dans les fichiers videotex
+TAILLE_BLOC = 256
 
-def affiche_videotex(minitel, fichier):
+def affiche_videotex(minitel, fichier, interruptible = False,
+                     progression = None, taille = TAILLE_BLOC):
     """ Fonction permettant d'afficher un fichier videotex (.vdt .vtx)
+
+    Le fichier est lu par blocs de taille octets dans un tampon réutilisé :
+    la mémoire occupée ne dépend pas de la taille de l'écran. Un affichage
+    interruptible est rythmé sur la liaison (voir Minitel.interruptible).
+    Un écran compacté (voir minitel.compactage) est reconnu à son en-tête et
+    décompressé bloc par bloc.
     
     :param minitel:
         L’objet auquel envoyer les commandes et recevoir les appuis de
@@ -18,9 +31,64 @@ def affiche_videotex(minitel, fichier):
         Le chemin du fichier à afficher
     :type fichier:
         une chaine de caractere
+
+    :param interruptible:
+        True pour qu'une touche de fonction abandonne le reste de la page
+    :type interruptible:
+        un booléen
+
+    :param progression:
+        fonction appelée après chaque bloc avec le nombre d'octets lus et la
+        taille du fichier, compacté le cas échéant. Si elle retourne True, l'affichage est abandonné.
+    :type progression:
+        une fonction ou None
+
+    :param taille:
+        taille des blocs lus dans le fichier
+    :type taille:
+        un entier positif
+
+    :returns:
+        True si l'affichage a été interrompu
     """
-    with open(fichier, 'rb') as f:
-        minitel.envoyer_brut(f.read())
+    assert isinstance(taille, int) and taille > 0
+
+    tampon = bytearray(taille)
+    vue = memoryview(tampon)
+    total = os.stat(fichier)[6]
+    lus = 0
+    interrompu = False
+    decompacteur = None
+
+    # Seul un affichage interruptible est rythmé et coupé en tranches
+    if interruptible:
+        minitel.debut_interruptible()
+
+    try:
+        with open(fichier, 'rb') as f:
+            while not interrompu:
+                nombre = f.readinto(tampon)
+                if not nombre:
+                    break
+
+                if lus == 0 and est_compacte(vue[:nombre]):
+                    decompacteur = Decompacteur()
+
+                if decompacteur == None:
+                    minitel.envoyer_brut(vue[:nombre])
+                else:
+                    minitel.envoyer_brut(decompacteur.decompacte(vue[:nombre]))
+                lus += nombre
+
+                interrompu = interruptible and minitel.interrompu
+                if progression != None and progression(lus, total):
+                    minitel.interrompre()
+                    interrompu = True
+    finally:
+        if interruptible:
+            interrompu = minitel.fin_interruptible()
+
+    return interrompu
 
 def traine_caractere(minitel, x0, x1, y, car, couleur = None, fond = None):
     """ Fonction animation permettant de faire glisser une chaine de caractere
@@ -16,6 +16,9 @@ CARACTERES_MINITEL = (
     '0123456789'
 )
 
+# Code envoyé par la touche ç
+CEDILLE_C = ACCENT_CEDILLE + b'c'
+
 class ChampTexte(UI):
     """Classe de gestion de champ texte
 
@@ -111,7 +114,7 @@ class ChampTexte(UI):
               sequence.egale(ACCENT_TREMA)):
             self.accent = sequence
             return True
-        elif sequence.egale([ACCENT_CEDILLE, 'c']):
+        elif sequence.egale(CEDILLE_C):
             self.accent = None
             self.valeur = (self.valeur[0:self.curseur_x] +
                            'ç' +
@@ -27,9 +27,12 @@ class Conteneur(UI):
     - elements : liste des éléments dans leur ordre d’apparition
     - element_actif : objet de classe UI désignant l’élément actif
     - fond : couleur de fond du conteneur
+    - interruptible : True si une touche de fonction peut interrompre
+      l’affichage
+    - interrompu : True si le dernier affichage a été interrompu
     """
     def __init__(self, minitel, posx, posy, largeur, hauteur, couleur = None,
-                 fond = None):
+                 fond = None, interruptible = False):
         """Constructeur
 
         :param minitel:
@@ -67,6 +70,12 @@ class Conteneur(UI):
             Couleur de fond du conteneur
         :type couleur:
             un entier, une chaîne de caractères ou None
+
+        :param interruptible:
+            True pour qu’une touche de fonction interrompe l’affichage (voir
+            Minitel.interruptible)
+        :type interruptible:
+            un booléen
         """
         assert isinstance(posx, int)
         assert isinstance(posy, int)
@@ -74,11 +83,14 @@ class Conteneur(UI):
         assert isinstance(hauteur, int)
         assert isinstance(couleur, (str, int)) or couleur == None
         assert isinstance(fond, (str, int)) or fond == None
+        assert interruptible in [True, False]
 
         # Initialisation des attributs
         self.elements = []
         self.element_actif = None
         self.fond = fond
+        self.interruptible = interruptible
+        self.interrompu = False
 
         UI.__init__(self, minitel, posx, posy, largeur, hauteur, couleur)
 
@@ -146,11 +158,30 @@ class Conteneur(UI):
         de fond a été définie. Ensuite, elle demande à chacun des éléments
         contenus de se dessiner.
 
+        Si le conteneur est interruptible, une touche de fonction reçue en
+        cours d’affichage abandonne le reste du dessin : l’attribut
+        interrompu passe à True, l’élément actif ne prend pas la main et la
+        touche reste à lire par l’application.
+
         Note:
             Les coordonnées du conteneur et les coordonnées des éléments sont
             indépendantes.
 
         """
+        if self.interruptible:
+            with self.minitel.interruptible() as rendu:
+                self._dessine()
+            self.interrompu = rendu.interrompu
+        else:
+            self._dessine()
+            self.interrompu = False
+
+        # Si un élément actif a été défini, on lui donne la main
+        if self.element_actif != None and not self.interrompu:
+            self.element_actif.gere_arrivee()
+
+    def _dessine(self):
+        """Dessine le fond du conteneur puis chacun de ses éléments"""
         # Colorie le fond du conteneur si une couleur de fond a été définie
         if self.fond != None:
             for posy in range(self.posy, self.posy + self.hauteur):
@@ -162,10 +193,6 @@ class Conteneur(UI):
         for element in self.elements:
             element.affiche()
 
-        # Si un élément actif a été défini, on lui donne la main
-        if self.element_actif != None:
-            self.element_actif.gere_arrivee()
-
     def ajoute(self, element):
         """Ajout d’un élément au conteneur
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Dialogues avec un Minitel simulé par l’émulateur, sur une liaison en
+# mémoire : aucun Minitel n’est nécessaire.
+
+from minitel.Minitel import Minitel
+from minitel.Emulateur import Emulateur
+from minitel.Ecran import G0, NORMALE
+from minitel.liaison import boucle
+from minitel.tools import affiche_videotex
+from minitel.ui.ChampTexte import ChampTexte
+from minitel.ui.Menu import Menu
+from minitel.constantes import ENVOI, BAS, ACCENT_AIGU
+
+import os
+
+# Vitesse, identification et configuration d’un Minitel 2 démarré à 4800 bps
+cote_minitel, cote_ordinateur = boucle()
+emulateur = Emulateur(cote_minitel, vitesse = 4800)
+minitel = Minitel(liaison = cote_ordinateur, ecran = True)
+
+assert minitel.deviner_vitesse() == 4800
+assert minitel.vitesse == 4800
+
+# L’identification reste dans son budget : moins de 16 caractères sur la
+# ligne, dans les deux sens confondus
+avant = emulateur.temps_emission + emulateur.temps_reception
+minitel.identifier()
+duree = emulateur.temps_emission + emulateur.temps_reception - avant
+assert 0 < duree <= emulateur.duree(16)
+assert minitel.capacite['nom'] == 'Minitel 2'
+assert minitel.capacite['constructeur'] == 'Philips'
+assert minitel.mode == 'VIDEOTEX'
+
+assert minitel.configurer_clavier(etendu = True, curseur = True,
+                                  minuscule = True)
+assert minitel.configurer_clavier()
+
+assert minitel.definir_mode('MIXTE')
+assert emulateur.mode == 'MIXTE'
+assert minitel.definir_mode('VIDEOTEX')
+
+assert minitel.definir_vitesse(9600)
+assert emulateur.vitesse == 9600
+
+# Les tirets sont compressés par REP et affichés en rouge
+minitel.compression = True
+minitel.echo(False)
+minitel.efface()
+minitel.position(5, 3)
+minitel.couleur(caractere = 'rouge')
+avant = emulateur.octets_recus
+minitel.envoyer('Bonjour ' + '-' * 20)
+assert emulateur.octets_recus - avant < len('Bonjour ') + 20
+assert emulateur.ecran.texte(3) == '    Bonjour ' + '-' * 20 + ' ' * 8
+assert emulateur.ecran.cellule(5, 3) == (ord('B'), G0, 0, 0x01, NORMALE, 0)
+assert emulateur.ecran.cellule(32, 3) == (ord('-'), G0, 0, 0x01, NORMALE, 0)
+assert emulateur.ecran.cellule(33, 3) == (ord(' '), G0, 0, 0x07, NORMALE, 0)
+
+# Une touche lue par recevoir alors que l’écho est actif a pu être affichée
+# par le Minitel : le positionnement suivant doit rester exact
+assert minitel.echo(True)
+minitel.efface()
+minitel.position(1, 5)
+minitel.envoyer('abc')
+emulateur.taper('y')
+assert minitel.recevoir(bloque = True, attente = 1) == 'y'
+assert not minitel.ecran.curseur_connu
+minitel.position(6, 5)
+minitel.envoyer('Q')
+assert emulateur.ecran.texte(5).startswith('abcy Q')
+
+# Champ texte : saisie avec accent, puis Envoi qui termine la boucle
+assert minitel.echo(False)
+champ = ChampTexte(minitel, 10, 10, 20)
+champ.affiche()
+champ.gere_arrivee()
+emulateur.taper(['ab', ACCENT_AIGU, 'e'])
+emulateur.taper(ENVOI)
+champ.executer()
+assert champ.valeur == 'abé'
+# Le modèle de l’écran ne retient que la lettre de base d’un caractère
+# accentué
+assert emulateur.ecran.texte(10)[9:12] == 'abe'
+
+# Menu : deux fois Bas puis Envoi, le séparateur est sauté
+menu = Menu(minitel, ['Nouveau', 'Ouvrir', '-', 'Fermer'], 5, 12)
+menu.affiche()
+emulateur.taper([BAS, BAS])
+emulateur.taper(ENVOI)
+menu.executer()
+assert menu.selection == 3
+
+# Un Minitel 1B refuse 9600 bps
+cote_minitel, cote_ordinateur = boucle()
+emulateur = Emulateur(cote_minitel, type_minitel = 'u')
+minitel = Minitel(liaison = cote_ordinateur)
+
+assert minitel.deviner_vitesse() == 1200
+minitel.identifier()
+assert minitel.capacite['nom'] == 'Minitel 1B'
+assert not minitel.definir_vitesse(9600)
+assert emulateur.vitesse == 1200
+
+# Sans modèle de l’écran (ecran = False par défaut), les attributs en cours
+# et le curseur restent suivis : rien n’est envoyé pour ce qui ne change
+# rien et le curseur emprunte le déplacement le plus court
+minitel.efface()
+minitel.position(1, 3)
+minitel.couleur(caractere = 'bleu')
+avant = emulateur.octets_recus
+minitel.couleur(caractere = 'bleu')
+minitel.effet(inversion = False)
+minitel.taille(1, 1)
+assert emulateur.octets_recus == avant
+minitel.envoyer('Bonjour')
+minitel.position(1, 4)
+assert emulateur.octets_recus == avant + len('Bonjour') + 2
+assert (emulateur.ecran.x, emulateur.ecran.y) == (1, 4)
+
+# L’affichage interruptible n’a pas non plus besoin du modèle
+avant = emulateur.octets_recus
+assert not affiche_videotex(minitel, 'arobase.vdt', interruptible = True)
+assert emulateur.octets_recus == avant + os.stat('arobase.vdt')[6]
+
+print('Dialogues avec l’émulateur : OK')
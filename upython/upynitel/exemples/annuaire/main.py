@@ -34,7 +34,9 @@ def do_connect():
 def init():
     "Initialisation du serveur vidéotex"
     global m
-    m = upynitel.Pynitel(UART(2, baudrate = 1200,parity=0, bits=7,stop=1))
+    vitesse = 1200
+    m = upynitel.Pynitel(UART(2, baudrate = vitesse,parity=0, bits=7,stop=1),
+                         vitesse)
     (quoi, ou) = ('', '')
     return(quoi, ou)
 
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+# Construction de l'archive d'écrans du diaporama, à lancer sur le PC
+# avant de copier ecrans.vda dans la mémoire flash de l'ESP32 :
+#     python3 archive.py [-z] [répertoire [archive]]
+# -z compacte les écrans, décompressés au fil de l'affichage
+
+import os
+import sys
+import upynitel
+
+
+def main(repertoire='ecrans', destination='ecrans.vda', compacter=False):
+    "Archive les écrans du répertoire, dans l'ordre de leur nom"
+    noms = sorted(os.listdir(repertoire))
+    upynitel.cree_archive(destination, [(nom, repertoire + '/' + nom)
+                                        for nom in noms], compacter)
+    print(len(noms), 'écrans,', os.stat(destination)[6], 'octets')
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    compacter = '-z' in arguments
+    if compacter:
+        arguments.remove('-z')
+    main(*arguments[:2], compacter=compacter)
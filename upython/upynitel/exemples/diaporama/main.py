@@ -9,7 +9,9 @@ m = None
 def init():
     "Initialisation du serveur vidéotex"
     global m
-    m = upynitel.Pynitel(UART(2, baudrate = 1200,parity=0, bits=7,stop=1))
+    vitesse = 1200
+    m = upynitel.Pynitel(UART(2, baudrate = vitesse,parity=0, bits=7,stop=1),
+                         vitesse)
     
 def accueil():
     m.home()
@@ -41,13 +43,23 @@ def accueil():
 def diapo():
     global m
     
-    fileList = listdir('/ecrans')
-    numFiles = len(fileList)
+    # écrans regroupés par archive.py dans un seul fichier indexé, à défaut
+    # les fichiers du répertoire /ecrans
+    try:
+        archive = upynitel.Archive('/ecrans.vda')
+        numFiles = len(archive)
+    except OSError:
+        archive = None
+        fileList = sorted(listdir('/ecrans'))
+        numFiles = len(fileList)
     num = 0;
     
     while True:
         m.home()
-        m.xdraw('/ecrans/' + fileList[num])
+        if archive != None:
+            m.drawarchive(archive, num % numFiles)
+        else:
+            m.xdraw('/ecrans/' + fileList[num % numFiles])
         (choix, touche) = m.input(0, 1, 0, '')
         m.cursor(False)
         if touche == m.suite:
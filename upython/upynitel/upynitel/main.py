@@ -3,7 +3,8 @@
 from machine import UART
 import upynitel
 
-m = upynitel.Pynitel(UART(2, baudrate = 1200,parity=0, bits=7,stop=1))
+vitesse = 1200
+m = upynitel.Pynitel(UART(2, baudrate = vitesse,parity=0, bits=7,stop=1), vitesse)
 print(' > minitel instance declared')
 
 m._print('hello world')
@@ -5,13 +5,388 @@
 
 # portage micropython par iodeo en 2021
 
+import os
+import select
 import time
 
 
+class Compresseur:
+    """Remplace les suites d'au moins 4 caractères identiques par REP
+
+    Le flux est suivi pour ne toucher qu'aux caractères affichés : les
+    paramètres des séquences ESC, CSI, US, SS2, protocole et DRCS passent
+    tels quels. Un changement de rangée ramène le Minitel en G0 alors que
+    REP répète le caractère dans son jeu : en semi-graphique, une suite
+    s'arrête donc en fin de rangée et n'est compressée que si la colonne
+    du curseur est connue."""
+
+    def __init__(self):
+        self.etat = None    # None, ou octet de la séquence en cours
+        self.reste = 0      # octets de paramètre restant à recopier
+        self.x = None       # colonne du curseur, None si inconnue
+        self.largeur = 1
+        self.g1 = False
+        self.affiche = False
+
+    def _rangee(self, x):
+        "Changement de rangée : attributs par défaut"
+        self.x = x
+        self.largeur = 1
+        self.g1 = False
+
+    def _avance(self, nombre, largeur):
+        "Avance le curseur de nombre pas"
+        if self.x is None:
+            return
+        for _ in range(nombre):
+            self.x += largeur if self.x < 40 else 1
+            if self.x > 40:
+                self._rangee(1)
+                largeur = 1
+
+    def oublie(self):
+        "Flux envoyé sans suivi : colonne et jeu inconnus"
+        # semi-graphique supposé : pas de REP avant la rangée suivante
+        self.etat = None
+        self.x = None
+        self.g1 = True
+
+    def compresse(self, data):
+        "Retourne les octets data avec leurs répétitions compressées"
+        sortie = bytearray()
+        i = 0
+        while i < len(data):
+            octet = data[i]
+            i += 1
+            etat = self.etat
+            if etat is None and 0x20 <= octet <= 0x7f:
+                fin = i
+                while fin < len(data) and data[fin] == octet:
+                    fin += 1
+                if self.g1:
+                    # en semi-graphique, pas au-delà de la fin de rangée
+                    if self.x is None:
+                        fin = i
+                    else:
+                        fin = min(fin, i + (40 - self.x) // self.largeur)
+                reste = fin - i
+                if reste < 3:
+                    sortie.extend(data[i-1:fin])
+                else:
+                    sortie.append(octet)
+                    while reste >= 3:
+                        nombre = min(reste, 63)
+                        sortie.extend(bytes([18, 64+nombre]))
+                        reste -= nombre
+                    sortie.extend(bytes([octet]) * reste)
+                self.affiche = True
+                self._avance(fin - i + 1, self.largeur)
+                i = fin
+                continue
+            sortie.append(octet)
+            if etat is None:
+                if octet in (27, 31, 25, 18):   # ESC, US, SS2, REP
+                    self.etat = octet
+                elif octet in (19, 29):         # SEP, SS3
+                    self.etat = 0
+                    self.reste = 1
+                elif octet in (12, 30):         # FF, RS
+                    self._rangee(1)
+                elif octet == 13 and self.x is not None:   # CR
+                    self.x = 1
+                elif octet in (10, 11):         # LF, VT
+                    self._rangee(self.x)
+                elif octet == 9:                # TAB
+                    self._avance(1, 1)
+                elif octet == 8:                # BS
+                    if self.x == 1:
+                        self._rangee(40)
+                    elif self.x is not None:
+                        self.x -= 1
+                elif octet in (14, 15):         # SO, SI
+                    self.g1 = octet == 14
+                elif octet > 0x7f:
+                    self.x = None
+            elif etat == 0:                     # paramètres à recopier
+                self.reste -= 1
+                if self.reste <= 0:
+                    self.etat = None
+            elif etat == 27:                    # ESC
+                self.etat = None
+                if octet in (0x4c, 0x4e):
+                    self.largeur = 1 if octet == 0x4c else 2
+                elif octet in (0x4d, 0x4f):
+                    # double hauteur refusée en rangée 1 : largeur incertaine
+                    self.x = None
+                elif octet == 0x5b:
+                    self.etat = 0x5b
+                elif octet in (0x39, 0x3a, 0x3b):   # PRO1, PRO2, PRO3
+                    self.etat = 0
+                    self.reste = octet - 0x38
+                elif 0x28 <= octet <= 0x2b:
+                    self.etat = 0x28
+                elif octet == 0x23:
+                    self.etat = 0
+                    self.reste = 2
+            elif etat == 0x5b:                  # CSI
+                if not 0x30 <= octet <= 0x3f:
+                    self.etat = None
+                    self.x = None
+            elif etat == 0x28:                  # désignation de jeu
+                if octet >= 0x30:
+                    self.etat = None
+            elif etat == 31:                    # US, rangée
+                if octet == 0x23:
+                    self.etat = 0x23            # définition de caractères
+                else:
+                    self.etat = 0x100 + octet
+            elif etat == 0x23:                  # DRCS jusqu'au prochain US
+                if octet == 31:
+                    self.etat = 31
+            elif etat >= 0x100:                 # US, colonne
+                self.etat = None
+                ligne = etat - 0x100
+                if ligne >= 0x40 and octet >= 0x40:
+                    colonne, ligne = octet - 0x40, ligne - 0x40
+                elif ligne >= 0x30 and octet >= 0x30:
+                    colonne, ligne = 1, (ligne - 0x30) * 10 + octet - 0x30
+                else:
+                    colonne = 0
+                if 1 <= colonne <= 40 and ligne <= 24:
+                    self._rangee(colonne if ligne else None)
+            elif etat == 25:                    # SS2
+                if octet in (0x41, 0x42, 0x43, 0x48, 0x4b):
+                    self.etat = 0
+                    self.reste = 1
+                else:
+                    self.etat = None
+                self.affiche = True
+                self._avance(1, self.largeur)
+            elif etat == 18:                    # REP
+                self.etat = None
+                if not self.affiche:
+                    self.x = None
+                elif octet >= 0x40:
+                    self._avance(octet - 0x40, self.largeur)
+        return sortie
+
+
+# acquittements SEP des changements de mode, à ne pas prendre pour des touches
+ACQUITTEMENTS_SEP = (0x5e, 0x70, 0x71)
+
+# nombre de réponses protocole conservées
+REPONSES_MAX = 16
+
+# durée en ms de chaque tranche d'une page envoyée au rythme de la liaison
+DUREE_TRANCHE = 100
+
+# taille du tampon de lecture des fichiers vidéotex
+TAILLE_BLOC = 256
+
+# archive d'écrans : ARCHIVE_ENTETE, nombre d'écrans sur 2 octets, puis
+# pour chaque écran la longueur de son nom sur 1 octet, le nom, sa position
+# et sa longueur sur 4 octets (poids faible en tête), enfin les écrans
+# bout à bout
+ARCHIVE_ENTETE = b'VDTA'
+
+# écran compacté : COMPACT_ENTETE puis des jetons, 0x00 à 0x7f pour
+# recopier les n+1 octets suivants, 0x80 à 0xff suivi d'un octet d pour
+# recopier ((n >> 2) & 0x1f) + 3 octets déjà produits, situés
+# (((n & 3) << 8) | d) + 1 octets en arrière
+COMPACT_ENTETE = b'VDZ1'
+COMPACT_FENETRE = 1024
+COMPACT_COPIE_MAX = 34
+
+
+def _longueur_trame(octets):
+    "Longueur de la trame en tête des octets reçus, 0 si elle est incomplète"
+    premier = octets[0]
+    if premier == 0x01:  # SOH ... EOT : identification ROM
+        for i in range(1, min(len(octets), 5)):
+            if octets[i] == 0x04:
+                return i + 1
+        return 5 if len(octets) >= 5 else 0
+    elif premier == 0x1b:  # ESC : réponses PRO1, PRO2, PRO3
+        if len(octets) < 2:
+            return 0
+        longueur = {0x39: 3, 0x3a: 4, 0x3b: 5}.get(octets[1], 2)
+    elif premier == 0x13:  # SEP : touche de fonction ou acquittement
+        longueur = 2
+    else:
+        longueur = 1
+    return longueur if len(octets) >= longueur else 0
+
+
+def _protocole(trame):
+    "Vrai si la trame est une réponse du Minitel à une commande protocole"
+    if trame[0] == 0x01:
+        return True
+    elif trame[0] == 0x1b:
+        return trame[1] in (0x39, 0x3a, 0x3b)
+    elif trame[0] == 0x13:
+        return trame[1] in ACQUITTEMENTS_SEP
+    return False
+
+
+def compacte(data):
+    "Ecran compacté, à préparer sur le PC"
+    sortie = bytearray(COMPACT_ENTETE)
+    litteraux = bytearray()
+    positions = {}
+    i = 0
+    while i < len(data):
+        # copie la plus longue parmi les 16 dernières positions candidates
+        longueur, distance = 0, 0
+        for j in reversed(positions.get(bytes(data[i:i+3]), ())):
+            if i - j > COMPACT_FENETRE:
+                break
+            commun = 3
+            while (commun < COMPACT_COPIE_MAX and i + commun < len(data)
+                   and data[j + commun] == data[i + commun]):
+                commun += 1
+            if commun > longueur:
+                longueur, distance = commun, i - j
+        if longueur:
+            litteraux = _litteraux(sortie, litteraux)
+            sortie.append(0x80 | (longueur - 3) << 2 | (distance - 1) >> 8)
+            sortie.append((distance - 1) & 0xff)
+        else:
+            litteraux.append(data[i])
+            longueur = 1
+        for k in range(i, min(i + longueur, len(data) - 2)):
+            candidats = positions.setdefault(bytes(data[k:k+3]), [])
+            candidats.append(k)
+            if len(candidats) > 16:
+                del candidats[0]
+        i += longueur
+    _litteraux(sortie, litteraux)
+    return sortie
+
+
+def _litteraux(sortie, litteraux):
+    "Ajoute à sortie les jetons des octets litteraux, retourne un tampon vide"
+    for debut in range(0, len(litteraux), 128):
+        morceau = litteraux[debut:debut+128]
+        sortie.append(len(morceau) - 1)
+        sortie.extend(morceau)
+    return bytearray()
+
+
+class Decompacteur:
+    "Décompression bloc par bloc d'un écran compacté, en-tête compris"
+
+    def __init__(self):
+        self.historique = bytearray()
+        self.entete = len(COMPACT_ENTETE)
+        self.litteraux = 0
+        self.jeton = None
+
+    def decompacte(self, bloc):
+        "Octets de l'écran reconstitués à partir du bloc suivant"
+        travail = self.historique
+        debut = len(travail)
+        i = 0
+        while i < len(bloc):
+            if self.entete:
+                pas = min(self.entete, len(bloc) - i)
+                self.entete -= pas
+                i += pas
+            elif self.litteraux:
+                pas = min(self.litteraux, len(bloc) - i)
+                travail.extend(bloc[i:i+pas])
+                self.litteraux -= pas
+                i += pas
+            elif self.jeton is None:
+                if bloc[i] < 0x80:
+                    self.litteraux = bloc[i] + 1
+                else:
+                    self.jeton = bloc[i]
+                i += 1
+            else:
+                distance = ((self.jeton & 3) << 8 | bloc[i]) + 1
+                longueur = ((self.jeton >> 2) & 0x1f) + 3
+                self.jeton = None
+                i += 1
+                if distance > len(travail):
+                    raise ValueError('écran compacté invalide')
+                # copie recouvrant ce qu'elle produit : octet par octet
+                depart = len(travail) - distance
+                if distance >= longueur:
+                    travail.extend(travail[depart:depart+longueur])
+                else:
+                    for j in range(depart, depart + longueur):
+                        travail.append(travail[j])
+        sortie = travail[debut:]
+        self.historique = travail[-COMPACT_FENETRE:]
+        return sortie
+
+
+def _compacte(data):
+    "Vrai si data commence par l'en-tête d'un écran compacté"
+    return bytes(data[:len(COMPACT_ENTETE)]) == COMPACT_ENTETE
+
+
+def cree_archive(destination, fichiers, compacter=False):
+    "Ecrit dans destination l'archive des écrans fichiers (nom, chemin)"
+    ecrans = []
+    for nom, chemin in fichiers:
+        with open(chemin, 'rb') as f:
+            data = f.read()
+        ecrans.append((nom, compacte(data) if compacter else data))
+    index = bytearray(ARCHIVE_ENTETE)
+    index.extend(len(ecrans).to_bytes(2, 'little'))
+    position = len(index) + sum(9 + len(nom.encode()) for nom, _ in ecrans)
+    for nom, data in ecrans:
+        index.append(len(nom.encode()))
+        index.extend(nom.encode())
+        index.extend(position.to_bytes(4, 'little'))
+        index.extend(len(data).to_bytes(4, 'little'))
+        position += len(data)
+    with open(destination, 'wb') as sortie:
+        sortie.write(index)
+        for _, data in ecrans:
+            sortie.write(data)
+
+
+class Archive:
+    """Archive d'écrans vidéotex ouverte en lecture
+
+    Seul l'index est chargé : les écrans sont lus à la demande depuis le
+    fichier, qui reste ouvert jusqu'à close()."""
+
+    def __init__(self, fichier):
+        self.f = open(fichier, 'rb')
+        self.noms = []
+        self.index = {}
+        if self.f.read(4) != ARCHIVE_ENTETE:
+            self.f.close()
+            raise ValueError('archive vidéotex invalide')
+        nombre = int.from_bytes(self.f.read(2), 'little')
+        for _ in range(nombre):
+            nom = self.f.read(self.f.read(1)[0]).decode()
+            entree = self.f.read(8)
+            self.noms.append(nom)
+            self.index[nom] = (int.from_bytes(entree[:4], 'little'),
+                               int.from_bytes(entree[4:], 'little'))
+
+    def __len__(self):
+        return len(self.noms)
+
+    def ecran(self, nom):
+        "Position et longueur d'un écran désigné par son nom ou son numéro"
+        if isinstance(nom, int):
+            nom = self.noms[nom]
+        return self.index[nom]
+
+    def close(self):
+        self.f.close()
+
+
 class Pynitel:
     "Classe de gestion des entrée/sortie vidéotex avec un Minitel"
 
-    def __init__(self, conn):
+    def __init__(self, conn, vitesse=1200):
+        "conn : liaison série avec le Minitel, vitesse : sa vitesse en bps"
         self.ecrans = {'last': None}
         self.conn = conn
         self.lastkey = 0
@@ -20,6 +395,33 @@ class Pynitel:
         self.zones = []
         self.zonenumber = 0
 
+        # compression des répétitions par REP des envois hors pages (send,
+        # sendchr...), à activer au besoin ; les pages sont toujours
+        # compressées, le compresseur les suivant de toute façon pour ne les
+        # couper qu'entre deux séquences
+        self.compression = False
+        self.compresseur = Compresseur()
+
+        # pages (draw, drawscreen, xdraw) envoyées par tranches au rythme
+        # de la liaison (vitesse, à tenir à jour si elle change), interrompues
+        # par une touche de fonction si interruptible est vrai ;
+        # progression(lus, total) est appelée après chaque bloc lu d'un
+        # fichier et l'interrompt si elle retourne True
+        self.interruptible = False
+        self.interrompu = False
+        self.vitesse = vitesse
+        self.progression = None
+        self.fin_emission = 0
+
+        # attente des touches sans boucle active
+        self.sondage = None
+
+        # aiguillage de la réception : réponses protocole d'un côté,
+        # touches frappées de l'autre
+        self.entree = bytearray()
+        self.touches = bytearray()
+        self.reponses = []
+
         # constantes de couleurs
         self.noir = 0
         self.rouge = 1
@@ -62,9 +464,69 @@ class Pynitel:
         "Fin de connexion, raccrochage"
         self.conn.write(b'\x1b9g')
 
+    def _attend(self, delai=-1):
+        "Attente d'un octet reçu, au plus delai ms (-1 : sans limite)"
+        if self.conn.any():
+            return True
+        if self.sondage is None:
+            self.sondage = select.poll()
+            self.sondage.register(self.conn, select.POLLIN)
+        self.sondage.poll(delai)
+        return self.conn.any() != 0
+
+    def _recoit(self):
+        "Aiguille les octets reçus entre réponses protocole et touches"
+        if self.conn.any():
+            self.entree.extend(self.conn.read(self.conn.any()))
+        while self.entree:
+            longueur = _longueur_trame(self.entree)
+            if longueur == 0:  # trame incomplète, la suite arrive
+                break
+            trame = bytes(self.entree[:longueur])
+            self.entree = self.entree[longueur:]
+            if _protocole(trame):
+                self.reponses.append(trame)
+                if len(self.reponses) > REPONSES_MAX:
+                    self.reponses.pop(0)
+            else:
+                self.touches.extend(trame)
+
+    def _touche(self, delai=-1):
+        "Octet suivant frappé au clavier, '' si rien n'arrive dans le délai"
+        self._recoit()
+        if not self.touches and self._attend(delai):
+            self._recoit()
+        if not self.touches:
+            return ''
+        c = chr(self.touches[0])
+        self.touches = self.touches[1:]
+        return c
+
+    def _touche_fonction(self):
+        "Vrai si une touche de fonction (SEP 0x41 à 0x49) attend d'être lue"
+        self._recoit()
+        i = 0
+        while i < len(self.touches) - 1:
+            if self.touches[i] == 0x13:
+                if 0x41 <= self.touches[i+1] <= 0x49:
+                    return True
+                i += 2
+            else:
+                i += 1
+        return False
+
+    def reponse(self):
+        "Plus ancienne réponse protocole reçue (bytes), None s'il n'y en a pas"
+        self._recoit()
+        if not self.reponses:
+            return None
+        return self.reponses.pop(0)
+
     def _if(self):
         "Dernier caractère reçu"
-        data = self.conn.read()
+        self._recoit()
+        data = bytes(self.touches)
+        self.touches = bytearray()
         if not data:
             return None
         else:
@@ -153,12 +615,11 @@ class Pynitel:
             num = self.ecrans['last']
         self.ecrans['last'] = num
         if num is not None:
-            self.conn.write(self.ecrans[num])
+            self._page(self.ecrans[num])
 
     def drawscreen(self, fichier):
         "Envoi du contenu d'un fichier"
-        with open(fichier, 'rb') as f:
-            self.conn.write(f.read())
+        self._page_fichier(fichier)
 
     def flash(self, clignote=True):
         "Passage en clignotant"
@@ -173,7 +634,10 @@ class Pynitel:
 
     def get(self):
         "Rend le contenu du buffer de saisie actuel"
-        return(self.conn.read(self.conn.any()).decode())
+        self._recoit()
+        data = self.touches.decode()
+        self.touches = bytearray()
+        return(data)
 
     # getid - lecture ROM/RAM Minitel
     def getid(self):
@@ -197,14 +661,12 @@ class Pynitel:
         self.sendchr(17)  # Con
 
         while True:
-            if self.conn.any():
-                c = self.conn.read(1).decode()
-            else:
-                c = ''
+            # les acquittements protocole sont écartés par _recoit
+            c = self._touche()
             if c == '':
                 continue
             elif c == '\x13':  # SEP donc touche Minitel...
-                c = self.conn.read(1).decode()
+                c = self._touche()
 
                 if c == '\x45' and data != '':  # annulation
                     data = ''
@@ -221,14 +683,8 @@ class Pynitel:
                     self.lastkey = ord(c)-64
                     self.laststar = (data != '' and data[:-1] == '*')
                     return(data, ord(c)-64)
-            elif c == '\x1b':  # filtrage des acquittements protocole...
-                c = c + self.conn.read(1).decode()
-                if c == self.PRO1:
-                    self.conn.read(1)
-                elif c == self.PRO2:
-                    self.conn.read(2)
-                elif c == self.PRO3:
-                    self.conn.read(3)
+            elif c == '\x1b':  # séquence ESC hors protocole, ignorée
+                self._touche()
             elif c >= ' ' and len(data) >= longueur:
                 self.bip()
             elif c >= ' ':
@@ -259,7 +715,8 @@ class Pynitel:
             self.bip()
         self.pos(ligne, colonne)
         self._print(message)
-        self.conn.read(self.conn.any())
+        self._recoit()  # oublie les touches frappées avant le message
+        self.touches = bytearray()
         time.sleep(delai)
         self.pos(ligne, colonne)
         self.plot(' ', len(message))
@@ -385,14 +842,20 @@ class Pynitel:
 
     def xdraw(self, fichier):
         "Envoi du contenu d'un fichier"
-        with open(fichier, 'rb') as f:
-            self.conn.write(f.read())
+        self._page_fichier(fichier)
+
+    def drawarchive(self, archive, nom):
+        "Envoi d'un écran d'une archive, désigné par son nom ou son numéro"
+        position, longueur = archive.ecran(nom)
+        archive.f.seek(position)
+        self._page_flux(archive.f, longueur)
 
     def load(self, num, fichier):
-        "Charge un fichier vidéotex dans un buffer"
+        "Charge un fichier vidéotex, compacté ou non, dans un buffer"
+        data = bytearray(os.stat(fichier)[6])
         with open(fichier, 'rb') as f:
-            data = f.read()
-            self.ecrans[num] = data
+            f.readinto(data)
+        self.ecrans[num] = data
 
     def read(self):
         "Lecture de la date et heure"
@@ -404,10 +867,104 @@ class Pynitel:
     def send(self, text):
         "Envoi de données vers le minitel"
         if self.conn is not None:
-            self.conn.write(text.encode())
+            self._write(text.encode())
         else:
             print('conn = None')
 
+    def _write(self, data):
+        "Envoi d'octets vers le minitel, répétitions compressées"
+        if self.compression:
+            data = self.compresseur.compresse(data)
+        else:
+            self.compresseur.oublie()
+        self.conn.write(data)
+
+    def _page(self, data):
+        "Envoi d'une page en mémoire, compactée ou non"
+        self._debut_page()
+        if not _compacte(data):
+            self._suite_page(data)
+            return
+        decompacteur = Decompacteur()
+        vue = memoryview(data)
+        for debut in range(0, len(data), TAILLE_BLOC):
+            if self.interrompu:
+                break
+            self._suite_page(
+                decompacteur.decompacte(vue[debut:debut+TAILLE_BLOC]))
+
+    def _page_fichier(self, fichier):
+        "Envoi d'une page lue dans un fichier"
+        with open(fichier, 'rb') as f:
+            self._page_flux(f, os.stat(fichier)[6])
+
+    def _page_flux(self, f, total):
+        "Envoi des total octets suivants de f, lus dans un tampon réutilisé"
+        vue = memoryview(bytearray(TAILLE_BLOC))
+        decompacteur = None
+        lus = 0
+        self._debut_page()
+        while lus < total and not self.interrompu:
+            nombre = f.readinto(vue[:min(TAILLE_BLOC, total - lus)])
+            if not nombre:
+                break
+            if lus == 0 and _compacte(vue[:nombre]):
+                decompacteur = Decompacteur()
+            if decompacteur is None:
+                self._suite_page(vue[:nombre])
+            else:
+                self._suite_page(decompacteur.decompacte(vue[:nombre]))
+            lus += nombre
+            if (self.progression is not None
+                    and self.progression(lus, total)):
+                self._interrompt()
+
+    def _debut_page(self):
+        "Début d'envoi d'une page"
+        self.interrompu = False
+        self.fin_emission = time.ticks_ms()
+
+    def _interrompt(self):
+        "Abandon du reste de la page en cours d'envoi"
+        # RS ramène les attributs du Minitel à leur valeur par défaut
+        self.interrompu = True
+        self.compresseur = Compresseur()
+        self.conn.write(b'\x1e')
+
+    def _suite_page(self, data):
+        "Envoi d'une partie de page par tranches, au rythme de la liaison"
+        # une tranche d'environ DUREE_TRANCHE ms de ligne, 10 bits par octet
+        taille = max(1, DUREE_TRANCHE * self.vitesse // 10000)
+        debut = 0
+        while debut < len(data) and not self.interrompu:
+            # attente de la ligne presque libre, en guettant le clavier ;
+            # pas d'abandon au milieu d'une séquence coupée entre deux blocs
+            while True:
+                self._recoit()
+                if (self.interruptible and self.compresseur.etat is None
+                        and self._touche_fonction()):
+                    self._interrompt()
+                    return
+                restant = time.ticks_diff(self.fin_emission, time.ticks_ms())
+                if restant <= DUREE_TRANCHE:
+                    break
+                self._attend(restant - DUREE_TRANCHE)
+
+            # coupure uniquement entre deux séquences
+            fin = min(debut + taille, len(data))
+            tranche = self.compresseur.compresse(data[debut:fin])
+            while fin < len(data) and self.compresseur.etat is not None:
+                tranche.extend(self.compresseur.compresse(data[fin:fin+1]))
+                fin += 1
+            self.conn.write(tranche)
+            debut = fin
+
+            maintenant = time.ticks_ms()
+            if time.ticks_diff(self.fin_emission, maintenant) < 0:
+                self.fin_emission = maintenant
+            self.fin_emission = time.ticks_add(
+                self.fin_emission, len(tranche) * 10000 // self.vitesse)
+
     def sendchr(self, ascii):
         self.send(chr(ascii))
 